@@ -0,0 +1,141 @@
+"""
+Benchmark for the local emotion tier.
+
+Replays synthetic biometric snapshots (same ranges as the MCP server's mock
+snapshot) through LocalEmotionClassifier and reports how often a turn would
+still escalate to the vision LLM, plus the per-call CPU cost.
+
+With --calibrate it instead fits the classifier's biases to the snapshots so
+that mean probabilities match the prior (--neutral-share for neutral, the
+rest split evenly), at the given --temperature, and prints them.
+
+Synthetic snapshots have no right answer, so neither of those says whether a
+threshold gives correct labels. --labelled replays recorded snapshots instead,
+one JSON object per line with the snapshot as "features" and the reference
+label (from vision or a human) as "label", and also reports how often the
+labels kept locally match it, overall and by confidence.
+
+Run from app/:
+    python -m backend.benchmarks.emotion_escalation --samples 5000
+    python -m backend.benchmarks.emotion_escalation --calibrate --temperature 0.5
+    python -m backend.benchmarks.emotion_escalation --labelled snapshots.jsonl --thresholds 0.5 0.6 0.7
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+from backend.src.core.config import settings
+from backend.src.services.emotion import EMOTION_LABELS
+from backend.src.services.emotion_classifier import _BIASES, LocalEmotionClassifier, _model
+
+
+def synthetic_snapshot(rng: random.Random) -> dict:
+    return {
+        "blink_rate": rng.randint(6, 26),
+        "ear_mean": round(rng.uniform(0.45, 0.72), 2),
+        "jaw_tension": round(rng.uniform(0.0, 0.2), 3),
+        "breathing_rate": rng.randint(10, 22),
+        "breathing_amplitude": rng.choice(["low", "medium", "high"]),
+        "facial_variance": round(rng.uniform(0.0, 0.1), 3),
+        "speaking": rng.choice([True, False]),
+        "head_motion": rng.choice(["low", "medium", "high"]),
+    }
+
+
+def calibrate(snapshots, temperature: float, neutral_share: float, iterations: int = 300) -> list:
+    import numpy as np
+
+    weights, _ = _model()
+    vectors = np.array([LocalEmotionClassifier.vectorize(s) for s in snapshots])
+    others = (1 - neutral_share) / (len(EMOTION_LABELS) - 1)
+    target = np.array([neutral_share if label == "neutral" else others for label in EMOTION_LABELS])
+    neutral = EMOTION_LABELS.index("neutral")
+
+    biases = np.array(_BIASES, dtype=float)
+    for _ in range(iterations):
+        logits = (vectors @ weights.T + biases) / temperature
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        biases -= 0.5 * temperature * np.log(probs.mean(axis=0) / target)
+    # Softmax only sees differences; keep neutral's bias where it was
+    biases += _BIASES[neutral] - biases[neutral]
+    return [round(float(b), 1) for b in biases]
+
+
+def load_labelled(path: str) -> list:
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["features"], row["label"]) for row in rows if row.get("label") in EMOTION_LABELS]
+
+
+def report_agreement(labelled: list, threshold: float) -> None:
+    classifier = LocalEmotionClassifier(confidence_threshold=threshold)
+    kept = agreed = 0
+    buckets = {}
+    for features, label in labelled:
+        prediction = classifier.predict(features)
+        bucket = buckets.setdefault(min(int(prediction.confidence * 10), 9) / 10, [0, 0])
+        bucket[0] += 1
+        bucket[1] += prediction.label == label
+        if prediction.confidence >= threshold:
+            kept += 1
+            agreed += prediction.label == label
+
+    print(f"threshold={threshold:.2f}")
+    print(f"  escalation rate: {1 - kept / len(labelled):.1%} ({len(labelled) - kept}/{len(labelled)})")
+    print(f"  local accuracy:  {agreed / kept:.1%} ({agreed}/{kept})" if kept else "  local accuracy:  n/a")
+    for confidence, (total, hits) in sorted(buckets.items()):
+        print(f"  confidence {confidence:.1f}+: {hits / total:.1%} ({hits}/{total})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--thresholds",
+        type=float,
+        nargs="+",
+        default=[settings.EMOTION_LOCAL_CONFIDENCE_THRESHOLD],
+    )
+    parser.add_argument("--calibrate", action="store_true")
+    parser.add_argument("--temperature", type=float, default=0.5)
+    parser.add_argument("--neutral-share", type=float, default=0.3)
+    parser.add_argument("--labelled", help="JSONL of recorded snapshots with reference labels")
+    args = parser.parse_args()
+
+    if args.labelled:
+        labelled = load_labelled(args.labelled)
+        if not labelled:
+            parser.error(f"no rows with a known label in {args.labelled}")
+        for threshold in args.thresholds:
+            report_agreement(labelled, threshold)
+        return
+
+    rng = random.Random(args.seed)
+    snapshots = [synthetic_snapshot(rng) for _ in range(args.samples)]
+
+    if args.calibrate:
+        print(f"_BIASES = {calibrate(snapshots, args.temperature, args.neutral_share)}")
+        print(f"_TEMPERATURE = {args.temperature}")
+        return
+
+    for threshold in args.thresholds:
+        classifier = LocalEmotionClassifier(confidence_threshold=threshold)
+        labels = Counter()
+
+        start = time.perf_counter()
+        for snapshot in snapshots:
+            labels[classifier.classify(snapshot) or "<vision>"] += 1
+        elapsed = time.perf_counter() - start
+
+        print(f"threshold={threshold:.2f}")
+        print(f"  escalation rate: {classifier.escalation_rate:.1%} ({classifier.escalated_count}/{args.samples})")
+        print(f"  local classify:  {elapsed / args.samples * 1e6:.1f} us/call")
+        print(f"  labels:          {dict(labels.most_common())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Local stand-in for the ElevenLabs TTS endpoints used by the benchmarks.
+
+Serves the REST /stream and /stream/with-timestamps endpoints and the
+stream-input WebSocket with fixed, configurable costs so the two TTS engines
+can be compared without network noise. Audio payloads are filler bytes sized
+to the text, with evenly spaced character timings.
+"""
+import asyncio
+import base64
+import json
+
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import StreamingResponse
+
+# Per-request overhead of a fresh HTTPS request (connect + TLS + queueing)
+REQUEST_OVERHEAD_S = 0.10
+# Time to synthesize one chunk of text before its first audio byte
+SYNTH_S = 0.15
+BYTES_PER_CHAR = 40
+
+app = FastAPI()
+
+
+def _audio_for(text: str) -> bytes:
+    return b"\x00" * (len(text) * BYTES_PER_CHAR)
+
+
+def _timing(text: str):
+    # Evenly spaced characters, 60 ms each
+    return [i * 60 for i in range(len(text))], [60] * len(text)
+
+
+@app.post("/v1/text-to-speech/{voice_id}/stream")
+async def rest_stream(voice_id: str, request: Request):
+    payload = await request.json()
+    audio = _audio_for(payload["text"])
+
+    async def body():
+        await asyncio.sleep(REQUEST_OVERHEAD_S + SYNTH_S)
+        third = max(1, len(audio) // 3)
+        for i in range(0, len(audio), third):
+            yield audio[i:i + third]
+            await asyncio.sleep(0.01)
+
+    return StreamingResponse(body(), media_type="audio/mpeg")
+
+
+@app.post("/v1/text-to-speech/{voice_id}/stream/with-timestamps")
+async def rest_stream_with_timestamps(voice_id: str, request: Request):
+    payload = await request.json()
+    text = payload["text"]
+    starts, durations = _timing(text)
+
+    async def body():
+        await asyncio.sleep(REQUEST_OVERHEAD_S + SYNTH_S)
+        yield json.dumps({
+            "audio_base64": base64.b64encode(_audio_for(text)).decode(),
+            "alignment": {
+                "characters": list(text),
+                "character_start_times_seconds": [s / 1000 for s in starts],
+                "character_end_times_seconds": [(s + d) / 1000 for s, d in zip(starts, durations)],
+            },
+        }) + "\n"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@app.websocket("/v1/text-to-speech/{voice_id}/stream-input")
+async def input_stream(websocket: WebSocket, voice_id: str):
+    await websocket.accept()
+    schedule = [50]
+    buffer = ""
+    generated = 0
+
+    async def generate(text: str):
+        await asyncio.sleep(SYNTH_S)
+        starts, durations = _timing(text)
+        await websocket.send_text(json.dumps({
+            "audio": base64.b64encode(_audio_for(text)).decode(),
+            "alignment": {"chars": list(text), "charStartTimesMs": starts, "charDurationsMs": durations},
+        }))
+
+    while True:
+        message = json.loads(await websocket.receive_text())
+        if "generation_config" in message:
+            schedule = message["generation_config"].get("chunk_length_schedule", schedule)
+
+        text = message.get("text", "")
+        if text == "":
+            if buffer.strip():
+                await generate(buffer)
+            await websocket.send_text(json.dumps({"audio": None, "isFinal": True}))
+            await websocket.close()
+            return
+
+        buffer += text
+        threshold = schedule[min(generated, len(schedule) - 1)]
+        if len(buffer.strip()) >= threshold:
+            await generate(buffer)
+            buffer = ""
+            generated += 1
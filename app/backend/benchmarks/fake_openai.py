@@ -0,0 +1,106 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint used by the benchmarks.
+
+Streams a fixed reply with a configurable time to first token. When tools are
+offered and the turn carries no inline physiological context, it first answers
+with a get_physical_snapshot tool call, the way the agent behaves when told to
+always check the user's physical state. Token usage is estimated from the
+request size. Every completion is recorded in `completions`.
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# Time from request to first streamed token (queueing + prefill)
+FIRST_TOKEN_S = 0.45
+TOKEN_S = 0.02
+
+REPLY = (
+    "It sounds like work has been pressing on you a lot lately. "
+    "Would it help to slow down and take one easy breath together first?"
+)
+
+app = FastAPI()
+
+# One entry per completion: {"tools": bool, "tool_call": bool}
+completions: List[Dict[str, Any]] = []
+
+
+def _chunk(delta: Optional[Dict[str, Any]], finish_reason=None, usage: Optional[Dict[str, int]] = None) -> str:
+    payload = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage is not None:
+        payload["usage"] = usage
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _usage(body: Dict[str, Any], completion_tokens: int) -> Dict[str, int]:
+    # Roughly 4 characters per token, like the real tokenizer on English text
+    prompt_tokens = len(json.dumps(body["messages"])) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _wants_snapshot(body: Dict[str, Any]) -> bool:
+    if not body.get("tools"):
+        return False
+    last = body["messages"][-1]
+    if last["role"] == "tool":
+        return False
+    return "PHYSIOLOGICAL CONTEXT" not in json.dumps(last["content"])
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    tool_call = _wants_snapshot(body)
+    completions.append({"tools": bool(body.get("tools")), "tool_call": tool_call})
+
+    if not body.get("stream"):
+        await asyncio.sleep(FIRST_TOKEN_S)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": REPLY},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(body, len(REPLY) // 4),
+        }
+
+    async def events():
+        await asyncio.sleep(FIRST_TOKEN_S)
+        if tool_call:
+            yield _chunk({"role": "assistant", "tool_calls": [{
+                "index": 0,
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": "get_physical_snapshot", "arguments": "{}"},
+            }]})
+            yield _chunk({}, finish_reason="tool_calls")
+        else:
+            for word in REPLY.split(" "):
+                yield _chunk({"role": "assistant", "content": word + " "})
+                await asyncio.sleep(TOKEN_S)
+            yield _chunk({}, finish_reason="stop")
+        if body.get("stream_options", {}).get("include_usage"):
+            yield _chunk(None, usage=_usage(body, 20 if tool_call else len(REPLY) // 4))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
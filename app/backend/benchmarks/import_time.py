@@ -0,0 +1,78 @@
+"""
+Cold-start import budget for the FastAPI app.
+
+Profiles `import backend.main` in a fresh interpreter with `-X importtime`,
+prints the slowest modules by cumulative time, and fails (exit code 1) when the
+total exceeds the budget or when an SDK that should load lazily is imported
+eagerly.
+
+Run from app/:
+    python -m backend.benchmarks.import_time --budget-ms 800
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# SDKs that must only load on first use or during lifespan warm-up
+LAZY_MODULES = ["openai", "strands", "mcp", "supabase", "numpy", "jose", "httpx", "websockets"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_imports(target: str):
+    """
+    Return [(module, self_us, cumulative_us, depth)] for importing `target`.
+    """
+    app_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=app_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=800.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = profile_imports(args.target)
+    total_ms = next(cumulative for module, _, cumulative, _ in rows if module == args.target) / 1000
+
+    print(f"Slowest imports (cumulative) for {args.target}:")
+    for module, _, cumulative, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    imported = {module for module, _, _, _ in rows}
+    eager = [name for name in LAZY_MODULES if name in imported]
+
+    print(f"\nTotal: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if total_ms > args.budget_ms:
+        print("FAIL: import time is over budget")
+        failed = True
+    if eager:
+        print(f"FAIL: imported eagerly, should be lazy: {', '.join(eager)}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare PHYSIOLOGY_CONTEXT_MODE "tool" and "inline" end to end.
+
+Each turn runs the real agent (strands + the MCP server subprocess) against a
+local fake OpenAI endpoint and the fake ElevenLabs REST endpoint. The fake LLM
+asks for get_physical_snapshot whenever the turn has no inline physiological
+context, so "tool" mode pays an extra completion plus an MCP round-trip before
+any speakable text. Reported per mode: agent completions per turn and time to
+first audio byte. Costs of the fakes are set in fake_openai.py and
+fake_elevenlabs.py. Acknowledgment clips are turned off, since they would be
+the first audio in both modes.
+
+Run from app/:
+    python -m backend.benchmarks.physiology_context --runs 3
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import uvicorn
+
+from backend.benchmarks import fake_elevenlabs, fake_openai
+from backend.src.core.config import settings
+from backend.src.services.acknowledgments import ack_clips
+from backend.src.services.agent_interaction_service import AgentService
+from backend.src.services.elevenlabs import get_audio_profile
+
+SNAPSHOT = {
+    "blink_rate": 21,
+    "ear_mean": 0.6,
+    "jaw_tension": 0.12,
+    "breathing_rate": 19,
+    "breathing_amplitude": "low",
+    "facial_variance": 0.05,
+    "speaking": False,
+    "head_motion": "medium",
+    "timestamp": "1:36PM EST on Oct 18, 2025",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve_in_thread(app) -> int:
+    # A separate loop, because the session summary still uses the blocking OpenAI client
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+async def measure_turn():
+    agent = AgentService(physiology=dict(SNAPSHOT))
+    fake_openai.completions.clear()
+    started = time.perf_counter()
+    first_audio = None
+    async for _ in agent.generate_audio_stream(
+        "Work has been really stressful this week.", "stressed", get_audio_profile("default")
+    ):
+        if first_audio is None:
+            first_audio = time.perf_counter() - started
+    agent_completions = sum(1 for c in fake_openai.completions if c["tools"])
+    return first_audio, agent_completions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    settings.OPENAI_BASE_URL = f"http://127.0.0.1:{_serve_in_thread(fake_openai.app)}/v1"
+    settings.OPENAI_API_KEY = "fake"
+    settings.ELEVENLABS_API_BASE = f"http://127.0.0.1:{_serve_in_thread(fake_elevenlabs.app)}"
+    ack_clips.enabled = False
+
+    for mode in ("tool", "inline"):
+        settings.PHYSIOLOGY_CONTEXT_MODE = mode
+        results = [await measure_turn() for _ in range(args.runs)]
+        first = [r[0] for r in results]
+        print(f"{mode:>6}: {statistics.median(r[1] for r in results):.0f} agent completions/turn  "
+              f"first audio {statistics.median(first) * 1000:7.1f} ms (median of {args.runs})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,373 @@
+"""
+Record a scripted conversation's upstream exchanges once, then replay them
+from local fixtures to compare builds without upstream latency noise.
+
+`record` runs the conversation through the real app (`/intelligence/start`,
+then `/intelligence/speak` per turn) with OpenAI, ElevenLabs and Supabase
+behind local recording proxies. Every response is stored with the time each
+chunk arrived: streamed chat completions, vision and summary replies,
+embeddings, TTS audio and Supabase rows. The fixtures go to
+`<fixtures>/<upstream>.jsonl`.
+
+`replay` runs the same conversation against servers that answer from the
+fixtures at the recorded pace times `--time-scale`. Use 0 to serve instantly
+and measure only our own code. Requests are matched on method, path, query,
+model and stream flag, in arrival order. A request seen more often than
+recorded gets the last recorded answer. Unmatched requests get a 404 and are
+reported.
+
+Per turn it reports time to first audio byte, total time and the CPU time of
+the event loop thread. The proxies run on their own threads, so their CPU is
+not included. `--out` saves the results, and `--baseline` compares against
+saved ones and exits non-zero past `--max-regression`.
+
+The WebSocket TTS engine is not proxied, so both modes force TTS_ENGINE=rest.
+Acknowledgment clips are turned off: they would make the first byte meaningless.
+
+Run from app/:
+    python -m backend.benchmarks.replay record backend/benchmarks/conversations/check_in.json fixtures/
+    python -m backend.benchmarks.replay replay backend/benchmarks/conversations/check_in.json fixtures/ --runs 5 --out new.json --baseline old.json
+
+Conversation scripts (see conversations/):
+    {"user_id": "...", "session_id": "replay", "audio_profile": "default",
+     "turns": [{"user_text": "...", "features": {...}, "b64_frame": null}, ...]}
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.benchmarks.physiology_context import _free_port, _serve_in_thread
+from backend.src.core.config import settings
+from backend.src.services.acknowledgments import ack_clips
+
+# Settings pointing at each upstream, and the path prefix the clients add to it
+UPSTREAMS = {
+    "openai": ("OPENAI_BASE_URL", "/v1"),
+    "elevenlabs": ("ELEVENLABS_API_BASE", ""),
+    "supabase": ("SUPABASE_URL", ""),
+}
+
+_DEFAULT_ORIGINS = {"openai": "https://api.openai.com", "elevenlabs": "https://api.elevenlabs.io"}
+
+# Response headers worth replaying; bodies are stored decoded, so no encodings or lengths
+_KEPT_HEADERS = {"content-type"}
+
+Exchange = Dict[str, Any]
+
+
+def _normalized_query(query: str) -> str:
+    # postgrest builds `columns` from a set, so its order changes between processes
+    params = [
+        (name, ",".join(sorted(value.split(","))) if name == "columns" else value)
+        for name, value in parse_qsl(query, keep_blank_values=True)
+    ]
+    return urlencode(sorted(params))
+
+
+def _request_key(method: str, path: str, query: str, body: bytes) -> str:
+    key = f"{method} {path}"
+    if query:
+        key += f"?{_normalized_query(query)}"
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        payload = None
+    # Vision, agent and summary calls share a path; model and streaming tell them apart
+    if isinstance(payload, dict) and "model" in payload:
+        key += f" model={payload['model']}"
+        if payload.get("stream"):
+            key += " stream"
+    return key
+
+
+class _Ordinals:
+    def __init__(self):
+        self._seen: Dict[str, int] = defaultdict(int)
+
+    def next(self, key: str) -> int:
+        ordinal = self._seen[key]
+        self._seen[key] += 1
+        return ordinal
+
+
+def recording_app(origin: str, exchanges: List[Exchange]) -> FastAPI:
+    """
+    Forward every request to `origin` and append what came back to `exchanges`.
+    """
+    app = FastAPI()
+    ordinals = _Ordinals()
+    client = httpx.AsyncClient(base_url=origin, timeout=None)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def forward(path: str, request: Request):
+        body = await request.body()
+        query = request.url.query
+        key = _request_key(request.method, request.url.path, query, body)
+        exchange: Exchange = {"key": key, "ordinal": ordinals.next(key), "chunks": []}
+        headers = {name: value for name, value in request.headers.items() if name not in ("host", "content-length")}
+
+        started = time.perf_counter()
+        upstream = await client.send(
+            client.build_request(request.method, request.url.path, params=query, content=body, headers=headers),
+            stream=True,
+        )
+        exchange["status"] = upstream.status_code
+        exchange["headers"] = {k: v for k, v in upstream.headers.items() if k.lower() in _KEPT_HEADERS}
+
+        async def relay():
+            try:
+                async for chunk in upstream.aiter_bytes():
+                    exchange["chunks"].append([time.perf_counter() - started, base64.b64encode(chunk).decode()])
+                    yield chunk
+            finally:
+                await upstream.aclose()
+                exchanges.append(exchange)
+
+        return StreamingResponse(relay(), status_code=upstream.status_code, headers=exchange["headers"])
+
+    return app
+
+
+class Fixtures:
+    def __init__(self, exchanges: List[Exchange]):
+        self._by_key: Dict[str, List[Exchange]] = defaultdict(list)
+        for exchange in sorted(exchanges, key=lambda e: e["ordinal"]):
+            self._by_key[exchange["key"]].append(exchange)
+        self.ordinals = _Ordinals()
+        self.misses: List[str] = []
+
+    def match(self, key: str) -> Optional[Exchange]:
+        recorded = self._by_key.get(key)
+        if not recorded:
+            self.misses.append(key)
+            return None
+        return recorded[min(self.ordinals.next(key), len(recorded) - 1)]
+
+
+def replay_app(fixtures: Fixtures, time_scale: float) -> FastAPI:
+    """
+    Answer from recorded exchanges, pacing each chunk at its recorded offset times `time_scale`.
+    """
+    app = FastAPI()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def serve(path: str, request: Request):
+        started = time.perf_counter()
+        body = await request.body()
+        exchange = fixtures.match(_request_key(request.method, request.url.path, request.url.query, body))
+        if exchange is None:
+            return JSONResponse(status_code=404, content={"detail": "No recorded exchange"})
+
+        async def chunks():
+            for offset, data in exchange["chunks"]:
+                delay = started + offset * time_scale - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield base64.b64decode(data)
+
+        return StreamingResponse(chunks(), status_code=exchange["status"], headers=exchange["headers"])
+
+    return app
+
+
+def _load_fixtures(directory: str, upstream: str) -> List[Exchange]:
+    path = os.path.join(directory, f"{upstream}.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _save_fixtures(directory: str, upstream: str, exchanges: List[Exchange]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{upstream}.jsonl"), "w") as f:
+        for exchange in sorted(exchanges, key=lambda e: (e["key"], e["ordinal"])):
+            f.write(json.dumps(exchange) + "\n")
+
+
+def _origin(upstream: str) -> str:
+    # The configured base URL, minus the prefix the clients add themselves
+    name, prefix = UPSTREAMS[upstream]
+    configured = getattr(settings, name) or _DEFAULT_ORIGINS[upstream] + prefix
+    return configured[: len(configured) - len(prefix)]
+
+
+def _point_settings_at(upstream: str, port: int) -> None:
+    name, prefix = UPSTREAMS[upstream]
+    setattr(settings, name, f"http://127.0.0.1:{port}{prefix}")
+
+
+async def _run_turn(client: httpx.AsyncClient, script: Dict[str, Any], turn: Dict[str, Any]) -> Dict[str, float]:
+    payload = {
+        "user_text": turn["user_text"],
+        "session_id": script.get("session_id", "replay"),
+        "features": turn.get("features"),
+        "b64_frame": turn.get("b64_frame"),
+        "audio_profile": script.get("audio_profile"),
+    }
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    async with client.stream("POST", "/intelligence/speak", json=payload) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+    return {
+        "first_byte_ms": (first_byte or 0) * 1000,
+        "total_ms": (time.perf_counter() - started) * 1000,
+        "loop_cpu_ms": (time.thread_time() - cpu_started) * 1000,
+        "bytes": size,
+    }
+
+
+def _user_token(user_id: str) -> str:
+    # Signed like a Supabase access token, so the app authenticates the script's user
+    from jose import jwt
+
+    return jwt.encode({"sub": user_id, "aud": "authenticated"}, settings.SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+async def run_conversation(script: Dict[str, Any]) -> List[Dict[str, float]]:
+    """
+    Serve the app in this event loop and play the script's turns through it.
+    Must be called after the upstream settings point at the proxies.
+    """
+    from backend.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        headers = {"Authorization": f"Bearer {_user_token(script['user_id'])}"}
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", headers=headers, timeout=None) as client:
+            params = {"session_id": script.get("session_id", "replay")}
+            (await client.post("/intelligence/start", params=params)).raise_for_status()
+            return [await _run_turn(client, script, turn) for turn in script["turns"]]
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
+async def record(script: Dict[str, Any], fixtures_dir: str) -> None:
+    recorded: Dict[str, List[Exchange]] = {}
+    for upstream in UPSTREAMS:
+        recorded[upstream] = []
+        _point_settings_at(upstream, _serve_in_thread(recording_app(_origin(upstream), recorded[upstream])))
+
+    results = await run_conversation(script)
+    # Let trailing requests (e.g. buffered Supabase inserts) land before saving
+    await asyncio.sleep(settings.WRITE_BEHIND_FLUSH_INTERVAL_S + 0.5)
+    for upstream, exchanges in recorded.items():
+        _save_fixtures(fixtures_dir, upstream, list(exchanges))
+        print(f"{upstream:>10}: {len(exchanges)} exchanges")
+    _print_results([results])
+
+
+async def replay(script: Dict[str, Any], fixtures_dir: str, time_scale: float, runs: int) -> Tuple[List, List[str]]:
+    fixtures = {upstream: Fixtures(_load_fixtures(fixtures_dir, upstream)) for upstream in UPSTREAMS}
+    for upstream, upstream_fixtures in fixtures.items():
+        _point_settings_at(upstream, _serve_in_thread(replay_app(upstream_fixtures, time_scale)))
+
+    all_runs = []
+    for _ in range(runs):
+        for upstream_fixtures in fixtures.values():
+            upstream_fixtures.ordinals = _Ordinals()
+        all_runs.append(await run_conversation(script))
+    misses = sorted({key for f in fixtures.values() for key in f.misses})
+    return all_runs, misses
+
+
+def _medians(all_runs: List[List[Dict[str, float]]]) -> List[Dict[str, float]]:
+    return [
+        {field: statistics.median(run[i][field] for run in all_runs) for field in all_runs[0][i]}
+        for i in range(len(all_runs[0]))
+    ]
+
+
+def _print_results(all_runs, baseline: Optional[List[Dict[str, float]]] = None) -> List[Dict[str, float]]:
+    medians = _medians(all_runs)
+    for i, turn in enumerate(medians):
+        line = (f"turn {i + 1}: first byte {turn['first_byte_ms']:8.1f} ms  total {turn['total_ms']:8.1f} ms  "
+                f"loop cpu {turn['loop_cpu_ms']:7.1f} ms")
+        if baseline is not None and i < len(baseline):
+            line += "  vs baseline " + "  ".join(
+                f"{field} {(turn[field] / baseline[i][field] - 1) * 100:+.1f}%"
+                for field in ("first_byte_ms", "total_ms", "loop_cpu_ms")
+                if baseline[i][field]
+            )
+        print(line)
+    return medians
+
+
+def _regressions(medians, baseline, max_regression: float) -> List[str]:
+    found = []
+    for i, (turn, base) in enumerate(zip(medians, baseline)):
+        for field in ("first_byte_ms", "total_ms", "loop_cpu_ms"):
+            if base[field] and turn[field] > base[field] * (1 + max_regression):
+                found.append(f"turn {i + 1} {field}: {base[field]:.1f} -> {turn[field]:.1f}")
+    return found
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("conversation", help="Conversation script (JSON)")
+    parser.add_argument("fixtures", help="Fixture directory")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Replay pace; 0 serves instantly")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="Save per-turn medians to this file")
+    parser.add_argument("--baseline", help="Compare against per-turn medians saved with --out")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    with open(args.conversation) as f:
+        script = json.load(f)
+    settings.TTS_ENGINE = "rest"
+    ack_clips.enabled = False
+
+    if args.mode == "record":
+        await record(script, args.fixtures)
+        return
+
+    all_runs, misses = await replay(script, args.fixtures, args.time_scale, args.runs)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    medians = _print_results(all_runs, baseline)
+    if misses:
+        print(f"{len(misses)} request(s) had no recorded exchange:")
+        for key in misses:
+            print(f"  {key}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(medians, f, indent=2)
+    if baseline is not None:
+        regressions = _regressions(medians, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark the REST (per-phrase) and WebSocket (token input streaming) TTS engines
+against a local fake ElevenLabs server.
+
+A synthetic LLM token stream is fed to each engine and the time to first audio
+byte and to the last byte are reported. Costs of the fake server are set in
+fake_elevenlabs.py.
+
+Run from app/:
+    python -m backend.benchmarks.tts_engines --runs 5
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+
+import uvicorn
+
+from backend.benchmarks import fake_elevenlabs
+from backend.src.core.config import settings
+from backend.src.services.elevenlabs import get_tts_engine, get_audio_profile
+
+REPLY = (
+    "I hear you, and it sounds like today has been a lot. "
+    "Let's take one slow breath together before we go on. "
+    "When you're ready, tell me what felt heaviest this afternoon, "
+    "and we can look at it gently, one piece at a time."
+)
+
+
+async def fake_tokens(delay_s: float):
+    for word in REPLY.split(" "):
+        await asyncio.sleep(delay_s)
+        yield word + " "
+
+
+async def measure(engine_name: str, token_delay_s: float):
+    engine = get_tts_engine(engine_name)
+    started = time.perf_counter()
+    first_byte = None
+    total = 0
+    async for chunk in engine.synthesize(fake_tokens(token_delay_s), get_audio_profile("default")):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        total += len(chunk)
+    return first_byte, time.perf_counter() - started, total
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--token-delay-ms", type=float, default=25.0)
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(fake_elevenlabs.app, host="127.0.0.1", port=port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    settings.ELEVENLABS_API_BASE = f"http://127.0.0.1:{port}"
+    settings.ELEVENLABS_WS_BASE = f"ws://127.0.0.1:{port}"
+
+    try:
+        for engine_name in ("rest", "websocket"):
+            results = [await measure(engine_name, args.token_delay_ms / 1000) for _ in range(args.runs)]
+            first = [r[0] for r in results]
+            last = [r[1] for r in results]
+            print(f"{engine_name:>9}: first audio {statistics.median(first) * 1000:7.1f} ms  "
+                  f"last byte {statistics.median(last) * 1000:7.1f} ms  "
+                  f"({results[0][2]} bytes, median of {args.runs})")
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,37 @@
+import asyncio
+import logging
+import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-from backend.src.routes import session, intelligence, memory, scribe_token
+from backend.src.routes import session, intelligence, memory, scribe_token, metrics, usage, profiles
 from backend.src.core.config import settings
+from backend.src.core.state import state_store
+from backend.src.core.warmup import readiness, warm_up
+from backend.src.services.scribe_pool import scribe_token_pool
+from backend.src.services.write_behind import write_behind
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stderr
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup: heavy SDKs load in the background; /ready reports when they're done
+    warmup_task = asyncio.create_task(warm_up())
+    await scribe_token_pool.start()
+    await write_behind.start()
     yield
-    # Shutdown
+    # Shutdown: flush buffered inserts before the process exits
+    await write_behind.stop()
+    await scribe_token_pool.stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await state_store.close()
 
 
 app = FastAPI(title=settings.PROJECT_NAME, version="1.0.0", lifespan=lifespan)
@@ -27,14 +49,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by clients to resume a dropped /speak response
+    expose_headers=["X-Turn-Id"],
 )
 
 app.include_router(session.router)
 app.include_router(intelligence.router)
 app.include_router(memory.router)
 app.include_router(scribe_token.router)
+app.include_router(metrics.router)
+app.include_router(usage.router)
+app.include_router(profiles.router)
 
 
 @app.get("/")
 async def root():
     return {"status": "HealthSimple Online"}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until lifespan warm-up has loaded the heavy SDKs and clients.
+    """
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True, "warmup_seconds": readiness.warmup_seconds, "error": readiness.error}
@@ -1,5 +1,8 @@
+import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
 class Settings(BaseSettings):
@@ -10,14 +13,114 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str = "your-anon-key"
     SUPABASE_SERVICE_ROLE_KEY: Optional[str] = None # For backend admin tasks
     SUPABASE_JWT_SECRET: str = "your-jwt-secret"
+    SUPABASE_JWKS: str = ""
     
     # ElevenLabs
     ELEVENLABS_API_KEY: str = "your-elevenlabs-api-key"
     ELEVENLABS_VOICE_ID: str = "21m00Tcm4TlvDq8ikWAM" # Default voice ID
+    TTS_DEFAULT_PROFILE: str = "default"  # See AUDIO_PROFILES in services/elevenlabs.py
+    TTS_ENGINE: str = "rest"  # "rest" (per-phrase POST) or "websocket" (token input streaming)
+    ACK_CLIPS_ENABLED: bool = True  # Play a cached acknowledgment before the reply (see services/acknowledgments.py)
+    ACK_CLIPS_DIR: str = "ack_clips"  # Relative paths are under app/backend
+    ELEVENLABS_API_BASE: str = "https://api.elevenlabs.io"
+    ELEVENLABS_WS_BASE: str = "wss://api.elevenlabs.io"
+
+    # Pre-minted realtime Scribe tokens (single-use, valid for 15 minutes)
+    SCRIBE_TOKEN_POOL_SIZE: int = 3  # 0 disables the background pool
+    SCRIBE_TOKEN_TTL_S: float = 840.0  # Discard pooled tokens a minute before they expire
+    SCRIBE_TOKEN_REFILL_INTERVAL_S: float = 30.0
 
     # Gemini
     OPENAI_API_KEY: str = "your-gemini-api-key"
-    SUPABASE_JWKS: str = ""
+    OPENAI_BASE_URL: Optional[str] = None  # Override for OpenAI-compatible endpoints (benchmarks use a local fake)
+    # "inline" adds a compact biometric summary to each turn; "tool" leaves it to get_physical_snapshot
+    PHYSIOLOGY_CONTEXT_MODE: str = "inline"
+
+    # Per-turn model routing (see services/model_router.py)
+    MODEL_ROUTING_ENABLED: bool = True
+    ROUTER_FAST_MODEL: str = "gpt-4.1-mini"
+    ROUTER_FAST_MAX_TOKENS: int = 150
+    ROUTER_STRONG_MODEL: str = "gpt-4.1"
+    ROUTER_STRONG_MAX_TOKENS: int = 500
+    ROUTER_FAST_MAX_WORDS: int = 8  # Longer messages always get the strong model
+
+    # Shared state: "memory" (single worker), "sqlite" (workers on one host) or "redis" (multi-node)
+    STATE_BACKEND: str = "memory"
+    STATE_SQLITE_PATH: str = "healthsimple_state.db"  # Relative paths are under app/backend
+    STATE_REDIS_URL: str = "redis://localhost:6379/0"
+    STATE_KEY_PREFIX: str = "healthsimple:"
+    STATE_PURGE_INTERVAL_S: float = 60.0  # memory/sqlite: expired keys are deleted on a write at most this often
+    SESSION_TTL_S: float = 6 * 3600  # Session metadata, history and snapshots expire after this
+    SESSION_HISTORY_MAX_MESSAGES: int = 40
+
+    # Emotion inference
+    EMOTION_DEADLINE_MS: int = 400  # Max time a turn waits on the vision call
+    EMOTION_DECAY_SECONDS: float = 120.0  # Last known emotion falls back to neutral after this
+    EMOTION_FRAME_MAX_AGE_S: float = 10.0  # Pre-submitted results this recent skip vision on /speak
+    EMOTION_FRAME_MIN_INTERVAL_MS: int = 1000  # Throttle for pre-submitted frames per session
+    EMOTION_LOCAL_CONFIDENCE_THRESHOLD: float = 0.6  # Below this the local tier escalates to vision
+    EMOTION_LOCAL_SHADOW_RATE: float = 0.05  # Share of confident /frames also sent to vision, to measure local accuracy
+
+    # Vision micro-batching (opt-in): frames from concurrent requests share one completion
+    VISION_BATCHING_ENABLED: bool = False
+    VISION_BATCH_WINDOW_MS: int = 150
+    VISION_BATCH_MAX_SIZE: int = 8
+
+    # LLM streaming resilience: retries before the first token, optional hedged request
+    LLM_STREAM_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_BACKOFF_S: float = 0.5
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # First-token samples needed before trusting the p95
+    LLM_HEDGE_DEFAULT_DELAY_S: float = 3.0  # Hedge deadline until then
+
+    # Admission control for /speak: in-flight limits per upstream and a bounded wait queue
+    ADMISSION_VISION_LIMIT: int = 8
+    ADMISSION_LLM_LIMIT: int = 16
+    ADMISSION_TTS_LIMIT: int = 16
+    ADMISSION_MAX_QUEUE: int = 32  # Waiters per upstream before rejecting with 503
+    ADMISSION_QUEUE_TIMEOUT_S: float = 2.0  # Max wait for a slot before rejecting with 503
+    BARGE_IN_POLL_S: float = 0.25  # How often a turn checks for a barge-in sent to another worker
+
+    # Speculative replies from partial transcripts on /sessions/ws (see services/speculation.py)
+    SPECULATION_ENABLED: bool = True
+    SPECULATION_MAX_CONCURRENT: int = 8  # Speculative generations per worker; partials beyond it are not speculated on
+    SPECULATION_MIN_WORDS: int = 3  # Shorter partials are not worth a generation
+    SPECULATION_DEBOUNCE_MS: float = 250.0  # A partial must be stable this long before a generation starts
+
+    # Resumable /speak responses (see services/turn_buffer.py)
+    SPEAK_RESUME_GRACE_S: float = 10.0  # A turn nobody reads for this long is cancelled
+    SPEAK_BUFFER_TTL_S: float = 120.0  # How long a finished turn can still be resumed
+    SPEAK_BUFFER_MAX_TURNS: int = 256  # Buffered turns per worker; oldest are evicted
+    SPEAK_BUFFER_MAX_BYTES: int = 4 * 1024 * 1024  # Per turn; older bytes are dropped first
+
+    # On-demand turn profiling (see services/profiler.py)
+    PROFILING_TOKEN: Optional[str] = None  # Requests sending it in X-Profile-Token are profiled; also guards /profiles
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of turns profiled without the header
+    PROFILING_INTERVAL_MS: float = 5.0  # Stack sampling interval while a profiled turn runs
+    PROFILING_DIR: str = "profiles"  # Relative paths are under app/backend
+    PROFILING_MAX_ARTIFACTS: int = 100  # Oldest profiles are deleted beyond this
+
+    # Write-behind buffer for Supabase inserts (emotional_logs, sessions_info)
+    WRITE_BEHIND_MAX_BATCH: int = 50  # Rows per bulk insert; a full batch flushes immediately
+    WRITE_BEHIND_FLUSH_INTERVAL_S: float = 2.0
+    WRITE_BEHIND_MAX_ATTEMPTS: int = 5  # A batch is dropped after this many failed inserts
+    WRITE_BEHIND_MAX_PENDING: int = 5000  # Oldest rows are dropped beyond this while Supabase is down
+
+    # Recall of relevant past session summaries (see services/memory_index.py)
+    MEMORY_RECALL_ENABLED: bool = True
+    MEMORY_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    MEMORY_TOP_K: int = 3  # Past summaries added to each turn
+    MEMORY_RECALL_DEADLINE_MS: int = 300  # Turns go ahead without memories after this
+    MEMORY_INDEX_REFRESH_S: float = 300.0  # Re-read a user's summaries written by other workers
+    MEMORY_ANN_MIN_SIZE: int = 2000  # Switch from brute force to an IVF index at this many memories
+    MEMORY_ANN_PROBES: int = 4  # IVF cells searched per query
+    MEMORY_EMBEDDING_TTL_S: float = 30 * 86400  # Cached summary embeddings; expired ones are re-embedded on load
+
+    # Usage accounting (see services/usage.py): per-user daily spend in USD; over it,
+    # turns get the fast model tier and USAGE_BUDGET_TTS_MODEL
+    USAGE_DAILY_BUDGET_USD: Optional[float] = None  # None disables budgets
+    USAGE_USER_BUDGETS_USD: Dict[str, float] = {}  # Per-user overrides, e.g. '{"<user id>": 5.0}'
+    USAGE_BUDGET_TTS_MODEL: str = "eleven_flash_v2_5"
 
     class Config:
         case_sensitive = True
@@ -25,3 +128,11 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
+
+
+def backend_path(path: str) -> str:
+    """
+    Resolve a configured file or directory: relative paths are under
+    app/backend, whatever the working directory.
+    """
+    return os.path.join(_BACKEND_DIR, path)
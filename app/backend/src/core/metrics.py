@@ -0,0 +1,62 @@
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry: counters, gauges and rolling-window
+    histograms. Exposed as JSON by the /metrics route.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self._histograms[name].append(value)
+
+    def count(self, name: str) -> int:
+        """Number of samples currently in a histogram's window."""
+        with self._lock:
+            return len(self._histograms.get(name, ()))
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """Nearest-rank percentile (q in [0, 1]) over the histogram window."""
+        with self._lock:
+            samples = sorted(self._histograms.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))
+        return samples[index]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            names = list(self._histograms)
+
+        histograms = {}
+        for name in names:
+            histograms[name] = {
+                "count": self.count(name),
+                "p50": self.percentile(name, 0.5),
+                "p95": self.percentile(name, 0.95),
+                "p99": self.percentile(name, 0.99),
+            }
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+metrics = Metrics()
@@ -1,4 +1,3 @@
-from jose import jwt, JWTError
 from fastapi import Request, HTTPException, Depends
 from backend.src.core.config import settings
 
@@ -9,6 +8,8 @@ async def get_current_user(request: Request):
 
     token = auth_header.split(" ")[1]
 
+    from jose import jwt, JWTError
+
 
 
     # --- PRODUCTION LOGIC: VALIDATE REAL JWT ---
@@ -23,4 +24,14 @@ async def get_current_user(request: Request):
         return payload.get("sub")
     except JWTError as e:
         print(f"JWT Verification Error: {str(e)}")
-        raise HTTPException(status_code=401, detail="Invalid Session")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid Session")
+
+
+async def get_optional_user(request: Request):
+    """
+    Like get_current_user for endpoints that also serve anonymous clients:
+    None without an Authorization header, 401 for an invalid one.
+    """
+    if request.headers.get("Authorization") is None:
+        return None
+    return await get_current_user(request)
@@ -0,0 +1,207 @@
+"""
+Shared state for session metadata, history, biometric snapshots and caches.
+
+Everything that has to be visible to every worker and replica goes through a
+StateStore instead of module globals. Values must be JSON-serializable; they
+are stored serialized so every backend has the same copy semantics.
+
+Backends (STATE_BACKEND):
+- "memory": in-process dict, single worker only
+- "sqlite": a SQLite file shared by the workers on one host
+- "redis":  any Redis-protocol server, shared across hosts
+
+Redis drops expired keys itself. The memory and SQLite stores delete them
+when they are read, and purge all expired keys on a write at most every
+STATE_PURGE_INTERVAL_S, so keys that are never read again don't pile up.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from backend.src.core.config import backend_path, settings
+
+
+class StateStore(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the value for `key`, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        """Store `value` under `key`, expiring after `ttl_s` seconds if given."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove `key` if present."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryStateStore(StateStore):
+    def __init__(self, purge_interval_s: float = 60.0):
+        # key -> (serialized value, wall-clock expiry or None)
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self.purge_interval_s = purge_interval_s
+        self._purged_at = time.time()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        raw, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        now = time.time()
+        if now - self._purged_at >= self.purge_interval_s:
+            self._purge(now)
+        expires_at = now + ttl_s if ttl_s is not None else None
+        self._data[key] = (json.dumps(value), expires_at)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def _purge(self, now: float) -> None:
+        self._purged_at = now
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and now >= expires_at]
+        for key in expired:
+            del self._data[key]
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Key-value table in a SQLite file, so `uvicorn --workers N` on one host shares
+    state. Queries run in a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str, purge_interval_s: float = 60.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self.purge_interval_s = purge_interval_s
+        self._purged_at = 0.0
+        with self._lock:
+            # WAL lets several worker processes read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at)")
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM state WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            raw, expires_at = row
+            if expires_at is not None and time.time() >= expires_at:
+                self._conn.execute("DELETE FROM state WHERE key = ? AND expires_at = ?", (key, expires_at))
+                return None
+        return json.loads(raw)
+
+    def _set(self, key: str, value: Any, ttl_s: Optional[float]) -> None:
+        now = time.time()
+        expires_at = now + ttl_s if ttl_s is not None else None
+        with self._lock:
+            # Each worker purges on its own schedule; the DELETE is cheap on the index
+            if now - self._purged_at >= self.purge_interval_s:
+                self._purged_at = now
+                self._conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps(value), expires_at),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl_s)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStateStore(StateStore):
+    """
+    State in any Redis-protocol server. Pass `client` to use an existing
+    redis.asyncio-compatible client (e.g. a local stand-in in tests).
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self._client = client
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        px = max(1, int(ttl_s * 1000)) if ttl_s is not None else None
+        await self._client.set(key, json.dumps(value), px=px)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class PrefixedStateStore(StateStore):
+    """
+    Namespaces every key, so several deployments can share one backend.
+    """
+
+    def __init__(self, inner: StateStore, prefix: str):
+        self.inner = inner
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await self.inner.get(self.prefix + key)
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        await self.inner.set(self.prefix + key, value, ttl_s)
+
+    async def delete(self, key: str) -> None:
+        await self.inner.delete(self.prefix + key)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+def create_state_store(backend: Optional[str] = None) -> StateStore:
+    backend = backend or settings.STATE_BACKEND
+    if backend == "memory":
+        inner: StateStore = InMemoryStateStore(settings.STATE_PURGE_INTERVAL_S)
+    elif backend == "sqlite":
+        inner = SQLiteStateStore(backend_path(settings.STATE_SQLITE_PATH), settings.STATE_PURGE_INTERVAL_S)
+    elif backend == "redis":
+        inner = RedisStateStore(settings.STATE_REDIS_URL)
+    else:
+        raise ValueError(f"Unknown STATE_BACKEND '{backend}'. Use memory, sqlite or redis.")
+    return PrefixedStateStore(inner, settings.STATE_KEY_PREFIX)
+
+
+state_store = create_state_store()
@@ -1,6 +1,10 @@
-from supabase import create_client, Client
+import threading
+from typing import Optional, TYPE_CHECKING
 from backend.src.core.config import settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Initialize the Supabase client
 # We use the Service Role Key (if available) for backend operations that bypass RLS,
 # OR the Anon key if we just want to act as a public user (but usually backend needs admin rights).
@@ -8,4 +12,28 @@ from backend.src.core.config import settings
 # But for now we reused SUPABASE_KEY which might be anon.
 # If you need to write to tables protected by RLS, ensure this key has permissions or use service_role.
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+class _LazySupabaseClient:
+    """
+    Stands in for the Supabase client and creates it on first use, so importing
+    this module doesn't pull in the SDK. Warmed in lifespan via get().
+    """
+
+    def __init__(self):
+        self._client: Optional["Client"] = None
+        # Warm-up creates the client from a worker thread
+        self._lock = threading.Lock()
+
+    def get(self) -> "Client":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+supabase = _LazySupabaseClient()
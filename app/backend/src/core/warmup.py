@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from backend.src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """
+    Tracks whether lifespan warm-up has finished, for the /ready endpoint.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+readiness = Readiness()
+
+
+def _warm_imports() -> None:
+    """
+    Load the heavy SDKs and build the shared clients. Runs in a worker thread so
+    the event loop keeps serving while a new replica warms up.
+    """
+    import httpx  # noqa: F401
+    import jose.jwt  # noqa: F401
+    import websockets  # noqa: F401
+    import strands  # noqa: F401
+    import strands.models.openai  # noqa: F401
+    import strands.tools.mcp  # noqa: F401
+    import mcp.client.stdio  # noqa: F401
+
+    from backend.src.core.supabase import supabase
+    from backend.src.services.agent_interaction_service import get_aclient
+    from backend.src.services.emotion_classifier import _model
+
+    supabase.get()
+    get_aclient()
+    _model()
+
+
+async def warm_up() -> None:
+    started = time.monotonic()
+    try:
+        await asyncio.to_thread(_warm_imports)
+    except Exception as e:
+        # Everything is still loaded lazily on first use, so don't hold readiness back
+        readiness.error = str(e)
+        logger.warning(f"Warm-up failed, continuing with lazy loading: {e}")
+
+    readiness.warmup_seconds = time.monotonic() - started
+    readiness.ready = True
+    metrics.observe("startup.warmup_seconds", readiness.warmup_seconds)
+    logger.info(f"Warm-up finished in {readiness.warmup_seconds:.2f}s")
+
+    # After readiness: the first turns just play no acknowledgment until this is done
+    from backend.src.services.acknowledgments import ack_clips
+    from backend.src.services.elevenlabs import get_audio_profile
+
+    if ack_clips.enabled:
+        await ack_clips.ensure(get_audio_profile())
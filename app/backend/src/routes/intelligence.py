@@ -1,26 +1,231 @@
+import asyncio
 import datetime
-from fastapi import APIRouter, Depends
+import random
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any, Tuple
 import base64
-from openai import OpenAI
 from backend.src.core.config import settings
+from backend.src.core.state import state_store
+from backend.src.core.metrics import metrics
 
 # Import services
-from backend.src.core.security import get_current_user
-from backend.src.services.agent_interaction_service import AgentService
+from backend.src.core.security import get_current_user, get_optional_user
+from backend.src.services.agent_interaction_service import AgentService, get_aclient, memory_index
+from backend.src.services.emotion import EmotionTracker, EMOTION_LABELS
+from backend.src.services.emotion_classifier import LocalEmotionClassifier
+from backend.src.services.vision_batcher import VisionBatcher
+from backend.src.services.admission import admission, AdmissionRejected
+from backend.src.services.elevenlabs import AUDIO_PROFILES, get_audio_profile
+from backend.src.services.speak_stream import NDJSON_MEDIA_TYPE, ndjson_lines
+from backend.src.services.turns import turns
+from backend.src.services.turn_buffer import OffsetUnavailable, turn_buffers
+from backend.src.services.profiler import profiler
+from backend.src.services.usage import TurnUsage, current_usage, record_llm, usage_ledger
 
 router = APIRouter(prefix="/intelligence", tags=["Intelligence"])
 
 class SpeakRequest(BaseModel):
     user_text: str
     history: Optional[List[Dict[str, str]]] = None
+    # Optional when frames were already pre-submitted to /frames for this session
+    b64_frame: Optional[str] = None
+    session_id: Optional[str] = None
+    # Biometric snapshot (same fields as get_physical_snapshot) for the local emotion tier
+    features: Optional[Dict[str, Any]] = None
+    # Named TTS profile from /intelligence/audio-profiles; defaults to TTS_DEFAULT_PROFILE
+    audio_profile: Optional[str] = None
+    # "audio" (raw audio bytes) or "ndjson" (text, phrases, audio and timing; see services/speak_stream.py)
+    stream_format: str = "audio"
+
+
+class BargeInRequest(BaseModel):
+    session_id: Optional[str] = None
+
+
+class FrameRequest(BaseModel):
     b64_frame: str
-    
-agent_service: AgentService
+    session_id: Optional[str] = None
+    features: Optional[Dict[str, Any]] = None
+
+emotion_tracker = EmotionTracker(state_store, decay_seconds=settings.EMOTION_DECAY_SECONDS)
+local_emotion_classifier = LocalEmotionClassifier(
+    confidence_threshold=settings.EMOTION_LOCAL_CONFIDENCE_THRESHOLD
+)
+vision_batcher: Optional[VisionBatcher] = (
+    VisionBatcher(
+        get_aclient,
+        window_ms=settings.VISION_BATCH_WINDOW_MS,
+        max_size=settings.VISION_BATCH_MAX_SIZE,
+        limiter=admission.vision,
+    )
+    if settings.VISION_BATCHING_ENABLED
+    else None
+)
+
+
+STREAM_FORMATS = ("audio", "ndjson")
+
+# Older clients don't send a session id and share this one
+DEFAULT_SESSION_KEY = "default"
+
 
-def analyze_emotion_from_base64_image(image_base64: str) -> str:
+def _session_key(session_id: Optional[str]) -> str:
+    return session_id or DEFAULT_SESSION_KEY
+
+
+def caller_key(user_id: Optional[str], key: str) -> str:
+    """
+    Key for limits on the caller's own turns (one at a time, a new one
+    supersedes the last): the authenticated user's session, so callers never
+    share a turn slot or cancel each other's turns by picking a session id.
+    """
+    return f"{user_id or 'anonymous'}:{key}"
+
+
+def _require_session(user_id: Optional[str], session_id: Optional[str]) -> None:
+    if user_id is None and session_id is None:
+        # Anonymous clients would otherwise all share the default session
+        raise HTTPException(status_code=400, detail="session_id is required without an Authorization header")
+
+
+async def _check_owner(key: str, user_id: Optional[str]) -> None:
+    """
+    Only the user who started a session (/start) may use it.
+    """
+    session = await state_store.get(f"session:{key}") or {}
+    if session.get("user_id") not in (None, user_id):
+        raise HTTPException(status_code=403, detail="Session belongs to another user")
+
+
+async def _load_agent(
+    key: str, history: Optional[List[Dict[str, str]]], user_id: Optional[str] = None
+) -> AgentService:
+    """
+    Build the agent for one turn from the shared session state, so any worker
+    can serve any turn. History sent by the client wins over the stored one.
+    `user_id` is the caller's authenticated id: memories are recalled and
+    summaries saved for it, and only it may use a session it started.
+    """
+    await _check_owner(key, user_id)
+    if history is None:
+        history = await state_store.get(f"history:{key}") or []
+    physiology = await state_store.get(f"physiology:{key}")
+    return AgentService(user_id, history, physiology)
+
+
+async def save_history(key: str, history: List[Dict[str, str]]) -> None:
+    await state_store.set(
+        f"history:{key}",
+        history[-settings.SESSION_HISTORY_MAX_MESSAGES:],
+        ttl_s=settings.SESSION_TTL_S,
+    )
+
+
+async def _save_physiology(key: str, features: Optional[Dict[str, Any]]) -> None:
+    if features:
+        await state_store.set(f"physiology:{key}", features, ttl_s=settings.SESSION_TTL_S)
+
+
+async def _recall_memories(user_id: Optional[str], user_text: str) -> List[str]:
+    """
+    Past session summaries relevant to this turn. Like vision, recall never
+    holds a turn up past its deadline.
+    """
+    if not settings.MEMORY_RECALL_ENABLED or not user_id:
+        return []
+    try:
+        memories = await asyncio.wait_for(
+            memory_index.recall(user_id, user_text), timeout=settings.MEMORY_RECALL_DEADLINE_MS / 1000
+        )
+    except asyncio.TimeoutError:
+        metrics.incr("memory.deadline_missed")
+        return []
+    except Exception as e:
+        print(f"Memory recall failed: {e}")
+        return []
+    return [memory.text for memory in memories]
+
+
+async def _classify_locally(key: str, features: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Run the CPU tier over the biometric snapshot. Returns None when the caller
+    should escalate to the vision LLM.
+    """
+    emotion = local_emotion_classifier.classify(features)
+    if emotion is not None:
+        await emotion_tracker.update(key, emotion)
+    return emotion
+
+
+async def _vision_emotion(b64_frame: str, features: Optional[Dict[str, Any]]) -> str:
+    """
+    The vision LLM's label for a frame, checked against the local tier's
+    prediction for the snapshot sent with it.
+    """
+    emotion = await analyze_emotion_from_base64_image(b64_frame)
+    if features:
+        local_emotion_classifier.record_agreement(features, emotion)
+    return emotion
+
+
+async def _emotion_for_turn(
+    key: str, b64_frame: Optional[str], features: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Pick the emotion for a turn without letting vision sit on the critical path:
+    a fresh pre-submitted result wins, then a confident local classification,
+    then an in-flight pre-submitted frame, then the frame sent with the turn itself.
+    """
+    deadline_s = settings.EMOTION_DEADLINE_MS / 1000
+
+    emotion = await emotion_tracker.fresh(key, settings.EMOTION_FRAME_MAX_AGE_S)
+    if emotion is not None:
+        return emotion
+    emotion = await _classify_locally(key, features)
+    if emotion is not None:
+        return emotion
+    if emotion_tracker.has_inflight(key):
+        return await emotion_tracker.wait(key, deadline_s)
+    if b64_frame:
+        return await emotion_tracker.resolve(key, _vision_emotion(b64_frame, features), deadline_s)
+    return await emotion_tracker.current(key)
+
+async def prepare_turn(
+    key: str,
+    user_text: str,
+    history: Optional[List[Dict[str, str]]] = None,
+    b64_frame: Optional[str] = None,
+    features: Optional[Dict[str, Any]] = None,
+    usage: Optional[TurnUsage] = None,
+    user_id: Optional[str] = None,
+) -> Tuple[AgentService, str, TurnUsage]:
+    """
+    Everything a turn needs before the agent runs: the session's agent for the
+    authenticated `user_id` (see _load_agent), the usage record its upstream
+    calls go to (set as current_usage, downgraded when over budget), and its
+    emotion and memories. Shared by /speak and speculative turns on
+    /sessions/ws.
+    """
+    await _save_physiology(key, features)
+    agent_service = await _load_agent(key, history, user_id)
+    if usage is None:
+        usage = TurnUsage(key, agent_service.user_id)
+    # Upstream calls from here on are accounted to this turn
+    current_usage.set(usage)
+    if await usage_ledger.over_budget(agent_service.user_id):
+        usage.downgraded = agent_service.over_budget = True
+        metrics.incr("usage.budget_downgrades")
+    # Bound how long vision and recall can hold up the turn; a late label is kept for the next one
+    emotion_state, agent_service.memories = await asyncio.gather(
+        _emotion_for_turn(key, b64_frame, features),
+        _recall_memories(agent_service.user_id, user_text),
+    )
+    return agent_service, emotion_state, usage
+
+
+async def analyze_emotion_from_base64_image(image_base64: str) -> str:
     """
     Given a base64-encoded image of a person, analyze their facial sentiment
     and return a single-word emotion label (e.g., happy, stressed, sad).
@@ -28,73 +233,223 @@ def analyze_emotion_from_base64_image(image_base64: str) -> str:
     This is a probabilistic inference based on visible facial cues.
     """
     
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
     # Strip data URL header if present
     if image_base64.startswith("data:image"):
         image_base64 = image_base64.split(",", 1)[1]
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # vision-capable + fast
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are an emotion recognition assistant. "
-                    "Given an image of a person, infer their emotional state "
-                    "based only on visible facial and posture cues. "
-                    "Respond with a single lowercase word like: "
-                    "happy, calm, stressed, sad, anxious, tired, neutral. "
-                    "If unclear, respond with 'uncertain'."
-                ),
-            },
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "What is the person's emotional state?"},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{image_base64}"
+    if vision_batcher is not None:
+        return await vision_batcher.classify(image_base64)
+
+    async with admission.vision.slot():
+        response = await get_aclient().chat.completions.create(
+            model="gpt-4o-mini",  # vision-capable + fast
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are an emotion recognition assistant. "
+                        "Given an image of a person, infer their emotional state "
+                        "based only on visible facial and posture cues. "
+                        "Respond with a single lowercase word like: "
+                        f"{', '.join(EMOTION_LABELS)}. "
+                        "If unclear, respond with 'uncertain'."
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "What is the person's emotional state?"},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{image_base64}"
+                            },
                         },
-                    },
-                ],
-            },
-        ],
-        max_tokens=10,
-    )
+                    ],
+                },
+            ],
+            max_tokens=10,
+        )
 
+    if response.usage is not None:
+        record_llm("vision", "gpt-4o-mini", response.usage.prompt_tokens, response.usage.completion_tokens)
     emotion = response.choices[0].message.content.strip().lower()
     print(emotion + " wiuorhgturhgtuihwaeriugWERFER")
     return emotion
     
 @router.post("/start")
-async def init_agent(auth_id: str):
-    global agent_service
-    agent_service = AgentService(auth_id)
+async def init_agent(session_id: Optional[str] = None, user_id: str = Depends(get_current_user)):
+    """
+    Start a session for the authenticated user. Its turns recall that user's
+    past sessions, so the user comes from the token, never the request.
+    """
+    key = _session_key(session_id)
+    await _check_owner(key, user_id)
+    await state_store.set(f"session:{key}", {"user_id": user_id}, ttl_s=settings.SESSION_TTL_S)
+    await state_store.delete(f"history:{key}")
+    if settings.MEMORY_RECALL_ENABLED:
+        memory_index.preload(user_id)
+
+
+@router.get("/audio-profiles")
+async def list_audio_profiles():
+    """
+    List the TTS profiles a client can request in /speak.
+    """
+    return {
+        "default": settings.TTS_DEFAULT_PROFILE,
+        "profiles": {name: profile.model_dump() for name, profile in AUDIO_PROFILES.items()},
+    }
+
+
+@router.post("/frames", status_code=202)
+async def submit_frame(request: FrameRequest, user_id: Optional[str] = Depends(get_optional_user)):
+    """
+    Accept a camera frame while the user is still talking and analyze it in the
+    background, so the emotion is already known when /speak arrives. Like
+    /speak, only the session's owner may send frames for it.
+    """
+    _require_session(user_id, request.session_id)
+    key = _session_key(request.session_id)
+    await _check_owner(key, user_id)
+
+    # Frames arriving faster than the vision call can usefully refresh are dropped.
+    # The marker expires with the interval, so nothing accumulates per client.
+    throttle_key = f"frame_at:{caller_key(user_id, key)}"
+    if await state_store.get(throttle_key) is not None:
+        return {"accepted": False}
+    await state_store.set(throttle_key, True, ttl_s=settings.EMOTION_FRAME_MIN_INTERVAL_MS / 1000)
+
+    await _save_physiology(key, request.features)
+    if await _classify_locally(key, request.features) is not None:
+        # A sample of confident frames still goes to vision, to check the local tier
+        if random.random() >= settings.EMOTION_LOCAL_SHADOW_RATE:
+            return {"accepted": True}
+        metrics.incr("emotion.shadowed")
+    # Runs outside any turn, so its cost goes straight to the session and the caller's totals
+    usage = TurnUsage(key, user_id, turn=False)
+    emotion_tracker.submit(
+        key, usage_ledger.accounted(usage, _vision_emotion(request.b64_frame, request.features))
+    )
+    return {"accepted": True}
+
+
+@router.post("/barge-in")
+async def barge_in(request: BargeInRequest, user_id: Optional[str] = Depends(get_optional_user)):
+    """
+    Cancel the caller's in-flight /speak turn, e.g. because the user started
+    talking over it. Closing the /speak connection has the same effect once
+    SPEAK_RESUME_GRACE_S passes without a resume.
+    """
+    _require_session(user_id, request.session_id)
+    key = _session_key(request.session_id)
+    await _check_owner(key, user_id)
+    return {"cancelled": await turns.barge_in(caller_key(user_id, key))}
 
 
 @router.post("/speak")
-async def agent_speak(request: SpeakRequest):
+async def agent_speak(
+    request: SpeakRequest, http_request: Request, user_id: Optional[str] = Depends(get_optional_user)
+):
     # StreamingResponse takes an async generator
     # Note: 'speak' endpoint here doesn't have auth in the signature in original code.
     # If we want to support RLS we should probably add Depends(get_current_user) but 
     # to avoid changing API signature too much if it's public, we'll leave it as is 
     # or assume it's public. However, AgentService defaults to global supabase client if no token.
-    emotion_state = analyze_emotion_from_base64_image(request.b64_frame)
+    _require_session(user_id, request.session_id)
+    key = _session_key(request.session_id)
+    caller = caller_key(user_id, key)
+
+    try:
+        profile = get_audio_profile(request.audio_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.stream_format not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown stream format '{request.stream_format}'. Available: {', '.join(STREAM_FORMATS)}",
+        )
+
+    turn_profile = profiler.start(http_request.headers, "speak")
+
+    # A client that gave up on its previous turn and sent a new one doesn't
+    # have to wait for the old turn's resume grace period to run out
+    await turn_buffers.supersede(caller)
+    # Fail fast (429/503) instead of queueing behind saturated upstreams
+    try:
+        ticket = await admission.admit_turn(caller)
+    except AdmissionRejected as e:
+        await profiler.finish(turn_profile)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    try:
+        agent_service, emotion_state, usage = await prepare_turn(
+            key, request.user_text, request.history, request.b64_frame, request.features, user_id=user_id
+        )
+        if usage.downgraded:
+            profile = profile.model_copy(update={"model_id": settings.USAGE_BUDGET_TTS_MODEL})
+        # From here on a barge-in or client disconnect cancels the turn's upstream work
+        turn = await turns.begin(caller)
+    except BaseException:
+        ticket.release()
+        await profiler.finish(turn_profile)
+        raise
     
     # agent_service.run_conversation(request.user_text, processed_features)
-    
-    async def audio_stream():
-        global agent_service
-        agent_service.chat_history = request.history if request.history else []
-        # Call generate_audio_stream with the text string
-        async for audio_chunk in agent_service.generate_audio_stream(request.user_text, emotion_state):
-            yield audio_chunk
 
+    framed = request.stream_format == "ndjson"
+
+    async def body():
+        if framed:
+            stream = ndjson_lines(agent_service.generate_event_stream(request.user_text, emotion_state, profile))
+        else:
+            # Call generate_audio_stream with the text string
+            stream = agent_service.generate_audio_stream(request.user_text, emotion_state, profile)
+        async for chunk in turns.guard(turn, stream):
+            yield chunk
+        if not turn.cancelled:
+            await save_history(key, agent_service.chat_history)
+
+    async def finish_turn():
+        ticket.release()
+        await turns.end(turn)
+        await usage_ledger.commit(usage)
+        await profiler.finish(turn_profile)
+
+    # Generation runs on its own and the response follows it, so a dropped
+    # connection can resume (GET /speak/{turn_id}) instead of re-running the turn
+    buffered = turn_buffers.start(
+        turn.turn_id,
+        caller,
+        NDJSON_MEDIA_TYPE if framed else profile.media_type,
+        body(),
+        cancel=turn.cancel,
+        on_done=finish_turn,
+    )
+    headers = {"X-Turn-Id": turn.turn_id}
+    if turn_profile is not None:
+        headers["X-Profile-Id"] = turn_profile.id
+    return StreamingResponse(buffered.follow(), media_type=buffered.media_type, headers=headers)
+
+
+@router.get("/speak/{turn_id}")
+async def resume_speak(turn_id: str, offset: int = 0):
+    """
+    Resume a /speak response after a dropped connection, from `offset`: the
+    number of body bytes already received. `turn_id` is the response's
+    X-Turn-Id. Only the worker that ran the turn has it; a 404 means the
+    turn has to be sent again.
+    """
+    buffered = turn_buffers.get(turn_id)
+    if buffered is None:
+        raise HTTPException(status_code=404, detail="Turn not found or expired")
+    try:
+        buffered.check_offset(offset)
+    except OffsetUnavailable as e:
+        raise HTTPException(status_code=416, detail=str(e))
+    metrics.incr("speak_buffer.resumed")
     return StreamingResponse(
-        audio_stream(),
-        media_type="audio/mpeg"
+        buffered.follow(offset), media_type=buffered.media_type, headers={"X-Turn-Id": turn_id}
     )
 
 # async def analyze_features(features: dict):
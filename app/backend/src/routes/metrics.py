@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from backend.src.core.metrics import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/")
+async def get_metrics():
+    """
+    Return the current counters, gauges and latency percentiles for this process.
+    """
+    return metrics.snapshot()
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+
+from backend.src.services.profiler import PROFILE_HEADER, profiler
+
+router = APIRouter(prefix="/profiles", tags=["Profiles"])
+
+
+async def require_profile_token(request: Request):
+    if not profiler.authorized(request.headers):
+        raise HTTPException(status_code=403, detail=f"Missing or invalid {PROFILE_HEADER}")
+
+
+@router.get("/", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """
+    Summaries of the stored turn profiles on this worker, newest first.
+    """
+    return {"profiles": profiler.list()}
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str):
+    path = profiler.path(profile_id, ".json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
+
+
+@router.get("/{profile_id}/folded", dependencies=[Depends(require_profile_token)])
+async def download_folded_stacks(profile_id: str):
+    """
+    Folded stacks for flamegraph.pl, inferno or speedscope (weights in ms).
+    """
+    path = profiler.path(profile_id, ".folded")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
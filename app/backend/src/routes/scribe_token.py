@@ -1,20 +1,23 @@
-from fastapi import APIRouter
-import requests
-from backend.src.core.config import settings
+from fastapi import APIRouter, HTTPException
+from backend.src.services.scribe_pool import scribe_token_pool
 
 router = APIRouter(prefix="/scribe")
 
 
 @router.get("/")
-def get_temp_token():
-    """Request a single-use realtime_scribe token from ElevenLabs and return its JSON.
+async def get_temp_token():
+    """Return a single-use realtime_scribe token, from the pre-minted pool when possible.
 
-    Forwards non-2xx responses as HTTPExceptions so the client sees the error.
+    Forwards non-2xx responses as HTTPExceptions so the client sees the error,
+    and answers 502 when ElevenLabs can't be reached.
     """
-    url = "https://api.elevenlabs.io/v1/single-use-token/realtime_scribe"
-    headers = {"xi-api-key": settings.ELEVENLABS_API_KEY}
+    import httpx
 
-    response = requests.request("POST", url, headers=headers)
-
-    print(response.text)
-    return response.json()
+    try:
+        return await scribe_token_pool.get()
+    except httpx.HTTPStatusError as e:
+        print(e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except httpx.HTTPError as e:
+        print(f"Scribe token request failed: {e!r}")
+        raise HTTPException(status_code=502, detail="Could not reach ElevenLabs for a Scribe token")
@@ -9,12 +9,20 @@ from fastapi import (
 )
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional, Dict, Any, cast
+import json
+from typing import AsyncIterator, List, Optional, Dict, Any, cast
 from backend.src.core.security import get_current_user
-from backend.src.services.agent_interaction_service import AgentService
+from backend.src.services.agent_interaction_service import AgentService, memory_index
 from backend.src.core.config import settings
 from backend.src.core.supabase import supabase
-from jose import jwt, JWTError
+from backend.src.services.profiler import profiler
+from backend.src.services.admission import admission, AdmissionRejected
+from backend.src.services.elevenlabs import get_audio_profile, get_tts_engine
+from backend.src.services.speak_stream import multiplex_turn
+from backend.src.services.speculation import Speculation, Speculator, speculation_pool
+from backend.src.services.turns import turns
+from backend.src.services.usage import current_usage, usage_ledger
+from backend.src.routes.intelligence import DEFAULT_SESSION_KEY, caller_key, prepare_turn, save_history
 
 router = APIRouter(prefix="/sessions", tags=["Session"])
 
@@ -27,6 +35,22 @@ class SessionResponse(BaseModel):
     note: Optional[str] = None
 
 
+# Ids go into the request URL, so bulk deletes by id are capped
+MAX_BULK_DELETE_IDS = 500
+
+
+class BulkDeleteRequest(BaseModel):
+    """Sessions to delete; filters that are given are combined"""
+
+    session_ids: Optional[List[str]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: List[str]
+
+
 @router.get("/", response_model=List[SessionResponse])
 async def get_sessions(user_id: str = Depends(get_current_user)):
     """
@@ -58,41 +82,70 @@ async def delete_session(session_id: str, user_id: str = Depends(get_current_use
     Only allows users to delete their own sessions.
     """
     try:
-        # First, verify the session belongs to the user
-        check_response = (
+        # Ownership is part of the filter, so this is one round-trip; another
+        # user's session looks the same as a missing one
+        response = (
             supabase.table("sessions_info")
-            .select("session_id, user_id")
+            .delete()
             .eq("session_id", session_id)
+            .eq("user_id", user_id)
             .execute()
         )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to delete session: {str(e)}"
+        )
 
-        if not check_response.data or len(check_response.data) == 0:
-            raise HTTPException(status_code=404, detail="Session not found")
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Session not found")
 
-        session = cast(Dict[str, Any], check_response.data[0])
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
+    memory_index.forget(user_id)
+    return {"message": "Session deleted successfully", "session_id": session_id}
 
-        if session.get("user_id") != user_id:
-            raise HTTPException(
-                status_code=403, detail="Not authorized to delete this session"
-            )
 
-        # Delete the session
-        supabase.table("sessions_info").delete().eq("session_id", session_id).execute()
+@router.post("/delete", response_model=BulkDeleteResponse)
+async def delete_sessions(request: BulkDeleteRequest, user_id: str = Depends(get_current_user)):
+    """
+    Delete several of the user's sessions in one query: the given ids, the
+    ones created in [created_after, created_before), or both combined.
+    Returns the ids that were actually deleted.
+    """
+    if request.session_ids is None and request.created_after is None and request.created_before is None:
+        raise HTTPException(
+            status_code=400, detail="Give session_ids, created_after or created_before"
+        )
+    if request.session_ids is not None and len(request.session_ids) > MAX_BULK_DELETE_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BULK_DELETE_IDS} session_ids per request"
+        )
+    if request.session_ids == []:
+        return {"deleted": []}
 
-        return {"message": "Session deleted successfully", "session_id": session_id}
+    query = supabase.table("sessions_info").delete().eq("user_id", user_id)
+    if request.session_ids is not None:
+        query = query.in_("session_id", request.session_ids)
+    if request.created_after is not None:
+        query = query.gte("created_at", request.created_after.isoformat())
+    if request.created_before is not None:
+        query = query.lt("created_at", request.created_before.isoformat())
 
-    except HTTPException:
-        raise
+    try:
+        response = query.execute()
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Failed to delete session: {str(e)}"
+            status_code=500, detail=f"Failed to delete sessions: {str(e)}"
         )
 
+    deleted = [cast(Dict[str, Any], row)["session_id"] for row in response.data]
+    if deleted:
+        memory_index.forget(user_id)
+    return {"deleted": deleted}
+
 
 async def get_ws_user(token: str = Query(...)):
     # Simple manual token check for WS
+    from jose import jwt, JWTError
+
     try:
         # Verify Supabase JWT
         payload = jwt.decode(
@@ -108,8 +161,64 @@ async def get_ws_user(token: str = Query(...)):
         return None
 
 
+async def _speculative_tokens(speculation: Speculation) -> AsyncIterator[str]:
+    """
+    Token source for /sessions/ws turns, speculative or not.
+    """
+    agent_service, emotion_state, _ = await prepare_turn(
+        speculation.key,
+        speculation.text,
+        features=speculation.features,
+        usage=speculation.usage,
+        # The socket's authenticated user (see Speculator)
+        user_id=speculation.usage.user_id,
+    )
+    async for token in agent_service.llm_token_stream(speculation.text, emotion_state, gate=speculation.gate):
+        yield token
+    # Past the gate, so the transcript was confirmed
+    await save_history(speculation.key, agent_service.chat_history)
+
+
+async def _run_turn(websocket: WebSocket, speculation: Speculation, message: Dict[str, Any]) -> None:
+    """
+    Commit a turn and stream its events (see services/speak_stream.py) as
+    JSON messages. Barge-ins go through POST /intelligence/barge-in.
+    """
+    key = speculation.key
+    caller = caller_key(speculation.usage.user_id, key)
+    try:
+        profile = get_audio_profile(message.get("audio_profile"))
+        # A committed speculation's generation already holds an LLM slot
+        ticket = await admission.admit_turn(caller, llm=not speculation.holds_llm_slot)
+    except (ValueError, AdmissionRejected) as e:
+        await speculation_pool.discard(speculation)
+        await websocket.send_json({"type": "error", "detail": getattr(e, "detail", str(e))})
+        return
+
+    usage = speculation.usage
+    current_usage.set(usage)
+    try:
+        if await usage_ledger.over_budget(usage.user_id):
+            profile = profile.model_copy(update={"model_id": settings.USAGE_BUDGET_TTS_MODEL})
+        turn = await turns.begin(caller)
+        async for event in turns.guard(turn, multiplex_turn(speculation.stream(), get_tts_engine(), profile)):
+            if event["type"] == "start":
+                event["speculated"] = speculation.speculative
+            await websocket.send_json(event)
+    finally:
+        ticket.release()
+        await usage_ledger.commit(usage)
+
+
 @router.websocket("/ws")
 async def wellness_session(websocket: WebSocket, token: str = Query(...)):
+    """
+    Plain text messages get the mock reply. JSON messages drive real turns:
+        {"type": "partial", "text": ..., "session_id": ..., "features": {...}}
+        {"type": "final", "text": ..., "session_id": ..., "features": {...}, "audio_profile": ...}
+    Partials let the agent start before the transcript is final (see
+    services/speculation.py); each final gets the turn's events back.
+    """
     await websocket.accept()
 
     # Authenticate
@@ -120,14 +229,47 @@ async def wellness_session(websocket: WebSocket, token: str = Query(...)):
 
     # Pass the token to AgentService for authenticated requests
     agent_service = AgentService(token=token)
+    speculator = Speculator(_speculative_tokens, user_id)
 
     try:
         while True:
             # Receive text input from client
             data = await websocket.receive_text()
-            # Mock agent interaction
-            response_text = f"Agent heard: {data}. Relax..."
-            await websocket.send_text(response_text)
+            message = _parse_message(data)
+            key = (message and message.get("session_id")) or DEFAULT_SESSION_KEY
+            if message is not None and message["type"] == "partial":
+                await speculator.partial(key, message["text"], message.get("features"))
+                continue
+
+            # Each message is one turn; profiling is requested by the handshake headers
+            profile = profiler.start(websocket.headers, "sessions-ws")
+            try:
+                if message is not None:
+                    speculation = await speculator.final(key, message["text"], message.get("features"))
+                    await _run_turn(websocket, speculation, message)
+                    continue
+                # Mock agent interaction
+                response_text = f"Agent heard: {data}. Relax..."
+                await websocket.send_text(response_text)
+            finally:
+                await profiler.finish(profile)
 
     except WebSocketDisconnect:
         print(f"User {user_id} disconnected.")
+    finally:
+        await speculator.close()
+
+
+def _parse_message(data: str) -> Optional[Dict[str, Any]]:
+    """
+    A partial or final transcript message, or None for plain text.
+    """
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(message, dict) or message.get("type") not in ("partial", "final"):
+        return None
+    if not isinstance(message.get("text"), str):
+        return None
+    return message
@@ -0,0 +1,36 @@
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from backend.src.core.security import get_current_user
+from backend.src.services.usage import usage_ledger
+
+router = APIRouter(prefix="/usage", tags=["Usage"])
+
+
+@router.get("/sessions/{session_id}")
+async def get_session_usage(session_id: str, user_id: str = Depends(get_current_user)):
+    """
+    Token, character and cost totals for one of the authenticated user's
+    sessions, by kind of upstream call, plus a breakdown of its most recent turns.
+    """
+    session = await usage_ledger.session(session_id, user_id)
+    if session is None:
+        # Other users' sessions are indistinguishable from unknown ones
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@router.get("/me")
+async def get_my_usage(day: Optional[str] = None, user_id: str = Depends(get_current_user)):
+    """
+    The authenticated user's totals for a UTC day (YYYY-MM-DD, default today)
+    and what is left of their daily budget.
+    """
+    if day is not None:
+        try:
+            day = datetime.date.fromisoformat(day).isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
+    return await usage_ledger.user_day(user_id, day)
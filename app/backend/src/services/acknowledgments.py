@@ -0,0 +1,133 @@
+"""
+Pre-synthesized acknowledgment clips.
+
+Between the end of the user's message and the first phrase of the reply there
+is silence: emotion, agent start, tool calls and TTS. generate_audio_stream
+fills it with a short clip ("Mm.", "I hear you.") picked for the turn's
+emotion. The reply's audio then follows in the same stream.
+
+Clips are synthesized once per API base, voice, audio profile and phrase
+with ElevenLabsService and cached in ACK_CLIPS_DIR (relative to the backend
+package), so a turn pays no TTS for them. Clips from a fake or staging API
+never stand in for real ones. A turn whose profile has no clips yet plays none and starts their
+synthesis in the background. Warm-up does this for the default profile.
+
+Only formats whose streams can simply be concatenated get clips, i.e. MP3
+and raw PCM. Chained Ogg streams don't play reliably in browsers.
+"""
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional, Set
+
+from backend.src.core.config import backend_path, settings
+from backend.src.core.metrics import metrics
+from backend.src.services.elevenlabs import AudioProfile, ElevenLabsService
+
+logger = logging.getLogger(__name__)
+
+# Kept short and content-free: the reply hasn't been written yet
+ACK_PHRASES: Dict[str, List[str]] = {
+    "happy": ["Mhm!", "Oh?"],
+    "calm": ["Mhm.", "Mm."],
+    "stressed": ["Okay.", "I hear you."],
+    "sad": ["Mm.", "I hear you."],
+    "anxious": ["Okay.", "I'm here."],
+    "tired": ["Mm.", "Hmm."],
+    "neutral": ["Mhm.", "Okay."],
+}
+
+_CONCATENABLE_FORMATS = ("mp3_", "pcm_")
+
+# After a failed synthesis, e.g. a bad API key, turns don't retry for this long
+_RETRY_AFTER_S = 300.0
+
+
+def _clip_id(profile: AudioProfile, text: str) -> str:
+    identity = "|".join([
+        settings.ELEVENLABS_API_BASE, settings.ELEVENLABS_VOICE_ID, profile.model_id, profile.output_format,
+        str(profile.stability), str(profile.similarity_boost), text,
+    ])
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+
+def _profile_id(profile: AudioProfile) -> str:
+    return _clip_id(profile, "")
+
+
+class AckClips:
+    def __init__(self, directory: str, enabled: bool):
+        self.directory = directory
+        self.enabled = enabled
+        self._clips: Dict[str, bytes] = {}
+        # Profiles whose clips are loaded, or being loaded or synthesized
+        self._profiles: Set[str] = set()
+        self._failed_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def clip(self, emotion_state: str, profile: AudioProfile) -> Optional[bytes]:
+        """
+        A cached clip for the emotion, or None. Never waits for synthesis.
+        """
+        if not self.enabled or not profile.output_format.startswith(_CONCATENABLE_FORMATS):
+            return None
+        profile_id = _profile_id(profile)
+        failed_at = self._failed_at.get(profile_id)
+        if profile_id not in self._profiles and (failed_at is None or time.monotonic() - failed_at >= _RETRY_AFTER_S):
+            # A fresh context, so the synthesis isn't accounted to this turn
+            task = asyncio.create_task(self.ensure(profile), context=contextvars.Context())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        phrases = ACK_PHRASES.get(emotion_state) or ACK_PHRASES["neutral"]
+        clip = self._clips.get(_clip_id(profile, random.choice(phrases)))
+        metrics.incr("ack.played" if clip else "ack.missed")
+        return clip or None
+
+    async def ensure(self, profile: AudioProfile) -> None:
+        """
+        Load every clip for the profile from disk, synthesizing missing ones.
+        """
+        profile_id = _profile_id(profile)
+        if profile_id in self._profiles:
+            return
+        self._profiles.add(profile_id)
+
+        for text in {text for phrases in ACK_PHRASES.values() for text in phrases}:
+            clip_id = _clip_id(profile, text)
+            path = os.path.join(self.directory, f"{clip_id}.{profile.output_format}")
+            try:
+                clip = await asyncio.to_thread(self._read, path)
+                if clip is None:
+                    clip = b"".join([chunk async for chunk in ElevenLabsService.elevenlabs_stream(text, profile)])
+                    await asyncio.to_thread(self._write, path, clip)
+                    metrics.incr("ack.synthesized")
+            except Exception as e:
+                self._profiles.discard(profile_id)
+                self._failed_at[profile_id] = time.monotonic()
+                logger.warning(f"Could not prepare acknowledgment clip '{text}': {e}")
+                return
+            self._clips[clip_id] = clip
+
+    @staticmethod
+    def _read(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path: str, clip: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Written whole, so other workers never read a partial clip
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(clip)
+        os.replace(tmp_path, path)
+
+
+ack_clips = AckClips(backend_path(settings.ACK_CLIPS_DIR), enabled=settings.ACK_CLIPS_ENABLED)
@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Set
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request can't be admitted. Routes turn it into an HTTPException.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UpstreamLimiter:
+    """
+    Global in-flight limit for one upstream (vision, LLM or TTS) with a bounded
+    wait queue. Callers that can't get a slot within `timeout_s`, or that arrive
+    when the queue is already full, are rejected with a 503 instead of stalling.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout_s: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+        self._in_flight = 0
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            metrics.incr(f"admission.{self.name}.rejected")
+            raise AdmissionRejected(503, f"{self.name} is at capacity, try again shortly")
+
+        self._waiting += 1
+        metrics.set_gauge(f"admission.{self.name}.queue_depth", self._waiting)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            metrics.incr(f"admission.{self.name}.rejected")
+            raise AdmissionRejected(503, f"Timed out waiting for {self.name} capacity")
+        finally:
+            self._waiting -= 1
+            metrics.set_gauge(f"admission.{self.name}.queue_depth", self._waiting)
+            metrics.observe(f"admission.{self.name}.wait_seconds", time.monotonic() - started)
+
+        self._in_flight += 1
+        metrics.set_gauge(f"admission.{self.name}.in_flight", self._in_flight)
+
+    @property
+    def saturated(self) -> bool:
+        """
+        No slot is free, so acquire would queue.
+        """
+        return self._semaphore.locked()
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        metrics.set_gauge(f"admission.{self.name}.in_flight", self._in_flight)
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class TurnTicket:
+    """
+    An admitted /speak turn. Holds the user's turn, a TTS slot and, unless its
+    generation already has one, an LLM slot until released; release is
+    idempotent so it can be called from several cleanup paths.
+    """
+
+    def __init__(self, controller: "AdmissionController", key: str, llm: bool = True):
+        self._controller = controller
+        self._key = key
+        self._llm = llm
+        self._released = False
+
+    @property
+    def holds_tts(self) -> bool:
+        return not self._released
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._llm:
+            self._controller.llm.release()
+        self._controller.tts.release()
+        self._controller._active_turns.discard(self._key)
+
+
+# The admitted turn on this path, set by `admit_turn`
+current_ticket: contextvars.ContextVar[Optional[TurnTicket]] = contextvars.ContextVar("current_ticket", default=None)
+
+
+class AdmissionController:
+    """
+    Admission for /speak: one active turn per user plus global per-upstream limits.
+    """
+
+    def __init__(self, vision_limit: int, llm_limit: int, tts_limit: int, max_queue: int, timeout_s: float):
+        self.vision = UpstreamLimiter("vision", vision_limit, max_queue, timeout_s)
+        self.llm = UpstreamLimiter("llm", llm_limit, max_queue, timeout_s)
+        self.tts = UpstreamLimiter("tts", tts_limit, max_queue, timeout_s)
+        self._active_turns: Set[str] = set()
+
+    def begin_turn(self, key: str) -> None:
+        if key in self._active_turns:
+            metrics.incr("admission.user_busy")
+            raise AdmissionRejected(429, "A turn is already in progress for this session")
+        self._active_turns.add(key)
+
+    def end_turn(self, key: str) -> None:
+        self._active_turns.discard(key)
+
+    async def admit_turn(self, key: str, llm: bool = True) -> TurnTicket:
+        """
+        Claim the user's turn, an LLM slot and a TTS slot, or raise
+        AdmissionRejected. Both are taken here, before the response starts,
+        so a turn is never rejected halfway through its audio. `llm=False`
+        for a turn whose generation holds a slot of its own (a committed
+        speculation).
+        """
+        self.begin_turn(key)
+        acquired = []
+        try:
+            for limiter in ([self.llm] if llm else []) + [self.tts]:
+                await limiter.acquire()
+                acquired.append(limiter)
+        except BaseException:
+            for limiter in acquired:
+                limiter.release()
+            self.end_turn(key)
+            raise
+        ticket = TurnTicket(self, key, llm)
+        current_ticket.set(ticket)
+        return ticket
+
+    @asynccontextmanager
+    async def tts_slot(self):
+        """
+        A TTS slot for one synthesis: the current turn's reserved one if
+        there is a turn, else one from the limiter.
+        """
+        ticket = current_ticket.get()
+        if ticket is not None and ticket.holds_tts:
+            yield
+            return
+        async with self.tts.slot():
+            yield
+
+
+admission = AdmissionController(
+    vision_limit=settings.ADMISSION_VISION_LIMIT,
+    llm_limit=settings.ADMISSION_LLM_LIMIT,
+    tts_limit=settings.ADMISSION_TTS_LIMIT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    timeout_s=settings.ADMISSION_QUEUE_TIMEOUT_S,
+)
@@ -1,82 +1,145 @@
+from __future__ import annotations
+
+import asyncio
 import os
-from typing import AsyncIterator, List, Dict, Optional
-from openai import AsyncOpenAI  # Use the async client for FastAPI
-from tenacity import retry, stop_after_attempt, wait_exponential
-from backend.src.core.supabase import supabase
-from backend.src.core.config import settings
-from backend.src.core.utils import Utils
-
-from strands import Agent
-from strands.models.openai import OpenAIModel
-from openai import OpenAI
-from strands.tools.mcp import MCPClient
-from mcp.client.stdio import stdio_client, StdioServerParameters
-from dotenv import load_dotenv
-import sys
+import json
+import logging
 import time
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, List, Dict, Optional, TYPE_CHECKING
+from backend.src.core.config import settings
+from backend.src.services.resilience import ResilientStream
 
 # Import services
 from backend.src.core.supabase import supabase
-from backend.src.services.elevenlabs import ElevenLabsService
-from backend.src.core.security import get_current_user
+from backend.src.services.acknowledgments import ack_clips
+from backend.src.services.elevenlabs import AudioProfile, get_audio_profile, get_tts_engine
+from backend.src.services.write_behind import write_behind
+from backend.src.services.speak_stream import multiplex_turn
+from backend.src.services.turns import note_saved
+from backend.src.services.memory_index import MemoryIndex
+from backend.src.services.physiology import summarize_physiology
+from backend.src.services.model_router import MODEL_TIERS, ModelTier, RouteDecision, record_turn, route_turn
+from backend.src.services.usage import record_llm
+from backend.src.core.state import state_store
+
+# strands, mcp and openai are heavy; they are imported where used (and warmed in lifespan)
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from strands import Agent
+    from strands.models.openai import OpenAIModel
+    from strands.tools.mcp import MCPClient
 
-import logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stderr
-)
 logger = logging.getLogger(__name__)
 
-# Configure OpenAI Async Client
-# Assumes settings.OPENAI_API_KEY exists in your .env
-aclient = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+_aclient: Optional[AsyncOpenAI] = None
+
+
+def get_aclient() -> AsyncOpenAI:
+    """
+    Shared OpenAI async client, created on first use.
+    Assumes settings.OPENAI_API_KEY exists in your .env
+    """
+    global _aclient
+    if _aclient is None:
+        from openai import AsyncOpenAI  # Use the async client for FastAPI
+        _aclient = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    return _aclient
+
+# Shared across AgentService instances so the hedge deadline tracks the global p95
+llm_stream_policy = ResilientStream(
+    "llm",
+    max_attempts=settings.LLM_STREAM_MAX_ATTEMPTS,
+    backoff_s=settings.LLM_RETRY_BACKOFF_S,
+    hedge_enabled=settings.LLM_HEDGE_ENABLED,
+    hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    hedge_default_delay_s=settings.LLM_HEDGE_DEFAULT_DELAY_S,
+)
+
+memory_index = MemoryIndex(
+    get_aclient,
+    state_store,
+    model=settings.MEMORY_EMBEDDING_MODEL,
+    top_k=settings.MEMORY_TOP_K,
+    refresh_s=settings.MEMORY_INDEX_REFRESH_S,
+    ann_min_size=settings.MEMORY_ANN_MIN_SIZE,
+    ann_probes=settings.MEMORY_ANN_PROBES,
+    embedding_ttl_s=settings.MEMORY_EMBEDDING_TTL_S,
+)
 
 class LLMStreamError(Exception):
     pass
 
 class AgentService:
-    def __init__(self, token: Optional[str] = None, history: Optional[List[Dict[str, str]]] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        history: Optional[List[Dict[str, str]]] = None,
+        physiology: Optional[Dict[str, Any]] = None,
+        memories: Optional[List[str]] = None,
+    ):
         self.supabase = supabase
-        self.client = aclient
         self.user_id = token
+        # Latest biometric snapshot for this session, handed to the MCP server
+        self.physiology = physiology
+        # Past session summaries relevant to this turn (from memory_index)
+        self.memories: List[str] = memories if memories else []
+        # Set for users over their daily budget (see services/usage.py): forces the fast tier
+        self.over_budget = False
         # OpenAI model name (e.g., "gpt-4o" or "gpt-4o-mini")
         self.model_name = "gpt-4o-mini" 
         self.chat_history: List[Dict[str, str]] = history if history else []
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=0.5, min=0.5, max=4),
-        reraise=True,
-    )
-    async def _send_message_stream(self, user_text: str, emotion_state: str):
+    @property
+    def client(self) -> AsyncOpenAI:
+        return get_aclient()
+
+    async def _send_message_stream(
+        self,
+        user_text: str,
+        emotion_state: str,
+        decision: RouteDecision,
+        usage: Dict[str, int],
+        gate: Optional[asyncio.Event] = None,
+    ):
         """
         Internal method to call OpenAI Chat Completions with streaming.
+        Retries and hedging are applied by llm_stream_policy in llm_token_stream.
         """
         # Call the strands agent conversation runner
-        async for chunk in run_conversation(user_text, emotion_state, self.user_id):
+        async for chunk in run_conversation(
+            user_text, emotion_state, self.user_id, self.physiology, self.memories,
+            tier=decision.tier, usage=usage, gate=gate,
+        ):
             yield chunk
 
     async def llm_token_stream(
         self,
         user_text: str,
-        emotion_state: str
+        emotion_state: str,
+        gate: Optional[asyncio.Event] = None,
     ) -> AsyncIterator[str]:
         """
         Streams tokens from OpenAI and updates history.
+        The model tier is picked per turn by the router. With a `gate`, the
+        session summary waits for it (see services/speculation.py).
         """
+        decision = route_turn(user_text, emotion_state, self.physiology, over_budget=self.over_budget)
+        usage: Dict[str, int] = {}
+        started = time.perf_counter()
+        first_token_s = None
+        full_response = ""
+        response_stream = llm_stream_policy.stream(
+            lambda: self._send_message_stream(user_text, emotion_state, decision, usage, gate)
+        )
         try:
-            response_stream = self._send_message_stream(
-                user_text,
-                emotion_state
-            )
-            
-            full_response = ""
             async for chunk in response_stream:
+                if first_token_s is None:
+                    first_token_s = time.perf_counter() - started
                 # Chunk is already a string from run_conversation
                 full_response += chunk
                 yield chunk
-            
+
             # Update history for this instance
             self.chat_history.append({"role": "user", "content": user_text})
             self.chat_history.append({"role": "assistant", "content": full_response})
@@ -85,16 +148,44 @@ class AgentService:
             # Important: Log the error here to debug during nwhacks
             print(f"OpenAI Stream Error: {e}")
             raise LLMStreamError("Unexpected OpenAI streaming failure") from e
+        finally:
+            # Cancelled and failed turns are billed too; closing the stream
+            # first lets run_conversation report what was already used
+            await response_stream.aclose()
+            record_turn(decision, first_token_s, time.perf_counter() - started, usage, len(full_response))
     
-    async def generate_audio_stream(self, user_text: str, emotion_state: str):
+    async def generate_audio_stream(
+        self, user_text: str, emotion_state: str, profile: Optional[AudioProfile] = None
+    ):
         """
-        Generates audio stream from OpenAI text (Async).
+        Generates audio stream from OpenAI text (Async) in the given audio profile,
+        led by a cached acknowledgment clip for the emotion when there is one.
         """
         token_stream = self.llm_token_stream(user_text, emotion_state)
-        
-        async for phrase in Utils.async_speech_chunks(token_stream):
-            async for audio_chunk in ElevenLabsService.elevenlabs_stream(phrase):
+        # The REST engine chunks into phrases itself; the WebSocket engine streams tokens
+        synthesis = get_tts_engine().synthesize(token_stream, profile)
+        try:
+            ack = ack_clips.clip(emotion_state, profile or get_audio_profile())
+            if ack is not None:
+                yield ack
+
+            async for audio_chunk in synthesis:
                 yield audio_chunk
+        finally:
+            # A cancelled turn closes the LLM stream as well, so its tokens are recorded
+            await synthesis.aclose()
+            await token_stream.aclose()
+
+    async def generate_event_stream(
+        self, user_text: str, emotion_state: str, profile: Optional[AudioProfile] = None
+    ):
+        """
+        Like generate_audio_stream, but yields the framed events from
+        speak_stream: reply text, phrase boundaries, audio and word timing.
+        """
+        token_stream = self.llm_token_stream(user_text, emotion_state)
+        async for event in multiplex_turn(token_stream, get_tts_engine(), profile):
+            yield event
 
     async def formulate_response(self, auth_id: str, features: dict):
         """
@@ -112,12 +203,8 @@ class AgentService:
             "note": f"Features processed: {features}"
         }
         
-        try:
-            # Note: supabase-py is synchronous unless using their specific async client,
-            # but usually runs fine in FastAPI.
-            self.supabase.table("emotional_logs").insert(data).execute()
-        except Exception as e:
-            print(f"Error logging to Supabase: {e}")
+        # Written in bulk off the request path
+        write_behind.enqueue("emotional_logs", data)
         
         return current_vibe
 
@@ -126,12 +213,17 @@ async def create_wellness_agent(mcp_client: MCPClient) -> Agent:
     """
     Create and configure the Personal Wellness AI Agent.
     """
+    from dotenv import load_dotenv
+    from strands import Agent
+    from strands.models.openai import OpenAIModel
+
     load_dotenv()
     
     # Initialize OpenAI model
     model = OpenAIModel(
         client_args={
             "api_key": settings.OPENAI_API_KEY,
+            "base_url": settings.OPENAI_BASE_URL,
         },
         model_id="gpt-4.1",  # Using a more available model
         params={
@@ -307,32 +399,83 @@ Conversation:
         f"{m['role'].capitalize()}: {m['content']}"
         for m in conversation_log
     )
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    from openai import OpenAI
+
+    client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    model_id = model.get_config()["model_id"]
     response = client.chat.completions.create(
-        model=model.get_config()["model_id"],
+        model=model_id,
         messages=[{"role": "user", "content": summary_prompt+"\n"+formatted_convo}]
     )
+    if response.usage is not None:
+        record_llm("summary", model_id, response.usage.prompt_tokens, response.usage.completion_tokens)
 
     return response.choices[0].message.content
 
 
-async def run_conversation(user_input: str, emotion_state: str, user_id: Optional[str] = None) -> AsyncIterator[str]:
+# Section 2 of the system prompt, per PHYSIOLOGY_CONTEXT_MODE
+_TOOL_PHYSIOLOGY_GUIDANCE = """2. When checking up on the user
+        Call the tool:
+        get_physical_snapshot
+
+        You should ALWAYS call the tool when the conversation is about feelings.
+        - The conversation involves stress, anxiety, overwhelm, fatigue, or grounding
+        - You believe physiological context would improve support
+        - You need to decide whether to slow down, pause, or guide breathing
+"""
+
+_INLINE_PHYSIOLOGY_GUIDANCE = """2. When checking up on the user
+        The user's message may include a PHYSIOLOGICAL CONTEXT line with their latest
+        interpreted physical signals. When it is there, use it directly and do not call
+        get_physical_snapshot for it.
+
+        Call the tool get_physical_snapshot only when:
+        - No PHYSIOLOGICAL CONTEXT line was included and the conversation is about feelings
+        - You need the full, detailed readings for a deeper check-in
+"""
+
+
+async def run_conversation(
+    user_input: str,
+    emotion_state: str,
+    user_id: Optional[str] = None,
+    physiology: Optional[Dict[str, Any]] = None,
+    memories: Optional[List[str]] = None,
+    tier: Optional[ModelTier] = None,
+    usage: Optional[Dict[str, int]] = None,
+    gate: Optional[asyncio.Event] = None,
+) -> AsyncIterator[str]:
     """
     Run the wellness agent in conversational mode.
     Reads from stdin if user_input is None.
+
+    `tier` picks the model (strong by default); `usage`, if given, is filled
+    with the agent's accumulated token usage once the turn completes. If
+    `gate` is given, the session summary and its insert wait until it is set.
     """
+    from strands import Agent
+    from strands.models.openai import OpenAIModel
+    from strands.tools.mcp import MCPClient
+    from mcp.client.stdio import stdio_client, StdioServerParameters
+
+    tier = tier or MODEL_TIERS["strong"]
     conversation_log = []
     logger.info("Initializing Personal Wellness AI Agent...")
     
     try:
-        # Connect to MCP server
-        server_path = os.path.join(os.path.dirname(__file__), "server.py")
-        mcp_client = MCPClient(lambda: stdio_client(StdioServerParameters(
-            command="python",
-            args=[server_path]
-        )))
+        # Connect to MCP server (fast-tier turns skip spawning it)
+        mcp_client = None
+        if tier.tools:
+            server_path = os.path.join(os.path.dirname(__file__), "server.py")
+            server_args = [server_path]
+            if physiology:
+                server_args.append(json.dumps(physiology))
+            mcp_client = MCPClient(lambda: stdio_client(StdioServerParameters(
+                command="python",
+                args=server_args
+            )))
         
-        with mcp_client:
+        with mcp_client if mcp_client is not None else nullcontext():
             # Create agent
             # agent = await create_wellness_agent(mcp_client)
 
@@ -340,16 +483,20 @@ async def run_conversation(user_input: str, emotion_state: str, user_id: Optiona
             model = OpenAIModel(
                 client_args={
                     "api_key": settings.OPENAI_API_KEY,
+                    "base_url": settings.OPENAI_BASE_URL,
                 },
-                model_id="gpt-4.1",  # Using a more available model
+                model_id=tier.model_id,
                 params={
-                    "max_tokens": 500,
+                    "max_tokens": tier.max_tokens,
                     "temperature": 0.7,
                 }
             )
             
+            inline_physiology = settings.PHYSIOLOGY_CONTEXT_MODE == "inline"
+            physiology_guidance = _INLINE_PHYSIOLOGY_GUIDANCE if inline_physiology else _TOOL_PHYSIOLOGY_GUIDANCE
+
             # System prompt for the wellness agent
-            system_prompt = """You are a Personal Wellness AI Agent designed to support users through emotionally intelligent conversation informed by optional, real-time physiological context.
+            system_prompt = f"""You are a Personal Wellness AI Agent designed to support users through emotionally intelligent conversation informed by optional, real-time physiological context.
 
         Your primary goal is to:
 
@@ -367,15 +514,7 @@ async def run_conversation(user_input: str, emotion_state: str, user_id: Optiona
         - Prefer short, calm responses when stress is likely
         - Prefer open-ended questions when engagement is low
 
-        2. When checking up on the user
-        Call the tool:
-        get_physical_snapshot
-
-        You should ALWAYS call the tool when the conversation is about feelings.
-        - The conversation involves stress, anxiety, overwhelm, fatigue, or grounding
-        - You believe physiological context would improve support
-        - You need to decide whether to slow down, pause, or guide breathing
-
+        {physiology_guidance}
         3. How to Use Biometric Context
 
         - When physiological data is available:
@@ -483,12 +622,13 @@ async def run_conversation(user_input: str, emotion_state: str, user_id: Optiona
             )
             
             # Register MCP tools
-            try:
-                mcp_tools = mcp_client.list_tools_sync()
-                logger.info(f"Available tools: {[tool.tool_name for tool in mcp_tools]}")
-                agent.tool_registry.process_tools(mcp_tools)
-            except Exception as e:
-                logger.warning(f"Could not load MCP tools: {e}")
+            if mcp_client is not None:
+                try:
+                    mcp_tools = mcp_client.list_tools_sync()
+                    logger.info(f"Available tools: {[tool.tool_name for tool in mcp_tools]}")
+                    agent.tool_registry.process_tools(mcp_tools)
+                except Exception as e:
+                    logger.warning(f"Could not load MCP tools: {e}")
             
             logger.info("Agent ready. Starting conversation...")
             
@@ -502,15 +642,27 @@ async def run_conversation(user_input: str, emotion_state: str, user_id: Optiona
                 })
 
                 full_response = ""
-                # Agent response
-                async for event in agent.stream_async(
+                prompt = (
                     f"\n----START OF USER INPUT----\n{user_input}\n----END OF USER INPUT----\n"
                     f"\n----USER EMOTIONAL STATE BASED ON PHYSICAL APPEARANCE: {emotion_state}----\n"
-                ):
+                )
+                physiology_summary = inline_physiology and summarize_physiology(physiology)
+                if physiology_summary:
+                    prompt += f"\n----PHYSIOLOGICAL CONTEXT (latest snapshot): {physiology_summary}----\n"
+                if memories:
+                    prompt += (
+                        "\n----RELEVANT NOTES FROM PAST SESSIONS----\n"
+                        + "\n".join(f"- {memory}" for memory in memories)
+                        + "\n----END OF PAST SESSION NOTES----\n"
+                    )
+                # Agent response
+                async for event in agent.stream_async(prompt):
                     if "data" in event and isinstance(event["data"], str):
                         chunk = event["data"]
                         full_response += chunk
                         yield chunk
+                    elif "result" in event and usage is not None:
+                        usage.update(event["result"].metrics.accumulated_usage)
 
                 conversation_log.append({
                     "role": "assistant",
@@ -518,35 +670,48 @@ async def run_conversation(user_input: str, emotion_state: str, user_id: Optiona
                     "timestamp": time.strftime('%l:%M%p %z on %b %d, %Y')
                 })
                     
+            except (asyncio.CancelledError, GeneratorExit):
+                # Barge-in or disconnect: the agent stream, and the summary after it, are skipped
+                note_saved("llm_streams")
+                note_saved("session_summaries")
+                if usage is not None:
+                    # Model calls that finished are still billed. The interrupted one
+                    # reported nothing; its output is estimated like in record_turn
+                    usage.update(agent.event_loop_metrics.accumulated_usage)
+                    usage["outputTokens"] = usage.get("outputTokens", 0) + len(full_response) // 4
+                raise
             except KeyboardInterrupt:
                 logger.info("Conversation interrupted by user")
             except Exception as e:
                 logger.error(f"Error in conversation: {e}", exc_info=True)
-                print("I'm sorry, I encountered an error. Let's try again.")
-                # We can't use input() in a service
-                # user_input = input("\nYou: ").strip()
+                # Let the caller's retry policy decide what to do
+                raise
             
             logger.info("Conversation ended")
-            
+
+        if gate is not None:
+            # Speculative reply: only a confirmed transcript gets a summary
+            await gate.wait()
+
         try:
             summary = await generate_session_summary(conversation_log, agent.model)
             print("\n— Session Reflection —\n")
             print(summary)
-            # Use passed user_id if available
-            try:
-                # If user_id is not provided, we can't save to specific user
-                if user_id:
-                    supabase.table("sessions_info").insert({"note": summary, "user_id": user_id}).execute()
-                else:
-                    logger.warning("No user_id provided, skipping session summary save to DB")
-            except Exception as e:
-                logger.warning(f"Could not save session summary to DB: {e}")
+            # If user_id is not provided, we can't save to specific user
+            if user_id:
+                write_behind.enqueue("sessions_info", {"note": summary, "user_id": user_id})
+                # Embedded once here so later turns can recall it
+                try:
+                    await memory_index.remember(user_id, summary)
+                except Exception as e:
+                    logger.warning(f"Could not index session summary: {e}")
+            else:
+                logger.warning("No user_id provided, skipping session summary save to DB")
 
         except Exception as e:
             logger.warning(f"Could not generate summary: {e}")
             
     except Exception as e:
-        logger.error(f"Failed to initialize agent: {e}", exc_info=True)
-        print("I'm sorry, I couldn't start properly. Please check the logs.")
-        # Do not exit the process in a service
-        # sys.exit(1)
+        logger.error(f"Conversation failed: {e}")
+        # Do not exit the process in a service; surface the error to the caller instead
+        raise
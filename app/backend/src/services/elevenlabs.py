@@ -1,32 +1,319 @@
-import httpx
+import asyncio
+import base64
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+from pydantic import BaseModel
 from backend.src.core.config import settings
+from backend.src.core.utils import Utils
+from backend.src.services.admission import admission
+from backend.src.services.turns import note_saved
+from backend.src.services.usage import record_tts
+
+
+class AudioProfile(BaseModel):
+    """
+    Output format, model tier and latency settings for one TTS request.
+    `media_type` is what the client receives as the response Content-Type.
+    """
+
+    output_format: str
+    media_type: str
+    model_id: str
+    # ElevenLabs streaming latency optimization, 0 (off) to 4 (max, may mispronounce numbers)
+    optimize_streaming_latency: Optional[int] = None
+    stability: float = 0.35
+    similarity_boost: float = 0.75
+
+
+AUDIO_PROFILES: Dict[str, AudioProfile] = {
+    # Highest quality, original behaviour
+    "default": AudioProfile(
+        output_format="mp3_44100_128",
+        media_type="audio/mpeg",
+        model_id="eleven_multilingual_v2",
+    ),
+    # Faster model tier and small MP3s for quicker first byte
+    "low_latency": AudioProfile(
+        output_format="mp3_22050_32",
+        media_type="audio/mpeg",
+        model_id="eleven_flash_v2_5",
+        optimize_streaming_latency=3,
+    ),
+    # Low-bitrate Opus for mobile connections
+    "mobile_opus": AudioProfile(
+        output_format="opus_48000_32",
+        media_type="audio/ogg",
+        model_id="eleven_flash_v2_5",
+        optimize_streaming_latency=3,
+    ),
+    # Raw 16-bit mono PCM for clients that play through Web Audio / native buffers:
+    # headerless signed little-endian samples at 16 kHz. Not audio/L16, which is
+    # big-endian (RFC 2586); clients pick the format from the profile (or the
+    # output_format in the framed stream's start event) rather than the Content-Type.
+    "pcm": AudioProfile(
+        output_format="pcm_16000",
+        media_type="application/octet-stream",
+        model_id="eleven_flash_v2_5",
+        optimize_streaming_latency=4,
+    ),
+}
+
+
+def get_audio_profile(name: Optional[str] = None) -> AudioProfile:
+    """
+    Look up a named profile, falling back to TTS_DEFAULT_PROFILE.
+    Raises ValueError for unknown names.
+    """
+    name = name or settings.TTS_DEFAULT_PROFILE
+    if name not in AUDIO_PROFILES:
+        raise ValueError(f"Unknown audio profile '{name}'. Available: {', '.join(AUDIO_PROFILES)}")
+    return AUDIO_PROFILES[name]
+
+
+def _alignment_event(characters, start_ms, duration_ms) -> Dict[str, Any]:
+    return {"chars": list(characters), "start_ms": list(start_ms), "duration_ms": list(duration_ms)}
+
 
 class ElevenLabsService:
+    """
+    REST engine: waits for a complete phrase from the chunker, then POSTs it
+    to the /stream endpoint.
+    """
+
     @staticmethod
-    async def elevenlabs_stream(text):
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{settings.ELEVENLABS_VOICE_ID}/stream"
+    async def synthesize(token_stream: AsyncIterator[str], profile: Optional[AudioProfile] = None):
+        async for phrase in Utils.async_speech_chunks(token_stream):
+            async for audio_chunk in ElevenLabsService.elevenlabs_stream(phrase, profile):
+                yield audio_chunk
+
+    @staticmethod
+    async def synthesize_events(token_stream: AsyncIterator[str], profile: Optional[AudioProfile] = None):
+        """
+        Like synthesize, but yields audio events with character timing from the
+        /stream/with-timestamps endpoint. Each phrase is one audio segment.
+        """
+        import httpx
+
+        segment = 0
+        async for phrase in Utils.async_speech_chunks(token_stream):
+            url, params, headers, payload = ElevenLabsService._request(phrase, profile, "/stream/with-timestamps")
+            try:
+                async with admission.tts_slot():
+                    async with httpx.AsyncClient() as client:
+                        async with client.stream("POST", url, params=params, json=payload, headers=headers) as response:
+                            if response.status_code != 200:
+                                error_detail = await response.aread()
+                                print(f"ElevenLabs API Error: {response.status_code} - {error_detail}")
+                                raise Exception(f"ElevenLabs API Error: {response.status_code}")
+                            record_tts(payload["model_id"], len(phrase))
+
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                data = json.loads(line)
+                                event = {"type": "audio", "segment": segment, "data": data.get("audio_base64") or ""}
+                                alignment = data.get("alignment")
+                                if alignment:
+                                    starts = alignment["character_start_times_seconds"]
+                                    ends = alignment["character_end_times_seconds"]
+                                    event["alignment"] = _alignment_event(
+                                        alignment["characters"],
+                                        [round(start * 1000) for start in starts],
+                                        [round((end - start) * 1000) for start, end in zip(starts, ends)],
+                                    )
+                                yield event
+            except (asyncio.CancelledError, GeneratorExit):
+                note_saved("tts_requests")
+                raise
+            segment += 1
+
+    @staticmethod
+    def _request(text: str, profile: Optional[AudioProfile], endpoint: str = "/stream"):
+        profile = profile or get_audio_profile()
+        url = f"{settings.ELEVENLABS_API_BASE}/v1/text-to-speech/{settings.ELEVENLABS_VOICE_ID}{endpoint}"
+
+        params = {"output_format": profile.output_format}
+        if profile.optimize_streaming_latency is not None:
+            params["optimize_streaming_latency"] = profile.optimize_streaming_latency
 
         headers = {
             "xi-api-key": settings.ELEVENLABS_API_KEY,
             "Content-Type": "application/json",
-            "Accept": "audio/mpeg"
+            # The with-timestamps endpoints answer with JSON lines carrying base64 audio
+            "Accept": profile.media_type if endpoint == "/stream" else "application/json"
         }
 
         payload = {
             "text": text,
-            "model_id": "eleven_multilingual_v2",
+            "model_id": profile.model_id,
             "voice_settings": {
-                "stability": 0.35,
-                "similarity_boost": 0.75
+                "stability": profile.stability,
+                "similarity_boost": profile.similarity_boost
             }
         }
+        return url, params, headers, payload
+
+    @staticmethod
+    async def elevenlabs_stream(text, profile: Optional[AudioProfile] = None):
+        import httpx
+
+        url, params, headers, payload = ElevenLabsService._request(text, profile)
+
+        try:
+            async with admission.tts_slot():
+                async with httpx.AsyncClient() as client:
+                    async with client.stream("POST", url, params=params, json=payload, headers=headers) as response:
+                        if response.status_code != 200:
+                            error_detail = await response.aread()
+                            print(f"ElevenLabs API Error: {response.status_code} - {error_detail}")
+                            raise Exception(f"ElevenLabs API Error: {response.status_code}")
+                        record_tts(payload["model_id"], len(text))
+
+                        async for chunk in response.aiter_bytes():
+                            yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            note_saved("tts_requests")
+            raise
+
+
+class ElevenLabsWebSocketService:
+    """
+    Input-streaming engine: keeps one ElevenLabs stream-input WebSocket per turn
+    and pushes LLM tokens into it as they arrive, so audio starts before the
+    first sentence is finished.
+    """
+
+    # Characters ElevenLabs buffers before generating each successive chunk.
+    # A small first value gets the first audio out quickly.
+    CHUNK_LENGTH_SCHEDULE = [50, 90, 120, 150]
+
+    @staticmethod
+    async def synthesize(token_stream: AsyncIterator[str], profile: Optional[AudioProfile] = None):
+        async for data in ElevenLabsWebSocketService._messages(token_stream, profile):
+            if data.get("audio"):
+                yield base64.b64decode(data["audio"])
+
+    @staticmethod
+    async def synthesize_events(token_stream: AsyncIterator[str], profile: Optional[AudioProfile] = None):
+        """
+        Like synthesize, but yields audio events with the character timing
+        ElevenLabs sends alongside each chunk. Each chunk is one audio segment.
+        """
+        segment = 0
+        async for data in ElevenLabsWebSocketService._messages(token_stream, profile, sync_alignment=True):
+            if not data.get("audio"):
+                continue
+            event = {"type": "audio", "segment": segment, "data": data["audio"]}
+            alignment = data.get("alignment")
+            if alignment:
+                event["alignment"] = _alignment_event(
+                    alignment["chars"], alignment["charStartTimesMs"], alignment["charDurationsMs"]
+                )
+            yield event
+            segment += 1
+
+    @staticmethod
+    async def _messages(
+        token_stream: AsyncIterator[str], profile: Optional[AudioProfile], sync_alignment: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        import websockets
+
+        profile = profile or get_audio_profile()
+        url = (
+            f"{settings.ELEVENLABS_WS_BASE}/v1/text-to-speech/{settings.ELEVENLABS_VOICE_ID}/stream-input"
+            f"?model_id={profile.model_id}&output_format={profile.output_format}"
+        )
+        if profile.optimize_streaming_latency is not None:
+            url += f"&optimize_streaming_latency={profile.optimize_streaming_latency}"
+        if sync_alignment:
+            url += "&sync_alignment=true"
+
+        try:
+            async with admission.tts_slot():
+                async with websockets.connect(
+                    url, additional_headers={"xi-api-key": settings.ELEVENLABS_API_KEY}
+                ) as ws:
+                    await ws.send(json.dumps({
+                        "text": " ",
+                        "voice_settings": {
+                            "stability": profile.stability,
+                            "similarity_boost": profile.similarity_boost,
+                        },
+                        "generation_config": {
+                            "chunk_length_schedule": ElevenLabsWebSocketService.CHUNK_LENGTH_SCHEDULE
+                        },
+                    }))
+
+                    sender = asyncio.create_task(ElevenLabsWebSocketService._send_tokens(ws, token_stream, profile.model_id))
+                    receiver = asyncio.ensure_future(ws.recv())
+                    try:
+                        while True:
+                            # Wake on either new audio or a failure in the token stream
+                            waiting = {receiver} if sender.done() else {receiver, sender}
+                            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                            if sender in done and sender.exception() is not None:
+                                raise sender.exception()
+                            if receiver not in done:
+                                continue
+
+                            try:
+                                data = json.loads(receiver.result())
+                            except websockets.ConnectionClosedOK:
+                                break
+                            yield data
+                            if data.get("isFinal"):
+                                break
+                            receiver = asyncio.ensure_future(ws.recv())
+                    finally:
+                        for task in (receiver, sender):
+                            if not task.done():
+                                task.cancel()
+                        await asyncio.wait({receiver, sender})
+        except (asyncio.CancelledError, GeneratorExit):
+            note_saved("tts_requests")
+            raise
+
+    @staticmethod
+    async def _send_tokens(ws, token_stream: AsyncIterator[str], model_id: str) -> None:
+        """
+        Forward tokens on word boundaries (ElevenLabs expects text ending in a
+        space), then send the empty message that ends generation.
+        """
+        buffer = ""
+        sent = 0
+        try:
+            async for token in token_stream:
+                buffer += token
+                split_index = buffer.rfind(" ")
+                if split_index > 0:
+                    text, buffer = buffer[:split_index + 1], buffer[split_index + 1:]
+                    await ws.send(json.dumps({"text": text}))
+                    sent += len(text)
+
+            if buffer:
+                await ws.send(json.dumps({"text": buffer + " "}))
+                sent += len(buffer) + 1
+            await ws.send(json.dumps({"text": ""}))
+        finally:
+            # Everything sent is billed, even if the turn is cut short
+            if sent:
+                record_tts(model_id, sent)
+
+
+TTS_ENGINES = {
+    "rest": ElevenLabsService,
+    "websocket": ElevenLabsWebSocketService,
+}
+
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream("POST", url, json=payload, headers=headers) as response:
-                if response.status_code != 200:
-                    error_detail = await response.aread()
-                    print(f"ElevenLabs API Error: {response.status_code} - {error_detail}")
-                    raise Exception(f"ElevenLabs API Error: {response.status_code}")
-                    
-                async for chunk in response.aiter_bytes():
-                    yield chunk
+def get_tts_engine(name: Optional[str] = None):
+    """
+    Return the TTS engine selected by TTS_ENGINE (or `name`). Both engines expose
+    synthesize(token_stream, profile) -> async iterator of audio bytes, and
+    synthesize_events(token_stream, profile) -> async iterator of audio events
+    ({"type": "audio", "segment", "data" (base64), optional "alignment"}).
+    """
+    name = name or settings.TTS_ENGINE
+    if name not in TTS_ENGINES:
+        raise ValueError(f"Unknown TTS engine '{name}'. Available: {', '.join(TTS_ENGINES)}")
+    return TTS_ENGINES[name]
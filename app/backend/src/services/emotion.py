@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict, Optional, Set
+
+from backend.src.core.metrics import metrics
+from backend.src.core.state import StateStore
+
+logger = logging.getLogger(__name__)
+
+# Labels the vision prompt is allowed to answer with.
+EMOTION_LABELS = ["happy", "calm", "stressed", "sad", "anxious", "tired", "neutral"]
+DEFAULT_EMOTION = "neutral"
+
+
+class EmotionTracker:
+    """
+    Keeps the last known emotion label per session so a turn never has to wait
+    on a slow vision call. Labels older than `decay_seconds` fall back to neutral.
+
+    Labels live in the shared state store so every worker sees them; in-flight
+    inferences are tracked per process.
+    """
+
+    def __init__(self, store: StateStore, decay_seconds: float):
+        self.store = store
+        self.decay_seconds = decay_seconds
+        # Most recently submitted inference per key
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Strong references so late vision calls and their writes are not garbage collected
+        self._pending: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _state_key(key: str) -> str:
+        return f"emotion:{key}"
+
+    async def update(self, key: str, emotion: Optional[str], submitted_at: Optional[float] = None) -> None:
+        """
+        Record a fresh label. 'uncertain' and unknown answers are ignored so they
+        don't overwrite a useful previous state, and so are results for frames
+        submitted before the one already stored.
+        """
+        if emotion not in EMOTION_LABELS:
+            return
+        now = time.time()
+        submitted_at = submitted_at if submitted_at is not None else now
+
+        previous = await self.store.get(self._state_key(key))
+        if previous is not None and previous["submitted_at"] > submitted_at:
+            return
+        await self.store.set(
+            self._state_key(key),
+            {"label": emotion, "updated_at": now, "submitted_at": submitted_at},
+            ttl_s=self.decay_seconds,
+        )
+
+    async def current(self, key: str) -> str:
+        """
+        Return the last known label for this session, decayed to neutral when stale.
+        """
+        return await self.fresh(key, self.decay_seconds) or DEFAULT_EMOTION
+
+    async def fresh(self, key: str, max_age_s: float) -> Optional[str]:
+        """
+        Return the stored label only if it was produced within `max_age_s`.
+        """
+        state = await self.store.get(self._state_key(key))
+        if state is None or time.time() - state["updated_at"] > max_age_s:
+            return None
+        return state["label"]
+
+    def has_inflight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def submit(self, key: str, inference: Awaitable[str]) -> asyncio.Task:
+        """
+        Start an inference in the background. Its label is stored when it lands,
+        unless a newer submission for the same key has already landed.
+        """
+        submitted_at = time.time()
+        task = asyncio.ensure_future(inference)
+        self._pending.add(task)
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._on_inference_done(key, submitted_at, t))
+        return task
+
+    async def wait(self, key: str, deadline_s: float) -> str:
+        """
+        Wait up to `deadline_s` for the latest in-flight inference for this key.
+        If it misses the deadline the turn continues with the last known state
+        and the late label is stored for the next turn.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            return await self.current(key)
+
+        try:
+            emotion = await asyncio.wait_for(asyncio.shield(task), timeout=deadline_s)
+        except asyncio.TimeoutError:
+            metrics.incr("emotion.deadline_missed")
+            logger.info(f"Emotion inference missed {deadline_s:.2f}s deadline, using last known state")
+            return await self.current(key)
+        except Exception:
+            # Already logged by the done callback
+            return await self.current(key)
+
+        return emotion if emotion in EMOTION_LABELS else await self.current(key)
+
+    async def resolve(self, key: str, inference: Awaitable[str], deadline_s: float) -> str:
+        """
+        Submit an inference and wait for it under the deadline.
+        """
+        self.submit(key, inference)
+        return await self.wait(key, deadline_s)
+
+    def _on_inference_done(self, key: str, submitted_at: float, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Emotion inference failed: {task.exception()}")
+            return
+
+        write = asyncio.ensure_future(self.update(key, task.result(), submitted_at))
+        self._pending.add(write)
+        write.add_done_callback(self._pending.discard)
@@ -0,0 +1,164 @@
+"""
+Local, CPU-only emotion tier over the biometric feature vector.
+
+A small linear softmax model with hand-set weights scores the same labels
+the vision prompt uses. Only predictions below the confidence threshold are
+escalated to the vision LLM.
+
+There are no labelled snapshots to fit the weights on. The biases and
+temperature are calibrated on the synthetic snapshots of
+benchmarks/emotion_escalation.py instead (see its --calibrate). Mean
+probabilities match a prior of 30% neutral, with the rest split evenly, and
+about a quarter of snapshots fall below the default threshold. Resting
+readings (around the centers below) come out neutral.
+
+That only sets how often the tier escalates, not whether its labels are
+right. Every vision result for a frame with a snapshot is compared with the
+local prediction (`record_agreement`), and EMOTION_LOCAL_SHADOW_RATE of
+confident /frames are sent to vision anyway, so agreement is also measured
+above the threshold. `emotion.vision_compared.<bucket>` and
+`emotion.vision_agreed.<bucket>` in /metrics, by local confidence, are what
+the threshold should be chosen on; the benchmark's --labelled does the same
+offline for recorded snapshots.
+
+Clients send the snapshot as `features` on /speak and /frames, in the output
+schema of detection_demo's extractor. Turns without one always escalate; the
+web client doesn't send one yet.
+"""
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from backend.src.core.metrics import metrics
+from backend.src.services.emotion import EMOTION_LABELS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# (feature, center, scale) used to standardize the snapshot fields from server.py
+_FEATURES = [
+    ("blink_rate", 14.0, 4.0),           # blinks / min
+    ("ear_mean", 0.62, 0.05),            # eye aspect ratio
+    ("jaw_tension", 0.06, 0.04),
+    ("breathing_rate", 15.0, 2.5),       # breaths / min
+    ("breathing_amplitude", 0.0, 1.0),   # low / medium / high -> -1 / 0 / 1
+    ("facial_variance", 0.04, 0.02),
+    ("speaking", 0.0, 1.0),              # False / True -> -1 / 1
+    ("head_motion", 0.0, 1.0),           # low / medium / high -> -1 / 0 / 1
+]
+
+_LEVELS = {"low": -1.0, "medium": 0.0, "high": 1.0}
+
+# One row per label in EMOTION_LABELS, one column per feature in _FEATURES.
+#                blink   ear    jaw  breath  ampl   var   speak  head
+_WEIGHTS = [
+    [-0.3,  0.4, -1.0, -0.2,  0.3,  1.2,  0.8,  0.4],   # happy
+    [-0.8,  0.2, -1.0, -1.2,  0.9, -0.3, -0.2, -0.6],   # calm
+    [ 0.6,  0.0,  1.6,  1.0, -0.4,  0.2,  0.0,  0.8],   # stressed
+    [-0.2, -0.6,  0.2, -0.3, -0.6, -1.2, -0.6, -0.6],   # sad
+    [ 1.2,  0.3,  0.6,  1.2, -0.9,  0.6,  0.0,  0.6],   # anxious
+    [ 0.4, -1.6, -0.3, -0.4, -0.2, -0.6, -0.4, -0.8],   # tired
+    [ 0.0,  0.0,  0.0,  0.0,  0.0,  0.0,  0.0,  0.0],   # neutral
+]
+_BIASES = [-0.6, 0.5, -3.9, -0.6, -3.3, -2.1, 1.2]
+
+# Softmax temperature; lower is more confident, so fewer turns escalate
+_TEMPERATURE = 0.5
+
+assert len(_WEIGHTS) == len(_BIASES) == len(EMOTION_LABELS)
+assert all(len(row) == len(_FEATURES) for row in _WEIGHTS)
+
+
+@lru_cache(maxsize=1)
+def _model() -> Tuple["np.ndarray", "np.ndarray"]:
+    # NumPy is only loaded once the classifier is first used (or warmed in lifespan)
+    import numpy as np
+    return np.array(_WEIGHTS), np.array(_BIASES)
+
+
+class LocalEmotion(NamedTuple):
+    label: str
+    confidence: float
+
+
+class LocalEmotionClassifier:
+    """
+    Scores a biometric snapshot and decides whether the vision LLM is needed.
+    Keeps running counts so the escalation rate can be reported.
+    """
+
+    def __init__(self, confidence_threshold: float):
+        self.confidence_threshold = confidence_threshold
+        self.local_count = 0
+        self.escalated_count = 0
+
+    @staticmethod
+    def vectorize(features: Dict[str, Any]) -> "np.ndarray":
+        """
+        Standardize a snapshot into a feature vector. Missing or malformed
+        fields contribute no evidence.
+        """
+        import numpy as np
+
+        vector = np.zeros(len(_FEATURES))
+        for i, (name, center, scale) in enumerate(_FEATURES):
+            value = features.get(name)
+            if isinstance(value, str):
+                value = _LEVELS.get(value.lower())
+            elif isinstance(value, bool):
+                value = 1.0 if value else -1.0
+            if value is None:
+                continue
+            try:
+                vector[i] = (float(value) - center) / scale
+            except (TypeError, ValueError):
+                continue
+        # Keep a single wild reading from dominating the decision
+        return np.clip(vector, -3.0, 3.0)
+
+    def predict(self, features: Dict[str, Any]) -> LocalEmotion:
+        import numpy as np
+
+        weights, biases = _model()
+        logits = (weights @ self.vectorize(features) + biases) / _TEMPERATURE
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+
+        best = int(probs.argmax())
+        return LocalEmotion(EMOTION_LABELS[best], float(probs[best]))
+
+    def classify(self, features: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Return the local label when it is confident enough, or None when the
+        caller should escalate to the vision LLM.
+        """
+        if features:
+            prediction = self.predict(features)
+            if prediction.confidence >= self.confidence_threshold:
+                self.local_count += 1
+                metrics.incr("emotion.local")
+                return prediction.label
+
+        self.escalated_count += 1
+        metrics.incr("emotion.escalated")
+        return None
+
+    def record_agreement(self, features: Dict[str, Any], vision_label: str) -> Optional[bool]:
+        """
+        Whether the local prediction for a snapshot matches the vision LLM's
+        label for the same moment, counted by local confidence in tenths.
+        None when vision had no usable label.
+        """
+        if vision_label not in EMOTION_LABELS:
+            return None
+        prediction = self.predict(features)
+        bucket = f"{min(int(prediction.confidence * 10), 9) / 10:.1f}"
+        agreed = prediction.label == vision_label
+        metrics.incr(f"emotion.vision_compared.{bucket}")
+        if agreed:
+            metrics.incr(f"emotion.vision_agreed.{bucket}")
+        return agreed
+
+    @property
+    def escalation_rate(self) -> float:
+        total = self.local_count + self.escalated_count
+        return self.escalated_count / total if total else 0.0
@@ -0,0 +1,298 @@
+"""
+Per-user vector index over past session summaries.
+
+Summaries are embedded once (embeddings are cached in the shared state store by
+content hash for `embedding_ttl_s`) and kept in a NumPy matrix per user. Each turn only pulls the
+top-k most relevant summaries into the prompt, so context stays small as a
+user's history grows.
+
+Search is brute-force cosine; once a user has `ann_min_size` memories an
+inverted-file index (k-means cells, probing the nearest `ann_probes`) is built
+instead.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, TYPE_CHECKING
+
+from backend.src.core.metrics import metrics
+from backend.src.core.state import StateStore
+from backend.src.core.supabase import supabase
+from backend.src.services.usage import record_llm
+
+if TYPE_CHECKING:
+    import numpy as np
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Per embeddings request; the API takes at most 2048 inputs and 300k tokens
+_EMBED_BATCH_INPUTS = 2048
+_EMBED_BATCH_TOKENS = 250_000
+
+
+class Memory(NamedTuple):
+    text: str
+    score: float
+
+
+def _memory_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class VectorIndex:
+    """
+    Unit-normalized vectors for one user, searched by cosine similarity.
+    """
+
+    def __init__(self, ann_min_size: int, ann_probes: int):
+        import numpy as np
+
+        self.ann_min_size = ann_min_size
+        self.ann_probes = ann_probes
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self._id_set: Set[str] = set()
+        self._vectors: Optional["np.ndarray"] = None
+        # IVF cells: centroid matrix and the row indices assigned to each; rebuilt lazily after adds
+        self._centroids: Optional["np.ndarray"] = None
+        self._cells: List["np.ndarray"] = []
+        self._np = np
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._id_set
+
+    def add(self, ids: List[str], texts: List[str], vectors: List[List[float]]) -> None:
+        np = self._np
+        if not ids:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self._vectors = matrix if self._vectors is None else np.vstack([self._vectors, matrix])
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self._id_set.update(ids)
+        self._centroids = None
+
+    def retain(self, memory_ids: Set[str]) -> None:
+        """
+        Drop the memories whose id is not in `memory_ids`.
+        """
+        keep = [i for i, memory_id in enumerate(self.ids) if memory_id in memory_ids]
+        if len(keep) == len(self.ids):
+            return
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self._id_set = set(self.ids)
+        self._vectors = self._vectors[keep] if keep else None
+        self._centroids = None
+
+    def search(self, query: List[float], k: int) -> List[Memory]:
+        np = self._np
+        if self._vectors is None or k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        candidates = self._candidates(q)
+        if len(candidates) == 0:
+            return []
+        scores = self._vectors[candidates] @ q
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Memory(self.texts[candidates[i]], float(scores[i])) for i in top]
+
+    def _candidates(self, q: "np.ndarray") -> "np.ndarray":
+        np = self._np
+        if len(self) < self.ann_min_size:
+            return np.arange(len(self))
+        if self._centroids is None:
+            self._build_ivf()
+        nearest_cells = np.argsort(-(self._centroids @ q))[: self.ann_probes]
+        return np.concatenate([self._cells[c] for c in nearest_cells])
+
+    def _build_ivf(self, iterations: int = 10) -> None:
+        np = self._np
+        vectors = self._vectors
+        n_cells = max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(len(vectors), n_cells, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(n_cells):
+                members = vectors[assignment == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        # Empty cells would use up probes without yielding candidates
+        occupied = [c for c in range(n_cells) if np.any(assignment == c)]
+        self._centroids = centroids[occupied]
+        self._cells = [np.flatnonzero(assignment == c) for c in occupied]
+
+
+def _batches(texts: List[str]) -> List[List[str]]:
+    """
+    Split texts into embeddings requests within the API's limits. Tokens are
+    estimated at four characters each; the budget is kept below the API's
+    limit for text that tokenizes worse than that.
+    """
+    batches: List[List[str]] = []
+    batch: List[str] = []
+    tokens = 0
+    for text in texts:
+        text_tokens = len(text) // 4 + 1
+        if batch and (len(batch) >= _EMBED_BATCH_INPUTS or tokens + text_tokens > _EMBED_BATCH_TOKENS):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += text_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class MemoryIndex:
+    """
+    Recall of past `sessions_info` summaries by relevance to the current turn.
+
+    Each user's index is loaded from Supabase on first use and refreshed every
+    `refresh_s` so summaries written by other workers show up; only summaries
+    without a cached embedding are sent to the embeddings API, in batches that
+    are cached as each completes, so a failed load resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], "AsyncOpenAI"],
+        store: StateStore,
+        model: str,
+        top_k: int,
+        refresh_s: float,
+        ann_min_size: int,
+        ann_probes: int,
+        embedding_ttl_s: Optional[float] = None,
+    ):
+        # Resolved per call so the OpenAI SDK is only loaded when recall is used
+        self.client_factory = client_factory
+        self.store = store
+        self.model = model
+        self.top_k = top_k
+        self.refresh_s = refresh_s
+        self.ann_min_size = ann_min_size
+        self.ann_probes = ann_probes
+        self.embedding_ttl_s = embedding_ttl_s
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._loaded_at: Dict[str, float] = {}
+        # One load per user at a time; shielded so a recall deadline doesn't cancel it
+        self._loading: Dict[str, asyncio.Task] = {}
+
+    async def remember(self, user_id: str, text: str) -> None:
+        """
+        Embed a newly written summary and add it to the user's index.
+        """
+        index = self._index(user_id)
+        if _memory_id(text) in index:
+            return
+        vectors = await self._embed([text])
+        await self._cache(text, vectors[0])
+        index.add([_memory_id(text)], [text], vectors)
+
+    async def recall(self, user_id: str, query: str, k: Optional[int] = None) -> List[Memory]:
+        """
+        Return the user's `k` past summaries most relevant to `query`.
+        """
+        await self._ensure_loaded(user_id)
+        index = self._index(user_id)
+        if not len(index):
+            return []
+        started = time.perf_counter()
+        (query_vector,) = await self._embed([query])
+        memories = index.search(query_vector, k if k is not None else self.top_k)
+        metrics.observe("memory.recall_seconds", time.perf_counter() - started)
+        return memories
+
+    def forget(self, user_id: str) -> None:
+        """
+        Drop this worker's index for the user, e.g. after their sessions were
+        deleted; the next recall reloads it (embeddings stay cached).
+        """
+        self._indexes.pop(user_id, None)
+        self._loaded_at.pop(user_id, None)
+
+    def _index(self, user_id: str) -> VectorIndex:
+        if user_id not in self._indexes:
+            self._indexes[user_id] = VectorIndex(self.ann_min_size, self.ann_probes)
+        return self._indexes[user_id]
+
+    def preload(self, user_id: str) -> Optional[asyncio.Task]:
+        """
+        Start loading the user's index in the background (e.g. at session start),
+        so the first turn's recall doesn't pay for it.
+        """
+        loaded_at = self._loaded_at.get(user_id)
+        if loaded_at is not None and time.monotonic() - loaded_at < self.refresh_s:
+            return None
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load(user_id))
+            self._loading[user_id] = task
+            task.add_done_callback(lambda t: self._on_loaded(user_id, t))
+        return task
+
+    async def _ensure_loaded(self, user_id: str) -> None:
+        task = self.preload(user_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    def _on_loaded(self, user_id: str, task: asyncio.Task) -> None:
+        del self._loading[user_id]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Could not load past sessions for recall: {task.exception()}")
+            return
+        self._loaded_at[user_id] = time.monotonic()
+
+    async def _load(self, user_id: str) -> None:
+        response = await asyncio.to_thread(
+            lambda: supabase.table("sessions_info").select("note").eq("user_id", user_id).execute()
+        )
+        index = self._index(user_id)
+        texts = list({row["note"]: None for row in response.data if row.get("note")})
+        # Sessions deleted elsewhere drop out on refresh
+        index.retain({_memory_id(text) for text in texts})
+        new_texts = [text for text in texts if _memory_id(text) not in index]
+        if not new_texts:
+            return
+
+        cached = [await self.store.get(f"embedding:{_memory_id(text)}") for text in new_texts]
+        missing = [text for text, vector in zip(new_texts, cached) if vector is None]
+        embedded = await self._embed_and_cache(missing)
+        vectors = [vector if vector is not None else embedded[text] for text, vector in zip(new_texts, cached)]
+        index.add([_memory_id(text) for text in new_texts], new_texts, vectors)
+
+    async def _embed_and_cache(self, texts: List[str]) -> Dict[str, List[float]]:
+        embedded: Dict[str, List[float]] = {}
+        for batch in _batches(texts):
+            for text, vector in zip(batch, await self._embed(batch)):
+                await self._cache(text, vector)
+                embedded[text] = vector
+        return embedded
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.client_factory().embeddings.create(model=self.model, input=texts)
+        metrics.incr("memory.embedded_texts", len(texts))
+        if response.usage is not None:
+            record_llm("embedding", self.model, response.usage.prompt_tokens, 0)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def _cache(self, text: str, vector: List[float]) -> None:
+        # Summaries are embedded once across restarts and workers (given a shared store);
+        # the TTL keeps deleted sessions' vectors from piling up
+        await self.store.set(f"embedding:{_memory_id(text)}", vector, ttl_s=self.embedding_ttl_s)
@@ -0,0 +1,124 @@
+"""
+Per-turn choice between a fast and a strong model tier.
+
+Short, calm small-talk turns ("thanks", "ok, I'll try that") go to the fast tier,
+which also skips spawning the MCP tool server. Anything long, emotionally
+loaded, physiologically stressed or likely to need the snapshot tool goes to
+the strong tier. Every decision is logged with its latency and cost, which are
+also recorded in metrics under `router.<tier>.*`, so the policy can be tuned.
+"""
+import logging
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+from backend.src.services.emotion_classifier import LocalEmotionClassifier
+from backend.src.services.usage import record_llm
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTier(BaseModel):
+    name: str
+    model_id: str
+    max_tokens: int
+    # Whether the MCP tool server is attached for this tier
+    tools: bool
+
+
+MODEL_TIERS: Dict[str, ModelTier] = {
+    "fast": ModelTier(
+        name="fast",
+        model_id=settings.ROUTER_FAST_MODEL,
+        max_tokens=settings.ROUTER_FAST_MAX_TOKENS,
+        tools=False,
+    ),
+    "strong": ModelTier(
+        name="strong",
+        model_id=settings.ROUTER_STRONG_MODEL,
+        max_tokens=settings.ROUTER_STRONG_MAX_TOKENS,
+        tools=True,
+    ),
+}
+
+# Emotion labels (from vision or the local tier) that always get the strong model
+_DISTRESSED = {"stressed", "anxious", "sad"}
+
+# Topics where the agent is told to check the physical snapshot
+_FEELING_WORDS = re.compile(
+    r"\b(feel\w*|stress\w*|anx\w*|panic\w*|overwhelm\w*|tired|exhaust\w*|sad|cry\w*|"
+    r"breath\w*|tense|tension|worr\w*|scared|afraid|hurt\w*|sleep\w*|lonely)\b",
+    re.IGNORECASE,
+)
+
+# Used only for its stress estimate; counters on this instance are never read
+_stress_classifier = LocalEmotionClassifier(confidence_threshold=settings.EMOTION_LOCAL_CONFIDENCE_THRESHOLD)
+
+
+class RouteDecision(NamedTuple):
+    tier: ModelTier
+    reasons: List[str]
+
+
+def route_turn(
+    user_text: str, emotion_state: str, physiology: Optional[Dict[str, Any]] = None, over_budget: bool = False
+) -> RouteDecision:
+    """
+    Pick the model tier for one turn from signals that are already at hand.
+    Users over their daily budget always get the fast tier.
+    """
+    if over_budget:
+        return RouteDecision(MODEL_TIERS["fast"], ["over budget"])
+    strong = MODEL_TIERS["strong"]
+    if not settings.MODEL_ROUTING_ENABLED:
+        return RouteDecision(strong, ["routing disabled"])
+
+    reasons = []
+    if len(user_text.split()) > settings.ROUTER_FAST_MAX_WORDS:
+        reasons.append("long message")
+    if emotion_state in _DISTRESSED:
+        reasons.append(f"emotion {emotion_state}")
+    if physiology:
+        prediction = _stress_classifier.predict(physiology)
+        if prediction.label in _DISTRESSED and prediction.confidence >= _stress_classifier.confidence_threshold:
+            reasons.append(f"biometrics {prediction.label}")
+    if _FEELING_WORDS.search(user_text):
+        reasons.append("tool call likely")
+
+    if reasons:
+        return RouteDecision(strong, reasons)
+    return RouteDecision(MODEL_TIERS["fast"], ["simple turn"])
+
+
+def record_turn(
+    decision: RouteDecision,
+    first_token_s: Optional[float],
+    total_s: float,
+    usage: Dict[str, int],
+    output_chars: int,
+) -> None:
+    """
+    Log a routed turn and record its latency and cost per tier. `usage` is the
+    agent's accumulated token usage; when the model didn't report it, output
+    tokens are estimated at ~4 characters per token. The usage is also
+    recorded for the turn's cost accounting.
+    """
+    tier = decision.tier
+    input_tokens = usage.get("inputTokens", 0)
+    output_tokens = usage.get("outputTokens") or output_chars / 4
+    cost = record_llm("agent", tier.model_id, input_tokens, output_tokens)
+
+    metrics.incr(f"router.{tier.name}.turns")
+    metrics.incr(f"router.{tier.name}.cost_usd", cost)
+    if first_token_s is not None:
+        metrics.observe(f"router.{tier.name}.first_token_seconds", first_token_s)
+    metrics.observe(f"router.{tier.name}.total_seconds", total_s)
+
+    first_token = f"{first_token_s:.2f}s" if first_token_s is not None else "n/a"
+    logger.info(
+        f"Routed turn to {tier.name} ({tier.model_id}; {', '.join(decision.reasons)}): "
+        f"first token {first_token}, total {total_s:.2f}s, ${cost:.5f}"
+    )
@@ -0,0 +1,55 @@
+"""
+Compact text summary of a biometric snapshot (the get_physical_snapshot fields),
+inlined into the agent's turn input so it doesn't need a tool call to see it.
+"""
+from typing import Any, Dict, Optional
+
+# (field, label, typical value, spread) for the numeric signals
+_SIGNALS = [
+    ("breathing_rate", "breathing", 15.0, 2.5),     # breaths / min
+    ("blink_rate", "blinking", 14.0, 4.0),          # blinks / min
+    ("jaw_tension", "jaw tension", 0.06, 0.04),
+    ("facial_variance", "facial movement", 0.04, 0.02),
+    ("ear_mean", "eye openness", 0.62, 0.05),
+]
+
+
+def _level(value: float, typical: float, spread: float) -> str:
+    z = (value - typical) / spread
+    if z > 1.0:
+        return "high"
+    if z < -1.0:
+        return "low"
+    return "typical"
+
+
+def summarize_physiology(snapshot: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    e.g. "breathing high (19/min, shallow); blinking typical; jaw tension high; ...".
+    Returns None when there is nothing usable in the snapshot.
+    """
+    if not snapshot:
+        return None
+
+    parts = []
+    for field, label, typical, spread in _SIGNALS:
+        value = snapshot.get(field)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            continue
+        part = f"{label} {_level(float(value), typical, spread)}"
+        if field == "breathing_rate":
+            detail = f"{value:g}/min"
+            if snapshot.get("breathing_amplitude") == "low":
+                detail += ", shallow"
+            part += f" ({detail})"
+        parts.append(part)
+
+    if snapshot.get("head_motion") in ("low", "medium", "high"):
+        parts.append(f"head motion {snapshot['head_motion']}")
+    if isinstance(snapshot.get("speaking"), bool):
+        parts.append("speaking" if snapshot["speaking"] else "not speaking")
+    if not parts:
+        return None
+    if isinstance(snapshot.get("timestamp"), str):
+        parts.append(f"measured {snapshot['timestamp'].strip()}")
+    return "; ".join(parts)
@@ -0,0 +1,266 @@
+"""
+On-demand wall-clock profiling of single turns.
+
+A turn is profiled when the request carries the X-Profile-Token header with
+PROFILING_TOKEN, or at random with PROFILING_SAMPLE_RATE. While at least one
+profiled turn is running, a background thread samples the event loop thread's
+Python stack every PROFILING_INTERVAL_MS. Each sample is either idle (the loop
+is waiting on I/O) or busy, and busy stacks are folded into a flamegraph
+(`<id>.folded`, readable by flamegraph.pl, inferno or speedscope).
+
+Samples cover everything the loop runs during the turn, including concurrent
+requests. The summary (`<id>.json`) reports:
+- loop busy time
+- the longest single stretch the loop was blocked
+- busy time spent in the speech chunker, JSON, base64 and Supabase code
+
+When no turn is being profiled, nothing runs besides the check in `start`.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from backend.src.core.config import backend_path, settings
+from backend.src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+
+# Leaf frames where the loop thread is waiting for something to do
+_IDLE_FRAMES = {
+    ("selectors", "select"),
+    ("asyncio.base_events", "run_forever"),
+    ("asyncio.base_events", "run_until_complete"),
+    # uvloop runs its loop in C, so the innermost Python frame is the runner
+    ("asyncio.runners", "run"),
+}
+
+_IDLE_STACK = "<idle>"
+
+# Busy time in library code under these module prefixes is broken out in the summary
+_LIBRARY_CATEGORIES = {
+    "json": ("json",),
+    "base64": ("base64",),
+    "supabase": ("supabase", "postgrest", "gotrue", "supabase_auth"),
+}
+
+# Our own functions broken out by self time, i.e. when they are the innermost
+# frame from this package. The chunker is an ancestor of everything that
+# produces tokens, so counting any sample under it would blame it for the LLM.
+_OWN_CATEGORIES = {
+    "speech_chunks": {("backend.src.core.utils", "async_speech_chunks"), ("backend.src.core.utils", "speech_chunks")},
+}
+
+_CATEGORIES = [*_OWN_CATEGORIES, *_LIBRARY_CATEGORIES]
+
+_MAX_DEPTH = 128
+
+
+def _frame_names(frame) -> List[tuple]:
+    names = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        code = frame.f_code
+        names.append((frame.f_globals.get("__name__", "?"), code.co_name, getattr(code, "co_qualname", code.co_name)))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def _categories(names: List[tuple]) -> Set[str]:
+    found = set()
+    for category, prefixes in _LIBRARY_CATEGORIES.items():
+        if any(module.startswith(prefixes) for module, _, _ in names):
+            found.add(category)
+
+    own = next(((module, name) for module, name, _ in reversed(names) if module.startswith("backend.")), None)
+    for category, functions in _OWN_CATEGORIES.items():
+        if own in functions:
+            found.add(category)
+    return found
+
+
+class TurnProfile:
+    def __init__(self, label: str, interval_s: float):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.interval_s = interval_s
+        self.started = time.monotonic()
+        self.finished = False
+        self.stacks: Counter = Counter()
+        self.category_samples: Counter = Counter()
+        self.busy_samples = 0
+        self.idle_samples = 0
+        self._busy_run = 0
+        self.longest_busy_run = 0
+
+    def add_sample(self, stack: str, categories: Set[str]) -> None:
+        self.stacks[stack] += 1
+        if stack == _IDLE_STACK:
+            self.idle_samples += 1
+            self._busy_run = 0
+            return
+        self.busy_samples += 1
+        self._busy_run += 1
+        self.longest_busy_run = max(self.longest_busy_run, self._busy_run)
+        for category in categories:
+            self.category_samples[category] += 1
+
+    def summary(self, wall_s: float) -> Dict[str, Any]:
+        ms = self.interval_s * 1000
+        return {
+            "id": self.id,
+            "label": self.label,
+            "wall_ms": round(wall_s * 1000, 1),
+            "interval_ms": ms,
+            "samples": self.busy_samples + self.idle_samples,
+            "loop_busy_ms": round(self.busy_samples * ms, 1),
+            "longest_block_ms": round(self.longest_busy_run * ms, 1),
+            "busy_ms_by_category": {
+                category: round(self.category_samples[category] * ms, 1) for category in _CATEGORIES
+            },
+        }
+
+    def folded(self) -> str:
+        # Weights are milliseconds so flamegraphs read in wall time
+        ms = self.interval_s * 1000
+        return "".join(f"{stack} {round(count * ms)}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Decides which turns to profile, runs the sampling thread while any are in
+    flight and stores their artifacts in `directory`.
+    """
+
+    def __init__(
+        self, directory: str, interval_ms: float, sample_rate: float, token: Optional[str], max_artifacts: int
+    ):
+        self.directory = directory
+        self.interval_s = interval_ms / 1000
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_artifacts = max_artifacts
+        self._active: List[TurnProfile] = []
+        self._lock = threading.Lock()
+        # Set to stop the current sampling thread; each thread gets its own
+        self._stop: Optional[threading.Event] = None
+
+    def authorized(self, headers: Mapping[str, str]) -> bool:
+        supplied = headers.get(PROFILE_HEADER)
+        if self.token is None or supplied is None:
+            return False
+        # Constant time, so response timing doesn't reveal how much of a guess matched
+        return secrets.compare_digest(supplied.encode(), self.token.encode())
+
+    def start(self, headers: Mapping[str, str], label: str) -> Optional[TurnProfile]:
+        """
+        Start profiling a turn if its request asked for it or was sampled.
+        Must be called on the event loop thread. Returns None otherwise.
+        """
+        if not self.authorized(headers) and not (self.sample_rate and random.random() < self.sample_rate):
+            return None
+
+        profile = TurnProfile(label, self.interval_s)
+        with self._lock:
+            self._active.append(profile)
+            if self._stop is None:
+                self._stop = threading.Event()
+                threading.Thread(
+                    target=self._sample, args=(threading.get_ident(), self._stop), name="turn-profiler", daemon=True
+                ).start()
+        metrics.incr("profiler.profiles")
+        return profile
+
+    async def finish(self, profile: Optional[TurnProfile]) -> None:
+        """
+        Stop sampling for a turn and write its artifacts. Later calls for the
+        same turn are no-ops.
+        """
+        if profile is None or profile.finished:
+            return
+        profile.finished = True
+        wall_s = time.monotonic() - profile.started
+        with self._lock:
+            self._active.remove(profile)
+            if not self._active and self._stop is not None:
+                self._stop.set()
+                self._stop = None
+
+        summary = profile.summary(wall_s)
+        try:
+            await asyncio.to_thread(self._write, profile, summary)
+        except OSError as e:
+            logger.warning(f"Could not store profile {profile.id}: {e}")
+            return
+        logger.info(
+            f"Profiled {profile.label} turn {profile.id}: loop busy {summary['loop_busy_ms']}ms "
+            f"of {summary['wall_ms']}ms, longest block {summary['longest_block_ms']}ms"
+        )
+
+    def _sample(self, thread_id: int, stop: threading.Event) -> None:
+        while not stop.wait(self.interval_s):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            names = _frame_names(frame)
+            del frame
+            if names and (names[-1][0], names[-1][1]) in _IDLE_FRAMES:
+                stack, categories = _IDLE_STACK, set()
+            else:
+                stack = ";".join(f"{module}:{qualname}" for module, _, qualname in names)
+                categories = _categories(names)
+            with self._lock:
+                for profile in self._active:
+                    profile.add_sample(stack, categories)
+
+    def _write(self, profile: TurnProfile, summary: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{profile.id}.folded"), "w") as f:
+            f.write(profile.folded())
+        with open(os.path.join(self.directory, f"{profile.id}.json"), "w") as f:
+            json.dump(summary, f)
+
+        # Oldest artifacts go first
+        summaries = sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+        for name in summaries[:-self.max_artifacts]:
+            for suffix in (".json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-len(".json")] + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def path(self, profile_id: str, suffix: str) -> Optional[str]:
+        # Ids are generated here; anything else (e.g. path separators) is rejected
+        if not profile_id.replace("-", "").replace("_", "").isalnum():
+            return None
+        path = os.path.join(self.directory, f"{profile_id}{suffix}")
+        return path if os.path.isfile(path) else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".json"):
+                with open(os.path.join(self.directory, name)) as f:
+                    summaries.append(json.load(f))
+        return summaries
+
+
+profiler = Profiler(
+    backend_path(settings.PROFILING_DIR),
+    interval_ms=settings.PROFILING_INTERVAL_MS,
+    sample_rate=settings.PROFILING_SAMPLE_RATE,
+    token=settings.PROFILING_TOKEN,
+    max_artifacts=settings.PROFILING_MAX_ARTIFACTS,
+)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from backend.src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+StreamFactory = Callable[[], AsyncIterator[str]]
+
+
+# Marks the end of a contender's stream
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def _close(stream: AsyncIterator[str]) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception as e:
+        logger.debug(f"Error closing abandoned stream: {e}")
+
+
+class _Contender:
+    """
+    One upstream request. Its stream is iterated start to finish by a single
+    task, since context entered by the stream (e.g. OpenTelemetry spans) must
+    be exited in the task that entered it; tokens reach the caller through
+    a queue.
+    """
+
+    def __init__(self, stream: AsyncIterator[str]):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(stream))
+
+    async def _pump(self, stream: AsyncIterator[str]) -> None:
+        try:
+            async for token in stream:
+                self.queue.put_nowait(token)
+            self.queue.put_nowait(_DONE)
+        except Exception as e:
+            self.queue.put_nowait(_Failure(e))
+        finally:
+            await _close(stream)
+
+    async def cancel(self) -> bool:
+        """
+        Stop the request. Returns whether it was still running.
+        """
+        if self.task.done():
+            return False
+        self.task.cancel()
+        await asyncio.wait({self.task})
+        return True
+
+
+class ResilientStream:
+    """
+    Streaming-aware retry and hedging for token streams.
+
+    A stream is only retried while nothing has been emitted to the caller;
+    once the first token is out, failures propagate. When hedging is enabled
+    and the first token hasn't arrived within the observed p95 time-to-first-token,
+    a second request is started and whichever produces a token first wins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        backoff_s: float,
+        hedge_enabled: bool = False,
+        hedge_min_samples: int = 20,
+        hedge_default_delay_s: float = 3.0,
+    ):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay_s = hedge_default_delay_s
+
+    @property
+    def _ttft_metric(self) -> str:
+        return f"{self.name}.first_token_seconds"
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Deadline for the first token before a hedge is fired, or None if hedging is off.
+        Uses a fixed default until enough samples exist to trust the p95.
+        """
+        if not self.hedge_enabled:
+            return None
+        if metrics.count(self._ttft_metric) < self.hedge_min_samples:
+            return self.hedge_default_delay_s
+        return metrics.percentile(self._ttft_metric, 0.95)
+
+    async def stream(self, factory: StreamFactory) -> AsyncIterator[str]:
+        """
+        Yield tokens from `factory()`, retrying or hedging only before the first token.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                winner, first = await self._first_token(factory)
+            except Exception as e:
+                if attempt >= self.max_attempts:
+                    metrics.incr(f"{self.name}.failures")
+                    raise
+                metrics.incr(f"{self.name}.retries")
+                logger.warning(f"{self.name} stream failed before first token (attempt {attempt}): {e}")
+                await asyncio.sleep(self.backoff_s * 2 ** (attempt - 1))
+                continue
+
+            if first is _DONE:
+                await winner.cancel()
+                return
+
+            metrics.observe(self._ttft_metric, time.monotonic() - started)
+            try:
+                item = first
+                while item is not _DONE:
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    yield item
+                    item = await winner.queue.get()
+            except Exception:
+                # Tokens already reached the caller; a retry would duplicate them
+                metrics.incr(f"{self.name}.midstream_failures")
+                raise
+            finally:
+                await winner.cancel()
+            return
+
+    async def _first_token(self, factory: StreamFactory) -> Tuple[_Contender, Any]:
+        """
+        Race the primary stream (and a hedge, if it fires) to the first token.
+        Returns the winning request and its first item: a token, or _DONE if
+        the stream was empty.
+        """
+        contenders = [_Contender(factory())]
+        firsts: Dict[asyncio.Task, _Contender] = {asyncio.create_task(contenders[0].queue.get()): contenders[0]}
+        winner: Optional[_Contender] = None
+
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(set(firsts), timeout=delay)
+                if not done:
+                    metrics.incr(f"{self.name}.hedges")
+                    hedge = _Contender(factory())
+                    contenders.append(hedge)
+                    firsts[asyncio.create_task(hedge.queue.get())] = hedge
+
+            pending = set(firsts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    item = task.result()
+                    if isinstance(item, _Failure):
+                        error = item.error
+                        continue
+
+                    winner = firsts[task]
+                    if winner is not contenders[0]:
+                        metrics.incr(f"{self.name}.hedge_wins")
+                    return winner, item
+
+            raise error
+        finally:
+            for task in firsts:
+                task.cancel()
+            # Cancel every request that didn't win (all of them on failure)
+            for contender in contenders:
+                if contender is not winner and await contender.cancel():
+                    metrics.incr(f"{self.name}.cancelled_requests")
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple, TYPE_CHECKING
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class ScribeTokenPool:
+    """
+    Small pool of pre-minted single-use realtime Scribe tokens.
+
+    A background task keeps the pool topped up through one shared async client,
+    so session start can hand out a token without an ElevenLabs round-trip.
+    Tokens are discarded before they reach `ttl_s`.
+    """
+
+    def __init__(self, size: int, ttl_s: float, refill_interval_s: float):
+        self.size = size
+        self.ttl_s = ttl_s
+        self.refill_interval_s = refill_interval_s
+        # (token response JSON, monotonic mint time), oldest first
+        self._tokens: Deque[Tuple[dict, float]] = deque()
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(base_url=settings.ELEVENLABS_API_BASE, timeout=10.0)
+        return self._client
+
+    async def start(self) -> None:
+        if self.size > 0 and self._refill_task is None:
+            self._refill_task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self) -> None:
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.wait({self._refill_task})
+            self._refill_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self) -> dict:
+        """
+        Return a token response, from the pool when possible. On a miss, a
+        failure of the shared client (e.g. a stale pooled connection) falls
+        back to minting through a client of its own. Raises httpx.HTTPError
+        (HTTPStatusError for non-2xx responses) if that fails too.
+        """
+        self._drop_expired()
+        if self._tokens:
+            token, _ = self._tokens.popleft()
+            metrics.incr("scribe.pool_hit")
+            self._report_size()
+            self._wake.set()
+            return token
+
+        metrics.incr("scribe.pool_miss")
+        self._wake.set()
+        import httpx
+
+        try:
+            return await self._mint()
+        except httpx.HTTPStatusError:
+            # ElevenLabs answered; another client would get the same answer
+            raise
+        except httpx.HTTPError as e:
+            logger.warning(f"Shared Scribe client failed ({e!r}); minting directly")
+            metrics.incr("scribe.direct_fallback")
+            async with httpx.AsyncClient(base_url=settings.ELEVENLABS_API_BASE, timeout=10.0) as client:
+                return await self._mint(client)
+
+    async def _mint(self, client: Optional["httpx.AsyncClient"] = None) -> dict:
+        response = await (client or self._get_client()).post(
+            "/v1/single-use-token/realtime_scribe",
+            headers={"xi-api-key": settings.ELEVENLABS_API_KEY},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _drop_expired(self) -> None:
+        now = time.monotonic()
+        while self._tokens and now - self._tokens[0][1] >= self.ttl_s:
+            self._tokens.popleft()
+            metrics.incr("scribe.pool_expired")
+        self._report_size()
+
+    def _report_size(self) -> None:
+        metrics.set_gauge("scribe.pool_size", len(self._tokens))
+
+    async def _refill_loop(self) -> None:
+        while True:
+            self._drop_expired()
+            while len(self._tokens) < self.size:
+                try:
+                    self._tokens.append((await self._mint(), time.monotonic()))
+                except Exception as e:
+                    logger.warning(f"Could not pre-mint Scribe token: {e}")
+                    break
+                self._report_size()
+
+            # Sleep until a token is taken or the interval passes (to evict expiring ones)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+
+scribe_token_pool = ScribeTokenPool(
+    size=settings.SCRIBE_TOKEN_POOL_SIZE,
+    ttl_s=settings.SCRIBE_TOKEN_TTL_S,
+    refill_interval_s=settings.SCRIBE_TOKEN_REFILL_INTERVAL_S,
+)
@@ -52,12 +52,11 @@ def get_physical_snapshot() -> dict:
     """
 
     global _LATEST_PHYSIOLOGY_SNAPSHOT
-    
-    _LATEST_PHYSIOLOGY_SNAPSHOT["current_time"] = time.strftime('%l:%M%p %z on %b %d, %Y')
 
     if _LATEST_PHYSIOLOGY_SNAPSHOT is None:
         return _generate_mock_snapshot()
-    
+
+    _LATEST_PHYSIOLOGY_SNAPSHOT["current_time"] = time.strftime('%l:%M%p %z on %b %d, %Y')
     return _LATEST_PHYSIOLOGY_SNAPSHOT
 
 def _generate_mock_snapshot() -> dict:
@@ -84,9 +83,8 @@ def update_physical_data(snapshot: dict) -> None:
     _LATEST_PHYSIOLOGY_SNAPSHOT = snapshot
 
 
-# For testing: allow setting data via environment or file
+# The backend passes the session's latest snapshot (from the shared state store) as argv[1]
 if __name__ == "__main__":
-    # Example: set test data if provided
     import sys
     if len(sys.argv) > 1:
         try:
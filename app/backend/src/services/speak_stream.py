@@ -0,0 +1,97 @@
+"""
+Framed /speak response: one NDJSON stream that interleaves the reply text,
+phrase boundaries and audio for a turn.
+
+Events, one JSON object per line:
+    {"type": "start", "media_type": ..., "output_format": ...}
+    {"type": "text", "delta": "..."}                      as LLM tokens arrive
+    {"type": "phrase", "index": n, "text": "..."}         when the chunker closes a phrase
+    {"type": "audio", "segment": n, "data": "<base64>",   audio in playback order
+     "alignment": {"chars": [...], "start_ms": [...], "duration_ms": [...]}}
+    {"type": "end"} or {"type": "error", "detail": "..."}
+
+Audio events that share a `segment` form one continuous span of audio, and
+alignment times are relative to the start of their segment. The REST engine
+makes each phrase a segment; the WebSocket engine makes each chunk one.
+
+Text is forwarded as soon as the LLM produces it, while TTS works through the
+phrases behind it, so clients can render the reply before it is spoken.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+from backend.src.core.utils import Utils
+from backend.src.services.elevenlabs import AudioProfile, get_audio_profile
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Marks the end of a queue
+_DONE = object()
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator[Any]:
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        yield item
+
+
+async def multiplex_turn(
+    token_stream: AsyncIterator[str], engine, profile: Optional[AudioProfile] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the LLM token stream and the TTS engine side by side and yield their
+    events in arrival order. Failures end the stream with an error event.
+    """
+    profile = profile or get_audio_profile()
+    events: asyncio.Queue = asyncio.Queue()
+    tts_tokens: asyncio.Queue = asyncio.Queue()
+
+    async def read_llm():
+        async def tokens():
+            async for token in token_stream:
+                events.put_nowait({"type": "text", "delta": token})
+                tts_tokens.put_nowait(token)
+                yield token
+
+        try:
+            index = 0
+            async for phrase in Utils.async_speech_chunks(tokens()):
+                events.put_nowait({"type": "phrase", "index": index, "text": phrase})
+                index += 1
+        finally:
+            tts_tokens.put_nowait(_DONE)
+
+    async def speak():
+        async for event in engine.synthesize_events(_drain(tts_tokens), profile):
+            events.put_nowait(event)
+
+    yield {"type": "start", "media_type": profile.media_type, "output_format": profile.output_format}
+
+    tasks = [asyncio.create_task(read_llm()), asyncio.create_task(speak())]
+    for task in tasks:
+        task.add_done_callback(lambda t: events.put_nowait(t))
+    try:
+        running = len(tasks)
+        while running:
+            item = await events.get()
+            if isinstance(item, asyncio.Task):
+                running -= 1
+                if not item.cancelled() and item.exception() is not None:
+                    yield {"type": "error", "detail": str(item.exception())}
+                    return
+                continue
+            yield item
+        yield {"type": "end"}
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.wait(tasks)
+
+
+async def ndjson_lines(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for event in events:
+        yield (json.dumps(event) + "\n").encode()
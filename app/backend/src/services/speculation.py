@@ -0,0 +1,289 @@
+"""
+Speculative replies on partial transcripts.
+
+The client streams the realtime transcript over /sessions/ws while the user
+speaks. Once a partial has been stable for SPECULATION_DEBOUNCE_MS (the user
+paused, so the final transcript is usually next), the agent starts on it and
+its tokens are buffered. When the final transcript arrives:
+- if it matches the partial, the buffered tokens are replayed and the live
+  ones follow, so the reply starts with a head start of up to the pause
+- otherwise the speculation is cancelled and a turn starts on the final text
+
+Partials that change discard the running speculation right away. The session
+summary waits on the speculation's gate, which only a commit sets, so a
+discarded speculation writes nothing; its tokens are still accounted to the
+session as usage outside a turn. SPECULATION_MAX_CONCURRENT caps speculative
+generations per worker; committed turns don't count against it. A speculative
+generation also holds an `admission.llm` slot until it ends, and none starts
+while the LLM is saturated: speculation never queues ahead of real turns. A
+committed speculation's turn uses that slot instead of taking another.
+
+Counters are under `speculation.*` in /metrics.
+"""
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+from backend.src.services.admission import UpstreamLimiter, admission
+from backend.src.services.usage import TurnUsage, usage_ledger
+
+_PUNCTUATION = re.compile(r"[^\w\s']")
+
+TokenSource = Callable[["Speculation"], AsyncIterator[str]]
+
+
+def normalize_transcript(text: str) -> str:
+    """
+    Finals usually differ from the last partial only in casing and
+    punctuation, which don't change the reply.
+    """
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+class Speculation:
+    """
+    Agent tokens for one transcript, buffered until `stream` replays them.
+    `tokens(speculation)` produces the reply, accounting its calls to
+    `speculation.usage`; anything it does after the reply must wait for
+    `speculation.gate`. `llm` is a limiter slot already acquired for the
+    generation, released when it ends. With `start=False` nothing runs until
+    `stream` commits it, i.e. after the turn has been admitted.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        text: str,
+        features: Optional[Dict[str, Any]],
+        usage: TurnUsage,
+        tokens: TokenSource,
+        llm: Optional[UpstreamLimiter] = None,
+        start: bool = True,
+    ):
+        self.key = key
+        self.text = text
+        self.normalized = normalize_transcript(text)
+        self.features = features
+        self.usage = usage
+        # Started from a partial rather than the final transcript
+        self.speculative = False
+        self.started = time.monotonic()
+        self.gate = asyncio.Event()
+        self._tokens: List[str] = []
+        self._changed = asyncio.Event()
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._llm = llm
+        self._source = tokens
+        self._task: Optional[asyncio.Task] = None
+        if start:
+            self._start()
+
+    @property
+    def committed(self) -> bool:
+        return self.gate.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def buffered(self) -> int:
+        return len(self._tokens)
+
+    @property
+    def holds_llm_slot(self) -> bool:
+        return self._llm is not None
+
+    def _start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(self._source))
+
+    async def _run(self, tokens: TokenSource) -> None:
+        try:
+            async for token in tokens(self):
+                self._tokens.append(token)
+                self._changed.set()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._release_llm()
+            self._done = True
+            self._changed.set()
+
+    def _release_llm(self) -> None:
+        if self._llm is not None:
+            self._llm.release()
+            self._llm = None
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Commit: the buffered tokens, then the live ones. Closing the stream
+        early (barge-in, disconnect) cancels the generation.
+        """
+        self.gate.set()
+        self._start()
+        sent = 0
+        try:
+            while True:
+                if sent < len(self._tokens):
+                    yield self._tokens[sent]
+                    sent += 1
+                    continue
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            if not self._done:
+                await self.cancel()
+
+    async def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait({self._task})
+        # A task cancelled before it ran never reached _run's cleanup
+        self._release_llm()
+
+
+class SpeculationPool:
+    """
+    Per-worker cap on speculative generations, which also take a slot from
+    the global LLM limiter.
+    """
+
+    def __init__(self, max_concurrent: int, llm: UpstreamLimiter):
+        self.max_concurrent = max_concurrent
+        self.llm = llm
+        self._running: Set[Speculation] = set()
+
+    async def start(
+        self, key: str, text: str, features: Optional[Dict[str, Any]], usage: TurnUsage, tokens: TokenSource
+    ) -> Optional[Speculation]:
+        """
+        Start a speculative generation, or return None at the cap or while
+        the LLM has no free slot.
+        """
+        # Finished and committed ones no longer hold a slot
+        self._running = {s for s in self._running if not s.done and not s.committed}
+        if len(self._running) >= self.max_concurrent:
+            metrics.incr("speculation.capped")
+            return None
+        if self.llm.saturated:
+            metrics.incr("speculation.llm_saturated")
+            return None
+        # A slot is free, so this doesn't wait
+        await self.llm.acquire()
+        speculation = Speculation(key, text, features, usage, tokens, llm=self.llm)
+        speculation.speculative = True
+        self._running.add(speculation)
+        metrics.incr("speculation.started")
+        return speculation
+
+    async def discard(self, speculation: Speculation) -> None:
+        await speculation.cancel()
+        self._running.discard(speculation)
+        # Spent, but not on a turn the user will hear
+        speculation.usage.turn = False
+        await usage_ledger.commit(speculation.usage)
+        if speculation.speculative:
+            metrics.incr("speculation.discarded")
+            metrics.incr("speculation.discarded_tokens", speculation.buffered)
+
+
+speculation_pool = SpeculationPool(settings.SPECULATION_MAX_CONCURRENT, admission.llm)
+
+
+class Speculator:
+    """
+    Speculation for one /sessions/ws connection: at most one generation,
+    restarted as the partial transcript changes. `tokens` is the reply's
+    token source (see Speculation); usage goes to the connection's user.
+    """
+
+    def __init__(self, tokens: TokenSource, user_id: Optional[str], pool: SpeculationPool = speculation_pool):
+        self._tokens = tokens
+        self.user_id = user_id
+        self.pool = pool
+        self.current: Optional[Speculation] = None
+        self._pending: Optional[asyncio.Task] = None
+        # Transcript the pending start is waiting on, as (key, normalized text)
+        self._pending_for: Optional[tuple] = None
+        # Discards of speculations whose start outlived its cancellation
+        self._orphans: Set[asyncio.Task] = set()
+
+    async def partial(self, key: str, text: str, features: Optional[Dict[str, Any]] = None) -> None:
+        if not settings.SPECULATION_ENABLED:
+            return
+        normalized = normalize_transcript(text)
+        if self.current is not None and (self.current.key, self.current.normalized) == (key, normalized):
+            return
+        if self._pending is not None and self._pending_for == (key, normalized):
+            return
+        await self._reset()
+        if len(normalized.split()) < settings.SPECULATION_MIN_WORDS:
+            return
+        self._pending_for = (key, normalized)
+        self._pending = asyncio.create_task(self._start_when_stable(key, text, features))
+
+    async def _start_when_stable(self, key: str, text: str, features: Optional[Dict[str, Any]]) -> None:
+        await asyncio.sleep(settings.SPECULATION_DEBOUNCE_MS / 1000)
+        # Shielded, so a final() or a newer partial cancelling this mid-start
+        # can't leave an acquired slot behind; `_pending` stays set until
+        # `current` is, so they always see one or the other
+        start = asyncio.ensure_future(
+            self.pool.start(key, text, features, TurnUsage(key, self.user_id), self._tokens)
+        )
+        try:
+            speculation = await asyncio.shield(start)
+        except asyncio.CancelledError:
+            start.add_done_callback(self._discard_orphan)
+            raise
+        self._pending = None
+        self.current = speculation
+
+    def _discard_orphan(self, start: asyncio.Future) -> None:
+        if start.cancelled() or start.exception() is not None or start.result() is None:
+            return
+        task = asyncio.create_task(self.pool.discard(start.result()))
+        self._orphans.add(task)
+        task.add_done_callback(self._orphans.discard)
+
+    async def final(self, key: str, text: str, features: Optional[Dict[str, Any]] = None) -> Speculation:
+        """
+        The speculation for the final transcript if it matches, else a turn
+        on it that starts when committed. Either way the caller admits the
+        turn, then commits it with `stream`.
+        """
+        speculation, self.current = self.current, None
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+        if speculation is not None and speculation.key == key and speculation.normalized == normalize_transcript(text):
+            metrics.incr("speculation.committed")
+            metrics.observe("speculation.head_start_seconds", time.monotonic() - speculation.started)
+            metrics.incr("speculation.committed_tokens", speculation.buffered)
+            return speculation
+
+        if speculation is not None:
+            await self.pool.discard(speculation)
+        metrics.incr("speculation.misses")
+        # Not speculative, so outside the pool's cap; admission limits it instead
+        return Speculation(key, text, features, TurnUsage(key, self.user_id), self._tokens, start=False)
+
+    async def _reset(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self.current is not None:
+            speculation, self.current = self.current, None
+            await self.pool.discard(speculation)
+
+    async def close(self) -> None:
+        await self._reset()
@@ -0,0 +1,205 @@
+"""
+Resumable /speak responses.
+
+A /speak turn's body (audio bytes or NDJSON lines) is produced into a
+BufferedTurn by a task of its own, and the response only follows the buffer.
+When the connection drops, generation carries on, and the client can resume
+with GET /intelligence/speak/{turn_id}?offset=<bytes received> instead of
+re-sending the turn and paying for vision, LLM and TTS again.
+
+A turn with no reader for SPEAK_RESUME_GRACE_S is cancelled like a
+disconnected one (see services/turns.py), so abandoned turns stop spending.
+A new /speak for the same session cancels its previous turn right away. If
+the body fails, readers get the error instead of a clean, truncated end.
+Buffers are kept on the worker that ran the turn:
+- for SPEAK_BUFFER_TTL_S after the turn ends
+- only the latest turn per session
+- at most SPEAK_BUFFER_MAX_TURNS per worker
+- each holding at most SPEAK_BUFFER_MAX_BYTES; older bytes are dropped first
+"""
+import asyncio
+import bisect
+import logging
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetUnavailable(Exception):
+    pass
+
+
+class BufferedTurn:
+    def __init__(self, turn_id: str, key: str, media_type: str, max_bytes: int):
+        self.turn_id = turn_id
+        self.key = key
+        self.media_type = media_type
+        self.max_bytes = max_bytes
+        self.done = False
+        # Why the body stopped early, re-raised to every reader
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+        # Offset of the first byte still held
+        self.base = 0
+        self.size = 0
+        self.readers = 0
+        # Set by TurnBuffers.start: cancels the turn (with a reason) and the task filling it
+        self.cancel: Callable[[str], None] = lambda reason: None
+        self.task: Optional[asyncio.Task] = None
+        self._chunks: List[bytes] = []
+        # Offset of each held chunk's first byte
+        self._starts: List[int] = []
+        self._changed = asyncio.Event()
+
+    def append(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+        self._starts.append(self.size)
+        self.size += len(chunk)
+        while self.size - self.base > self.max_bytes and len(self._chunks) > 1:
+            self.base += len(self._chunks.pop(0))
+            self._starts.pop(0)
+        self._changed.set()
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._changed.set()
+
+    def check_offset(self, offset: int) -> None:
+        if not self.base <= offset <= self.size:
+            raise OffsetUnavailable(f"Offset must be between {self.base} and {self.size}")
+
+    async def follow(self, offset: int = 0) -> AsyncIterator[bytes]:
+        """
+        The body from `offset`, then live chunks until the turn ends.
+        """
+        self.check_offset(offset)
+        self.readers += 1
+        try:
+            while True:
+                # A slow reader can fall behind the bytes still held
+                if offset < self.base:
+                    raise OffsetUnavailable("Fell behind the buffer")
+                index = bisect.bisect_right(self._starts, offset) - 1
+                while 0 <= index < len(self._chunks):
+                    chunk, start = self._chunks[index], self._starts[index]
+                    index += 1
+                    if offset < start + len(chunk):
+                        piece = chunk[offset - start:]
+                        offset += len(piece)
+                        yield piece
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            self.readers -= 1
+
+
+class TurnBuffers:
+    """
+    Per-worker buffers of recent /speak turns, by turn id.
+    """
+
+    def __init__(self, ttl_s: float, max_turns: int, max_bytes: int, grace_s: float):
+        self.ttl_s = ttl_s
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.grace_s = grace_s
+        self._turns: "OrderedDict[str, BufferedTurn]" = OrderedDict()
+
+    def get(self, turn_id: str) -> Optional[BufferedTurn]:
+        self._expire()
+        return self._turns.get(turn_id)
+
+    def start(
+        self,
+        turn_id: str,
+        key: str,
+        media_type: str,
+        body: AsyncIterator[bytes],
+        cancel: Callable[[str], None],
+        on_done: Callable[[], Awaitable[None]],
+    ) -> BufferedTurn:
+        """
+        Buffer `body` from a task of its own. `cancel(reason)` cancels the
+        turn: when it has had no reader for the grace period ("disconnect")
+        or a newer turn replaces it ("superseded"). `on_done` runs once the
+        body has ended either way.
+        """
+        self._expire()
+        for buffered in [t for t in self._turns.values() if t.key == key]:
+            # Superseded by the session's new turn
+            del self._turns[buffered.turn_id]
+            if not buffered.done:
+                buffered.cancel("superseded")
+        while len(self._turns) >= self.max_turns:
+            self._turns.popitem(last=False)
+            metrics.incr("speak_buffer.evicted")
+
+        buffered = BufferedTurn(turn_id, key, media_type, self.max_bytes)
+        buffered.cancel = cancel
+        self._turns[turn_id] = buffered
+        buffered.task = asyncio.create_task(self._fill(buffered, body, on_done))
+        asyncio.create_task(self._watch_readers(buffered, buffered.task))
+        return buffered
+
+    async def supersede(self, key: str) -> None:
+        """
+        Cancel the session's unfinished turn, if any, and wait until it has
+        let go of its admission slot, so the session's next turn is admitted.
+        """
+        for buffered in [t for t in self._turns.values() if t.key == key and not t.done]:
+            del self._turns[buffered.turn_id]
+            buffered.cancel("superseded")
+            metrics.incr("speak_buffer.superseded")
+            if buffered.task is not None:
+                await asyncio.wait({buffered.task})
+
+    async def _fill(
+        self, buffered: BufferedTurn, body: AsyncIterator[bytes], on_done: Callable[[], Awaitable[None]]
+    ) -> None:
+        try:
+            async for chunk in body:
+                buffered.append(chunk)
+        except Exception as e:
+            buffered.error = e
+            metrics.incr("speak_buffer.failed")
+            logger.warning(f"Turn {buffered.turn_id} for {buffered.key} failed: {e}")
+        finally:
+            buffered.finish()
+            await on_done()
+
+    async def _watch_readers(self, buffered: BufferedTurn, task: asyncio.Task) -> None:
+        # Checked a few times per grace period; the exact moment doesn't matter
+        interval_s = max(self.grace_s / 4, 0.05)
+        unread_since = time.monotonic()
+        while not task.done():
+            await asyncio.wait({task}, timeout=interval_s)
+            if buffered.readers:
+                unread_since = time.monotonic()
+            elif not task.done() and time.monotonic() - unread_since >= self.grace_s:
+                metrics.incr("speak_buffer.abandoned")
+                buffered.cancel("disconnect")
+                return
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for buffered in list(self._turns.values()):
+            if buffered.done and now - buffered.finished_at > self.ttl_s:
+                del self._turns[buffered.turn_id]
+
+
+turn_buffers = TurnBuffers(
+    ttl_s=settings.SPEAK_BUFFER_TTL_S,
+    max_turns=settings.SPEAK_BUFFER_MAX_TURNS,
+    max_bytes=settings.SPEAK_BUFFER_MAX_BYTES,
+    grace_s=settings.SPEAK_RESUME_GRACE_S,
+)
@@ -0,0 +1,172 @@
+"""
+Cancellation for in-flight /speak turns.
+
+Each streamed turn runs under a Turn. Cancelling it, because the client sent
+a barge-in or disconnected without resuming (see services/turn_buffer.py),
+cancels whatever the response stream is awaiting: the agent stream, the
+chunker and the TTS requests all see CancelledError and close their upstream
+connections. Anything the turn would
+still have done after the reply, like the session summary and its insert,
+is skipped.
+
+Code on the turn's path can read `current_turn` to tell a cancelled turn apart
+from other cancellations (e.g. a losing hedged request), and records the work
+it skipped with `note_saved`, reported under `turns.saved.*` in /metrics.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional, TypeVar
+
+from starlette.requests import Request
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+from backend.src.core.state import StateStore, state_store
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+current_turn: contextvars.ContextVar[Optional["Turn"]] = contextvars.ContextVar("current_turn", default=None)
+
+
+class Turn:
+    def __init__(self, key: str):
+        self.key = key
+        self.turn_id = uuid.uuid4().hex
+        self.started = time.monotonic()
+        # "barge_in", "disconnect" or "superseded" once cancelled
+        self.cancel_reason: Optional[str] = None
+        self._cancelled = asyncio.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def cancel(self, reason: str) -> None:
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+            self._cancelled.set()
+
+    async def wait_cancelled(self) -> None:
+        await self._cancelled.wait()
+
+
+def note_saved(what: str, amount: float = 1) -> None:
+    """
+    Record upstream work skipped because the current turn was cancelled.
+    No-op outside a cancelled turn.
+    """
+    turn = current_turn.get()
+    if turn is not None and turn.cancelled:
+        metrics.incr(f"turns.saved.{what}", amount)
+
+
+class TurnRegistry:
+    """
+    Active turns per session. Barge-ins for turns on this worker cancel them
+    directly; for turns on other workers a flag is left in the shared state
+    store, which each turn polls every `poll_interval_s`.
+    """
+
+    def __init__(self, store: StateStore, poll_interval_s: float):
+        self.store = store
+        self.poll_interval_s = poll_interval_s
+        self._turns: Dict[str, Turn] = {}
+
+    async def begin(self, key: str) -> Turn:
+        turn = Turn(key)
+        self._turns[key] = turn
+        await self.store.set(f"turn:{key}", turn.turn_id, ttl_s=settings.SESSION_TTL_S)
+        return turn
+
+    async def end(self, turn: Turn) -> None:
+        if self._turns.get(turn.key) is turn:
+            del self._turns[turn.key]
+            await self.store.delete(f"turn:{turn.key}")
+
+    async def barge_in(self, key: str) -> bool:
+        """
+        Cancel the session's in-flight turn. Returns False if there is none.
+        """
+        turn = self._turns.get(key)
+        if turn is not None:
+            turn.cancel("barge_in")
+            return True
+
+        turn_id = await self.store.get(f"turn:{key}")
+        if turn_id is None:
+            return False
+        await self.store.set(f"barge_in:{key}", turn_id, ttl_s=60)
+        return True
+
+    async def guard(
+        self, turn: Turn, stream: AsyncIterator[T], request: Optional[Request] = None
+    ) -> AsyncIterator[T]:
+        """
+        Yield from `stream` until it ends or the turn is cancelled. The stream
+        runs with `current_turn` set; on cancellation its pending step is
+        cancelled and the stream closed.
+        """
+        context = contextvars.copy_context()
+        context.run(current_turn.set, turn)
+
+        watchers = [asyncio.create_task(self._watch_barge_in(turn))]
+        if request is not None:
+            watchers.append(asyncio.create_task(self._watch_disconnect(turn, request)))
+        cancelled = asyncio.create_task(turn.wait_cancelled())
+        step: Optional[asyncio.Task] = None
+        finished = False
+        try:
+            while True:
+                step = asyncio.create_task(stream.__anext__(), context=context)
+                await asyncio.wait({step, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+                if not step.done():
+                    break
+                try:
+                    item = step.result()
+                except StopAsyncIteration:
+                    finished = True
+                    return
+                except BaseException:
+                    finished = True
+                    raise
+                yield item
+        finally:
+            if not finished and not turn.cancelled:
+                # Stopped from outside: the response was cancelled or its consumer went away
+                turn.cancel("disconnect")
+            if step is not None and not step.done():
+                step.cancel()
+                await asyncio.wait({step})
+            for task in (cancelled, *watchers):
+                task.cancel()
+            await asyncio.wait({cancelled, *watchers})
+            if turn.cancelled:
+                await asyncio.create_task(stream.aclose(), context=context)
+                metrics.incr(f"turns.cancelled.{turn.cancel_reason}")
+                metrics.observe("turns.cancelled_after_seconds", time.monotonic() - turn.started)
+                logger.info(f"Turn {turn.turn_id} for {turn.key} cancelled ({turn.cancel_reason})")
+            await self.end(turn)
+
+    async def _watch_disconnect(self, turn: Turn, request: Request) -> None:
+        # The request body has been read, so the next message is the disconnect
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                turn.cancel("disconnect")
+                return
+
+    async def _watch_barge_in(self, turn: Turn) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval_s)
+            if await self.store.get(f"barge_in:{turn.key}") == turn.turn_id:
+                await self.store.delete(f"barge_in:{turn.key}")
+                turn.cancel("barge_in")
+                return
+
+
+turns = TurnRegistry(state_store, poll_interval_s=settings.BARGE_IN_POLL_S)
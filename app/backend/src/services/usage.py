@@ -0,0 +1,257 @@
+"""
+Token, character and cost accounting per turn, session and user.
+
+Every upstream call records what it used with `record_llm` or `record_tts`:
+the vision classifier, the agent loop, the session summary, memory
+embeddings and the ElevenLabs requests. Usage always goes to the process-wide
+`usage.<kind>.*` metrics. When the call runs inside a turn (see `current_usage`),
+it also goes to that turn's TurnUsage, which the ledger adds to the session and
+the user's daily totals once the turn ends.
+
+Users over their daily budget get the fast model tier and a cheaper TTS model
+for the rest of the day (see USAGE_DAILY_BUDGET_USD).
+"""
+import contextvars
+import datetime
+import logging
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+from backend.src.core.state import StateStore, state_store
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# USD per million input / output tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+# USD per 1000 characters sent to ElevenLabs
+TTS_PRICES: Dict[str, float] = {
+    "eleven_multilingual_v2": 0.30,
+    "eleven_flash_v2_5": 0.15,
+    "eleven_turbo_v2_5": 0.15,
+}
+
+# Turns kept per session for /usage/sessions
+_RECENT_TURNS = 20
+
+_unpriced: set = set()
+
+
+def _price(prices: Dict[str, Any], model: str) -> Any:
+    if model not in prices:
+        if model not in _unpriced:
+            _unpriced.add(model)
+            logger.warning(f"No price for '{model}'; its usage is counted at $0")
+        return None
+    return prices[model]
+
+
+def llm_cost(model: str, input_tokens: float, output_tokens: float) -> float:
+    price = _price(MODEL_PRICES, model)
+    if price is None:
+        return 0.0
+    return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+def tts_cost(model_id: str, characters: int) -> float:
+    price = _price(TTS_PRICES, model_id)
+    if price is None:
+        return 0.0
+    return characters * price / 1000
+
+
+def _empty_totals() -> Dict[str, float]:
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "characters": 0, "cost_usd": 0.0}
+
+
+def _add_totals(into: Dict[str, Dict[str, float]], by_kind: Dict[str, Dict[str, float]]) -> None:
+    for kind, totals in by_kind.items():
+        target = into.setdefault(kind, _empty_totals())
+        for field, value in totals.items():
+            target[field] = target.get(field, 0) + value
+
+
+def _cost(by_kind: Dict[str, Dict[str, float]]) -> float:
+    return sum(totals["cost_usd"] for totals in by_kind.values())
+
+
+class TurnUsage:
+    """
+    Usage of one /speak turn, by kind of call ("vision", "agent", "summary",
+    "embedding", "tts"). With `turn=False` it collects session usage outside
+    a turn, like pre-submitted frames, and is not listed among the turns.
+    """
+
+    def __init__(self, session_key: str, user_id: Optional[str] = None, turn: bool = True):
+        self.session_key = session_key
+        self.user_id = user_id
+        self.turn = turn
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.by_kind: Dict[str, Dict[str, float]] = {}
+        # Set when the turn was served on the fast tier / cheap voice because of the budget
+        self.downgraded = False
+        self.committed = False
+
+    def add(
+        self, kind: str, cost_usd: float, input_tokens: float = 0, output_tokens: float = 0, characters: int = 0
+    ) -> None:
+        _add_totals(self.by_kind, {kind: {
+            "calls": 1,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "characters": characters,
+            "cost_usd": cost_usd,
+        }})
+
+    @property
+    def cost_usd(self) -> float:
+        return _cost(self.by_kind)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "cost_usd": self.cost_usd,
+            "downgraded": self.downgraded,
+            "by_kind": self.by_kind,
+        }
+
+
+current_usage: contextvars.ContextVar[Optional[TurnUsage]] = contextvars.ContextVar("current_usage", default=None)
+
+
+def _record(kind: str, cost: float, input_tokens: float, output_tokens: float, characters: int) -> None:
+    metrics.incr(f"usage.{kind}.calls")
+    metrics.incr(f"usage.{kind}.cost_usd", cost)
+    if input_tokens or output_tokens:
+        metrics.incr(f"usage.{kind}.input_tokens", input_tokens)
+        metrics.incr(f"usage.{kind}.output_tokens", output_tokens)
+    if characters:
+        metrics.incr(f"usage.{kind}.characters", characters)
+
+    usage = current_usage.get()
+    if usage is not None:
+        usage.add(kind, cost, input_tokens, output_tokens, characters)
+
+
+def record_llm(kind: str, model: str, input_tokens: float, output_tokens: float) -> float:
+    """
+    Record one OpenAI call. Returns its cost in USD.
+    """
+    cost = llm_cost(model, input_tokens, output_tokens)
+    _record(kind, cost, input_tokens, output_tokens, 0)
+    return cost
+
+
+def record_tts(model_id: str, characters: int) -> float:
+    """
+    Record characters sent to ElevenLabs. Returns their cost in USD.
+    """
+    cost = tts_cost(model_id, characters)
+    _record("tts", cost, 0, 0, characters)
+    return cost
+
+
+def _today() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+class UsageLedger:
+    """
+    Session and per-user daily totals in the shared state store. Updates are
+    read-modify-write: a session only runs one turn at a time, and a user's
+    daily total can at worst miss a turn that finished concurrently on
+    another worker.
+    """
+
+    def __init__(self, store: StateStore, daily_budget_usd: Optional[float], user_budgets: Dict[str, float]):
+        self.store = store
+        self.daily_budget_usd = daily_budget_usd
+        self.user_budgets = user_budgets
+
+    async def commit(self, usage: TurnUsage) -> None:
+        """
+        Add a finished turn to its session and user totals. Later calls for
+        the same turn are no-ops.
+        """
+        if usage.committed:
+            return
+        usage.committed = True
+        if not usage.by_kind:
+            return
+        metrics.observe("usage.turn_cost_usd", usage.cost_usd)
+
+        if not usage.user_id:
+            # Anonymous usage only shows up in /metrics; nobody can read it back
+            return
+
+        # Per user, so turns someone else sends under the same session id land in their own totals
+        session_key = f"usage:session:{usage.user_id}:{usage.session_key}"
+        session = await self.store.get(session_key) or {"by_kind": {}, "turns": []}
+        _add_totals(session["by_kind"], usage.by_kind)
+        if usage.turn:
+            session["turns"] = (session["turns"] + [usage.to_dict()])[-_RECENT_TURNS:]
+        await self.store.set(session_key, session, ttl_s=settings.SESSION_TTL_S)
+
+        day = usage.started_at.date().isoformat()
+        user = await self.store.get(f"usage:user:{usage.user_id}:{day}") or {"by_kind": {}}
+        _add_totals(user["by_kind"], usage.by_kind)
+        await self.store.set(f"usage:user:{usage.user_id}:{day}", user, ttl_s=2 * 86400)
+
+    async def accounted(self, usage: TurnUsage, awaitable: Awaitable[T]) -> T:
+        """
+        Await `awaitable` with its upstream usage going to `usage`, then commit it.
+        """
+        current_usage.set(usage)
+        try:
+            return await awaitable
+        finally:
+            await self.commit(usage)
+
+    async def session(self, session_key: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        `user_id`'s totals for the session, or None if they have none.
+        """
+        session = await self.store.get(f"usage:session:{user_id}:{session_key}")
+        if session is None:
+            return None
+        session["cost_usd"] = _cost(session["by_kind"])
+        return session
+
+    async def user_day(self, user_id: str, day: Optional[str] = None) -> Dict[str, Any]:
+        day = day or _today()
+        user = await self.store.get(f"usage:user:{user_id}:{day}") or {"by_kind": {}}
+        budget = self.budget(user_id)
+        cost = _cost(user["by_kind"])
+        return {
+            "day": day,
+            "cost_usd": cost,
+            "by_kind": user["by_kind"],
+            "daily_budget_usd": budget,
+            "remaining_usd": None if budget is None else max(0.0, budget - cost),
+        }
+
+    def budget(self, user_id: str) -> Optional[float]:
+        return self.user_budgets.get(user_id, self.daily_budget_usd)
+
+    async def over_budget(self, user_id: Optional[str]) -> bool:
+        if not user_id or self.budget(user_id) is None:
+            return False
+        return (await self.user_day(user_id))["remaining_usd"] <= 0
+
+
+usage_ledger = UsageLedger(
+    state_store,
+    daily_budget_usd=settings.USAGE_DAILY_BUDGET_USD,
+    user_budgets=settings.USAGE_USER_BUDGETS_USD,
+)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+from typing import Callable, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from backend.src.services.admission import UpstreamLimiter
+from backend.src.services.emotion import EMOTION_LABELS
+from backend.src.services.usage import record_llm
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SYSTEM_PROMPT = (
+    "You are an emotion recognition assistant. "
+    "You will be given several numbered images, each of a different person. "
+    "For each image, infer the person's emotional state based only on visible "
+    "facial and posture cues. Use one of: "
+    f"{', '.join(EMOTION_LABELS)}. "
+    "If unclear, use 'uncertain'. "
+    "Return exactly one label per image, in the same order as the images."
+)
+
+
+class VisionBatcher:
+    """
+    Collects frames from concurrent requests for a short window and sends them
+    as one multi-image completion, then fans the per-image labels back out.
+
+    A batch is flushed when it reaches `max_size` or `window_ms` after its
+    first frame arrived, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], "AsyncOpenAI"],
+        window_ms: int,
+        max_size: int,
+        model: str = "gpt-4o-mini",
+        limiter: Optional[UpstreamLimiter] = None,
+    ):
+        # Resolved per request so the OpenAI SDK is only loaded when batching is used
+        self.client_factory = client_factory
+        self.limiter = limiter
+        self.window_s = window_ms / 1000
+        self.max_size = max_size
+        self.model = model
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references to in-flight batch requests
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def classify(self, image_base64: str) -> str:
+        """
+        Queue one frame (raw base64, no data URL header) and wait for its label.
+        The batch's token usage is recorded in equal shares for each frame.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image_base64, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        label, (input_tokens, output_tokens) = await future
+        record_llm("vision", self.model, input_tokens, output_tokens)
+        return label
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            if self.limiter is not None:
+                # One upstream request per batch, so one slot per batch
+                async with self.limiter.slot():
+                    labels, usage = await self._request_labels([image for image, _ in batch])
+            else:
+                labels, usage = await self._request_labels([image for image, _ in batch])
+        except Exception as e:
+            logger.warning(f"Batched vision request of {len(batch)} frames failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        share = (usage[0] / len(batch), usage[1] / len(batch))
+        for (_, future), label in zip(batch, labels):
+            if not future.done():
+                future.set_result((label, share))
+
+    async def _request_labels(self, images: List[str]) -> Tuple[List[str], Tuple[int, int]]:
+        content = [{"type": "text", "text": f"There are {len(images)} images."}]
+        for i, image in enumerate(images, start=1):
+            content.append({"type": "text", "text": f"Image {i}:"})
+            content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{image}"},
+            })
+
+        response = await self.client_factory().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": _BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "emotion_labels",
+                    "strict": True,
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "labels": {
+                                "type": "array",
+                                "items": {"type": "string", "enum": EMOTION_LABELS + ["uncertain"]},
+                            }
+                        },
+                        "required": ["labels"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            max_tokens=20 + 10 * len(images),
+        )
+
+        labels = json.loads(response.choices[0].message.content)["labels"]
+        if len(labels) != len(images):
+            raise ValueError(f"Expected {len(images)} labels, got {len(labels)}")
+        usage = (response.usage.prompt_tokens, response.usage.completion_tokens) if response.usage else (0, 0)
+        return [label.strip().lower() for label in labels], usage
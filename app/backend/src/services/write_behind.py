@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from backend.src.core.config import settings
+from backend.src.core.metrics import metrics
+from backend.src.core.supabase import supabase
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+
+
+def _supabase_bulk_insert(table: str, rows: List[Row]) -> None:
+    supabase.table(table).insert(rows).execute()
+
+
+class WriteBehindBuffer:
+    """
+    Collects rows off the request path and writes them as bulk inserts, one per
+    table, when a table reaches `max_batch` rows or every `flush_interval_s`.
+
+    Failed batches go back to the front of their table's queue and are retried
+    on the next flush, up to `max_attempts`. stop() lets an in-flight flush
+    finish, then flushes whatever is left.
+    """
+
+    def __init__(
+        self,
+        max_batch: int,
+        flush_interval_s: float,
+        max_attempts: int,
+        max_pending: int,
+        insert: Callable[[str, List[Row]], None] = _supabase_bulk_insert,
+    ):
+        self.max_batch = max_batch
+        self.flush_interval_s = flush_interval_s
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        # Blocking bulk insert, run in a worker thread
+        self._insert = insert
+        # table -> queued (row, failed attempts so far), oldest first
+        self._queues: Dict[str, Deque[Tuple[Row, int]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def enqueue(self, table: str, row: Row) -> None:
+        """
+        Queue a row for `table`. Never blocks and never raises on the caller.
+        """
+        queue = self._queues.setdefault(table, deque())
+        queue.append((row, 0))
+        if self.pending > self.max_pending:
+            queue.popleft()
+            metrics.incr("write_behind.dropped")
+        self._report_pending()
+        if len(queue) >= self.max_batch:
+            self._wake.set()
+
+    async def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            # Signalled rather than cancelled: a cancelled flush would lose the batch it
+            # had taken off the queue, or insert it twice if the thread still finished
+            self._stopping = True
+            self._wake.set()
+            await asyncio.wait({self._flush_task})
+            self._flush_task = None
+            self._stopping = False
+        # Drain on shutdown; retry each remaining batch until it lands or runs out of attempts
+        while self.pending:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Send one bulk insert per table with at most `max_batch` rows each.
+        """
+        async with self._flush_lock:
+            for table, queue in list(self._queues.items()):
+                # Keep going only while full batches are waiting; a failure waits for the next flush
+                while queue:
+                    if not await self._flush_batch(table, queue) or len(queue) < self.max_batch:
+                        break
+            self._report_pending()
+
+    async def _flush_batch(self, table: str, queue: Deque[Tuple[Row, int]]) -> bool:
+        batch = [queue.popleft() for _ in range(min(self.max_batch, len(queue)))]
+        try:
+            await asyncio.to_thread(self._insert, table, [row for row, _ in batch])
+        except Exception as e:
+            retry = [(row, attempts + 1) for row, attempts in batch if attempts + 1 < self.max_attempts]
+            dropped = len(batch) - len(retry)
+            if dropped:
+                metrics.incr("write_behind.dropped", dropped)
+            metrics.incr("write_behind.failed_batches")
+            logger.warning(f"Bulk insert of {len(batch)} rows into {table} failed ({e}); {dropped} dropped")
+            queue.extendleft(reversed(retry))
+            return False
+
+        metrics.incr("write_behind.flushed_rows", len(batch))
+        metrics.observe("write_behind.batch_size", len(batch))
+        return True
+
+    def _report_pending(self) -> None:
+        metrics.set_gauge("write_behind.pending", self.pending)
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            # Sleep until a table fills a batch or the interval passes
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+
+write_behind = WriteBehindBuffer(
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH,
+    flush_interval_s=settings.WRITE_BEHIND_FLUSH_INTERVAL_S,
+    max_attempts=settings.WRITE_BEHIND_MAX_ATTEMPTS,
+    max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from backend.src.services.admission import AdmissionController, AdmissionRejected
+
+
+def _controller(timeout_s: float = 0.1) -> AdmissionController:
+    return AdmissionController(vision_limit=1, llm_limit=1, tts_limit=1, max_queue=1, timeout_s=timeout_s)
+
+
+def test_waiter_gets_the_slot_when_it_frees():
+    async def run():
+        admission = _controller(timeout_s=1)
+        first = await admission.admit_turn("alice:s1")
+
+        second = asyncio.create_task(admission.admit_turn("bob:s1"))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        first.release()
+        (await second).release()
+        assert not admission.llm.saturated and not admission.tts.saturated
+
+    asyncio.run(run())
+
+
+def test_second_turn_for_the_same_caller_is_429():
+    async def run():
+        admission = _controller()
+        ticket = await admission.admit_turn("alice:s1")
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.admit_turn("alice:s1")
+        assert e.value.status_code == 429
+        ticket.release()
+        ticket.release()
+        (await admission.admit_turn("alice:s1")).release()
+
+    asyncio.run(run())
+
+
+def test_full_queue_and_timeout_are_503():
+    async def run():
+        admission = _controller()
+        ticket = await admission.admit_turn("alice:s1")
+
+        # bob waits in the one queue place until the timeout; carol finds it full
+        waiting = asyncio.create_task(admission.admit_turn("bob:s1"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.admit_turn("carol:s1")
+        assert e.value.status_code == 503
+        with pytest.raises(AdmissionRejected) as e:
+            await waiting
+        assert e.value.status_code == 503
+
+        # Rejected callers hold nothing
+        assert admission._active_turns == {"alice:s1"}
+        ticket.release()
+        assert not admission.llm.saturated and not admission.tts.saturated
+
+    asyncio.run(run())
+
+
+def test_tts_is_reserved_before_the_response_starts():
+    async def run():
+        admission = _controller()
+        # TTS busy outside any turn
+        await admission.tts.acquire()
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.admit_turn("alice:s1")
+        assert e.value.status_code == 503
+        # The LLM slot taken first is given back
+        assert not admission.llm.saturated
+        admission.tts.release()
+
+        ticket = await admission.admit_turn("alice:s1")
+        # Every phrase of the turn's audio uses the reserved slot without queueing
+        for _ in range(3):
+            async with admission.tts_slot():
+                assert admission.tts.saturated
+        ticket.release()
+        assert not admission.tts.saturated
+
+    asyncio.run(run())
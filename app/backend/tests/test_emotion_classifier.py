@@ -0,0 +1,77 @@
+import asyncio
+
+from backend.src.core.metrics import metrics
+from backend.src.routes import intelligence
+from backend.src.services.emotion_classifier import LocalEmotionClassifier
+
+
+def _counter(name: str) -> float:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+_RESTING = {
+    "blink_rate": 14,
+    "ear_mean": 0.62,
+    "jaw_tension": 0.06,
+    "breathing_rate": 15,
+    "breathing_amplitude": "medium",
+    "facial_variance": 0.04,
+    "speaking": False,
+    "head_motion": "medium",
+}
+
+
+def test_resting_snapshot_is_neutral_without_vision():
+    classifier = LocalEmotionClassifier(confidence_threshold=0.6)
+    assert classifier.classify(_RESTING) == "neutral"
+    assert classifier.escalation_rate == 0.0
+
+
+def test_tense_snapshot_is_stressed():
+    tense = dict(_RESTING, jaw_tension=0.18, breathing_rate=21, blink_rate=20, head_motion="high")
+    assert LocalEmotionClassifier(confidence_threshold=0.6).predict(tense).label in ("stressed", "anxious")
+
+
+def test_missing_features_escalate():
+    classifier = LocalEmotionClassifier(confidence_threshold=0.6)
+    assert classifier.classify(None) is None
+    assert classifier.escalation_rate == 1.0
+
+
+def test_agreement_with_vision_is_counted_by_confidence():
+    classifier = LocalEmotionClassifier(confidence_threshold=0.6)
+    bucket = f"{min(int(classifier.predict(_RESTING).confidence * 10), 9) / 10:.1f}"
+    compared = _counter(f"emotion.vision_compared.{bucket}")
+    agreed = _counter(f"emotion.vision_agreed.{bucket}")
+
+    assert classifier.record_agreement(_RESTING, "neutral") is True
+    assert classifier.record_agreement(_RESTING, "stressed") is False
+    assert classifier.record_agreement(_RESTING, "uncertain") is None
+    assert _counter(f"emotion.vision_compared.{bucket}") == compared + 2
+    assert _counter(f"emotion.vision_agreed.{bucket}") == agreed + 1
+
+
+def test_shadowed_frames_are_checked_against_vision(monkeypatch):
+    monkeypatch.setattr(intelligence.settings, "MEMORY_RECALL_ENABLED", False)
+    monkeypatch.setattr(intelligence.settings, "EMOTION_LOCAL_SHADOW_RATE", 1.0)
+    vision = []
+
+    async def fake_vision(b64_frame):
+        vision.append(b64_frame)
+        return "neutral"
+
+    monkeypatch.setattr(intelligence, "analyze_emotion_from_base64_image", fake_vision)
+
+    async def run():
+        await intelligence.init_agent(session_id="shadow-test", user_id="alice")
+        key = intelligence._session_key("shadow-test")
+        frame = intelligence.FrameRequest(b64_frame="frame", session_id="shadow-test", features=_RESTING)
+        # Confident locally, sent to vision anyway
+        assert await intelligence.submit_frame(frame, "alice") == {"accepted": True}
+        await asyncio.sleep(0.01)
+        for name in ("session", "physiology", "emotion"):
+            await intelligence.state_store.delete(f"{name}:{key}")
+
+    shadowed = _counter("emotion.shadowed")
+    asyncio.run(run())
+    assert vision == ["frame"]
+    assert _counter("emotion.shadowed") == shadowed + 1
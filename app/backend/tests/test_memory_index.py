@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.src.core.state import InMemoryStateStore
+from backend.src.services import memory_index
+from backend.src.services.memory_index import VectorIndex
+
+
+def _index(vectors, ann_min_size=4, ann_probes=1) -> VectorIndex:
+    index = VectorIndex(ann_min_size=ann_min_size, ann_probes=ann_probes)
+    index.add([str(i) for i in range(len(vectors))], [f"m{i}" for i in range(len(vectors))], vectors)
+    return index
+
+
+def test_search_ranks_by_cosine():
+    index = _index([[1, 0], [0, 1], [1, 1]], ann_min_size=10)
+    assert [m.text for m in index.search([1, 0.1], k=2)] == ["m0", "m2"]
+
+
+def test_ivf_has_no_empty_cells():
+    # Identical vectors all land in one cell however many are seeded
+    index = _index([[1.0, 0.0]] * 9)
+    assert [m.text for m in index.search([1, 0], k=3)] != []
+    assert len(index._cells) == len(index._centroids) == 1
+    assert all(len(cell) for cell in index._cells)
+
+
+def test_search_with_empty_probed_cells_returns_nothing():
+    index = _index([[1.0, 0.0]] * 4 + [[0.0, 1.0]] * 4)
+    index.search([1, 0], k=1)
+    # Probing only cells without members
+    index._centroids = np.asarray([[1.0, 0.0]], dtype=np.float32)
+    index._cells = [np.asarray([], dtype=np.int64)]
+    assert index.search([1, 0], k=3) == []
+
+
+def test_embeddings_are_batched_and_cached_per_batch(monkeypatch):
+    monkeypatch.setattr(memory_index, "_EMBED_BATCH_INPUTS", 2)
+    monkeypatch.setattr(memory_index, "_EMBED_BATCH_TOKENS", 10)
+    # Over the token budget together, so each gets its own request
+    assert memory_index._batches(["a" * 30, "b" * 30]) == [["a" * 30], ["b" * 30]]
+
+    requests = []
+
+    class Embeddings:
+        async def create(self, model, input):
+            requests.append(list(input))
+            if len(requests) == 2:
+                raise RuntimeError("rate limited")
+            data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+            return SimpleNamespace(data=data, usage=None)
+
+    store = InMemoryStateStore()
+    index = memory_index.MemoryIndex(
+        lambda: SimpleNamespace(embeddings=Embeddings()), store, "model",
+        top_k=3, refresh_s=60, ann_min_size=10, ann_probes=1,
+    )
+    texts = ["one", "three", "seven"]
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await index._embed_and_cache(texts)
+        # The batch that completed is kept for the next load
+        return [await store.get(f"embedding:{memory_index._memory_id(text)}") for text in texts]
+
+    assert asyncio.run(run()) == [[3.0], [5.0], None]
+    assert requests == [["one", "three"], ["seven"]]
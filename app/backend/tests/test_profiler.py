@@ -0,0 +1,15 @@
+from backend.src.services.profiler import PROFILE_HEADER, Profiler
+
+
+def _profiler(token):
+    return Profiler("/tmp/profiles", interval_ms=10, sample_rate=0, token=token, max_artifacts=1)
+
+
+def test_profile_token_must_match():
+    profiler = _profiler("s3cret")
+    assert profiler.authorized({PROFILE_HEADER: "s3cret"})
+    assert not profiler.authorized({PROFILE_HEADER: "s3cre"})
+    assert not profiler.authorized({PROFILE_HEADER: "sécret"})
+    assert not profiler.authorized({})
+    # Without a configured token nobody is authorized
+    assert not _profiler(None).authorized({PROFILE_HEADER: ""})
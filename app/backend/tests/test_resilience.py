@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import logging
+
+import pytest
+
+from backend.src.services.resilience import ResilientStream
+
+# Stands in for OpenTelemetry's current span: set when the stream starts and
+# reset when it ends, which only works in the context that set it
+_span = contextvars.ContextVar("span", default=None)
+
+
+def _traced_stream(tokens, first_delay_s=0.0, errors=None):
+    async def stream():
+        token = _span.set("span")
+        try:
+            await asyncio.sleep(first_delay_s)
+            for t in tokens:
+                await asyncio.sleep(0)
+                yield t
+        finally:
+            try:
+                _span.reset(token)
+            except ValueError as e:
+                # What OpenTelemetry logs as "Failed to detach context"
+                logging.getLogger("opentelemetry.context").error(f"Failed to detach context: {e}")
+                if errors is not None:
+                    errors.append(e)
+
+    return stream()
+
+
+def _collect(policy, factory):
+    async def run():
+        return [token async for token in policy.stream(factory)]
+
+    return asyncio.run(run())
+
+
+def test_stream_context_is_entered_and_exited_in_one_task(caplog):
+    errors = []
+    policy = ResilientStream("test_plain", max_attempts=1, backoff_s=0)
+    with caplog.at_level(logging.ERROR):
+        assert _collect(policy, lambda: _traced_stream(["a", "b", "c"], errors=errors)) == ["a", "b", "c"]
+    assert errors == []
+    assert "Failed to detach context" not in caplog.text
+
+
+def test_hedged_streams_detach_their_context(caplog):
+    errors = []
+    delays = iter([0.5, 0.0])
+    policy = ResilientStream(
+        "test_hedge", max_attempts=1, backoff_s=0, hedge_enabled=True, hedge_default_delay_s=0.05
+    )
+    with caplog.at_level(logging.ERROR):
+        tokens = _collect(policy, lambda: _traced_stream(["x", "y"], next(delays), errors=errors))
+    assert tokens == ["x", "y"]
+    assert errors == []
+    assert "Failed to detach context" not in caplog.text
+
+
+def test_failure_before_first_token_is_retried():
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        raise RuntimeError("upstream down")
+        yield
+
+    def factory():
+        return failing() if not attempts else _traced_stream(["ok"])
+
+    policy = ResilientStream("test_retry", max_attempts=2, backoff_s=0)
+    assert _collect(policy, factory) == ["ok"]
+
+
+def test_failure_after_first_token_propagates():
+    async def broken():
+        yield "a"
+        raise RuntimeError("dropped")
+
+    policy = ResilientStream("test_midstream", max_attempts=3, backoff_s=0)
+    with pytest.raises(RuntimeError, match="dropped"):
+        _collect(policy, broken)
@@ -0,0 +1,44 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.src.services.scribe_pool import ScribeTokenPool
+
+_AsyncClient = httpx.AsyncClient
+
+
+def _pool(shared_transport) -> ScribeTokenPool:
+    pool = ScribeTokenPool(size=0, ttl_s=60, refill_interval_s=60)
+    pool._client = _AsyncClient(base_url="https://api.example", transport=shared_transport)
+    return pool
+
+
+def _use_transport(monkeypatch, transport):
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: _AsyncClient(transport=transport, **kwargs))
+
+
+def _refuse(request):
+    raise httpx.ConnectError("connection reset", request=request)
+
+
+def test_shared_client_failure_falls_back_to_a_direct_mint(monkeypatch):
+    _use_transport(monkeypatch, httpx.MockTransport(lambda request: httpx.Response(200, json={"token": "direct"})))
+    pool = _pool(httpx.MockTransport(_refuse))
+    assert asyncio.run(pool.get()) == {"token": "direct"}
+
+
+def test_rejected_mint_is_not_retried(monkeypatch):
+    direct = []
+    _use_transport(monkeypatch, httpx.MockTransport(lambda request: direct.append(request) or httpx.Response(200)))
+    pool = _pool(httpx.MockTransport(lambda request: httpx.Response(401, text="bad key")))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(pool.get())
+    assert direct == []
+
+
+def test_unreachable_upstream_raises_http_error(monkeypatch):
+    _use_transport(monkeypatch, httpx.MockTransport(_refuse))
+    pool = _pool(httpx.MockTransport(_refuse))
+    with pytest.raises(httpx.HTTPError):
+        asyncio.run(pool.get())
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.src.routes import intelligence
+
+
+def test_session_is_only_used_by_its_owner(monkeypatch):
+    monkeypatch.setattr(intelligence.settings, "MEMORY_RECALL_ENABLED", False)
+
+    async def run():
+        await intelligence.init_agent(session_id="owner-test", user_id="alice")
+        key = intelligence._session_key("owner-test")
+
+        agent = await intelligence._load_agent(key, [], "alice")
+        assert agent.user_id == "alice"
+
+        # Neither another user nor an anonymous caller recalls alice's memories
+        for user_id in ("mallory", None):
+            with pytest.raises(HTTPException) as e:
+                await intelligence._load_agent(key, [], user_id)
+            assert e.value.status_code == 403
+        with pytest.raises(HTTPException) as e:
+            await intelligence.init_agent(session_id="owner-test", user_id="mallory")
+        assert e.value.status_code == 403
+
+        await intelligence.state_store.delete(f"session:{key}")
+
+    asyncio.run(run())
+
+
+def test_frames_are_only_accepted_from_the_owner(monkeypatch):
+    monkeypatch.setattr(intelligence.settings, "MEMORY_RECALL_ENABLED", False)
+    monkeypatch.setattr(intelligence.settings, "EMOTION_LOCAL_SHADOW_RATE", 0.0)
+    snapshot = {"blink_rate": 14, "ear_mean": 0.62, "jaw_tension": 0.06, "breathing_rate": 15}
+
+    async def run():
+        await intelligence.init_agent(session_id="frames-test", user_id="alice")
+        key = intelligence._session_key("frames-test")
+        frame = intelligence.FrameRequest(b64_frame="", session_id="frames-test", features=snapshot)
+
+        for user_id in ("mallory", None):
+            with pytest.raises(HTTPException) as e:
+                await intelligence.submit_frame(frame.model_copy(update={"features": {"jaw_tension": 0.2}}), user_id)
+            assert e.value.status_code == 403
+        assert await intelligence.state_store.get(f"physiology:{key}") is None
+
+        assert await intelligence.submit_frame(frame, "alice") == {"accepted": True}
+        # Throttled for a while, in the shared store rather than a per-process dict
+        assert await intelligence.submit_frame(frame, "alice") == {"accepted": False}
+        assert await intelligence.state_store.get(f"physiology:{key}") == snapshot
+
+        for name in ("session", "physiology"):
+            await intelligence.state_store.delete(f"{name}:{key}")
+
+    asyncio.run(run())
+
+
+def test_anonymous_frames_need_a_session():
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(intelligence.submit_frame(intelligence.FrameRequest(b64_frame=""), None))
+    assert e.value.status_code == 400
+
+
+def test_barge_in_only_cancels_the_callers_turn(monkeypatch):
+    monkeypatch.setattr(intelligence.settings, "MEMORY_RECALL_ENABLED", False)
+
+    async def run():
+        await intelligence.init_agent(session_id="barge-test", user_id="alice")
+        key = intelligence._session_key("barge-test")
+        turn = await intelligence.turns.begin(intelligence.caller_key("alice", key))
+        request = intelligence.BargeInRequest(session_id="barge-test")
+
+        for user_id in ("mallory", None):
+            with pytest.raises(HTTPException) as e:
+                await intelligence.barge_in(request, user_id)
+            assert e.value.status_code == 403
+        assert not turn.cancelled
+
+        assert await intelligence.barge_in(request, "alice") == {"cancelled": True}
+        assert turn.cancelled
+
+        await intelligence.turns.end(turn)
+        await intelligence.state_store.delete(f"session:{key}")
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+import asyncio
+
+from backend.src.services.admission import AdmissionController
+from backend.src.services.speculation import SpeculationPool, Speculator
+from backend.src.services.usage import TurnUsage
+
+
+def _controller() -> AdmissionController:
+    return AdmissionController(vision_limit=1, llm_limit=1, tts_limit=1, max_queue=1, timeout_s=0.1)
+
+
+async def _endless(speculation):
+    while True:
+        await asyncio.sleep(0.01)
+        yield "token "
+
+
+def test_speculation_holds_an_llm_slot_until_discarded():
+    async def run():
+        admission = _controller()
+        pool = SpeculationPool(max_concurrent=4, llm=admission.llm)
+
+        speculation = await pool.start("k", "how are you", None, TurnUsage("k", "alice"), _endless)
+        assert speculation is not None and speculation.holds_llm_slot
+        assert admission.llm.saturated
+        # A saturated LLM is left to committed turns
+        assert await pool.start("k2", "hello there", None, TurnUsage("k2", "bob"), _endless) is None
+
+        await pool.discard(speculation)
+        assert not speculation.holds_llm_slot
+        assert not admission.llm.saturated
+
+    asyncio.run(run())
+
+
+def test_committed_speculation_uses_its_own_slot():
+    async def run():
+        admission = _controller()
+        pool = SpeculationPool(max_concurrent=4, llm=admission.llm)
+        speculation = await pool.start("k", "how are you", None, TurnUsage("k", "alice"), _endless)
+
+        ticket = await admission.admit_turn("alice:k", llm=not speculation.holds_llm_slot)
+        tokens = speculation.stream()
+        assert await tokens.__anext__() == "token "
+        await tokens.aclose()
+        ticket.release()
+        assert not admission.llm.saturated
+
+    asyncio.run(run())
+
+
+def test_missed_final_waits_for_admission(monkeypatch):
+    monkeypatch.setattr("backend.src.services.speculation.settings.SPECULATION_ENABLED", False)
+    started = []
+
+    async def tokens(speculation):
+        started.append(speculation.text)
+        yield "token "
+
+    async def run():
+        speculation = await Speculator(tokens, "alice").final("k", "how are you")
+        await asyncio.sleep(0.01)
+        # Nothing runs until the admitted turn commits it
+        assert started == []
+        stream = speculation.stream()
+        assert await stream.__anext__() == "token "
+        await stream.aclose()
+        assert started == ["how are you"]
+
+    asyncio.run(run())
+
+
+def test_final_during_a_speculation_start_leaves_no_slot_behind(monkeypatch):
+    monkeypatch.setattr("backend.src.services.speculation.settings.SPECULATION_DEBOUNCE_MS", 1)
+    admission = _controller()
+
+    class SlowPool(SpeculationPool):
+        async def start(self, *args):
+            speculation = await super().start(*args)
+            await asyncio.sleep(0.05)
+            return speculation
+
+    async def run():
+        speculator = Speculator(_endless, "alice", pool=SlowPool(max_concurrent=4, llm=admission.llm))
+        await speculator.partial("k", "how are you")
+        await asyncio.sleep(0.02)
+        assert admission.llm.saturated
+
+        # Lands while the speculation is still starting
+        speculation = await speculator.final("k", "something else entirely")
+        assert not speculation.speculative
+        await asyncio.sleep(0.1)
+        assert speculator.current is None
+        assert not admission.llm.saturated
+
+    asyncio.run(run())
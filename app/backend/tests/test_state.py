@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from backend.src.core.state import InMemoryStateStore, PrefixedStateStore, RedisStateStore, SQLiteStateStore
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStateStore()
+    if request.param == "sqlite":
+        return SQLiteStateStore(str(tmp_path / "state.db"))
+    return RedisStateStore(client=fakeredis.FakeAsyncRedis())
+
+
+def test_store_round_trips_json(store):
+    async def run():
+        value = {"user_id": "alice", "history": [{"role": "user", "content": "hi"}], "score": 0.5}
+        await store.set("session:s1", value)
+        assert await store.get("session:s1") == value
+        # Stored serialized: mutating the returned copy changes nothing
+        (await store.get("session:s1"))["user_id"] = "mallory"
+        assert (await store.get("session:s1"))["user_id"] == "alice"
+
+        await store.set("session:s1", None)
+        assert await store.get("session:s1") is None
+        await store.delete("session:s1")
+        await store.delete("missing")
+        assert await store.get("missing") is None
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_store_expires_keys(store):
+    async def run():
+        await store.set("short", 1, ttl_s=0.05)
+        await store.set("forever", 2)
+        assert await store.get("short") == 1
+        await asyncio.sleep(0.1)
+        assert await store.get("short") is None
+        assert await store.get("forever") == 2
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_prefixed_stores_share_a_backend_without_clashing(store):
+    async def run():
+        a, b = PrefixedStateStore(store, "a:"), PrefixedStateStore(store, "b:")
+        await a.set("k", 1)
+        await b.set("k", 2)
+        assert (await a.get("k"), await b.get("k"), await store.get("a:k")) == (1, 2, 1)
+        await a.delete("k")
+        assert (await a.get("k"), await b.get("k")) == (None, 2)
+        await store.close()
+
+    asyncio.run(run())
+
+
+def _expire_unread_keys(store, monkeypatch):
+    async def run():
+        await store.set("short", 1, ttl_s=10)
+        await store.set("forever", 2)
+
+        # Past the TTL and the purge interval, without ever reading "short"
+        now = time.time() + 120
+        monkeypatch.setattr(time, "time", lambda: now)
+        await store.set("other", 3, ttl_s=10)
+
+    asyncio.run(run())
+
+
+def test_memory_store_purges_expired_keys_on_write(monkeypatch):
+    store = InMemoryStateStore(purge_interval_s=60)
+    _expire_unread_keys(store, monkeypatch)
+    assert set(store._data) == {"forever", "other"}
+
+
+def test_sqlite_store_purges_expired_keys_on_write(tmp_path, monkeypatch):
+    store = SQLiteStateStore(str(tmp_path / "state.db"), purge_interval_s=60)
+    _expire_unread_keys(store, monkeypatch)
+    keys = {row[0] for row in store._conn.execute("SELECT key FROM state")}
+    assert keys == {"forever", "other"}
+    asyncio.run(store.close())
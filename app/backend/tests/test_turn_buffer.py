@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+from backend.src.routes import intelligence
+from backend.src.services.agent_interaction_service import AgentService
+from backend.src.services.turn_buffer import TurnBuffers
+
+
+class _Request:
+    headers = Headers({})
+
+
+def _buffers() -> TurnBuffers:
+    return TurnBuffers(ttl_s=60, max_turns=8, max_bytes=1024, grace_s=60)
+
+
+async def _noop():
+    pass
+
+
+def test_reader_sees_body_failure():
+    async def failing_body():
+        yield b"partial"
+        raise RuntimeError("TTS upstream failed")
+
+    async def run():
+        buffered = _buffers().start("t1", "k", "audio/mpeg", failing_body(), lambda reason: None, _noop)
+        received = []
+        with pytest.raises(RuntimeError, match="TTS upstream failed"):
+            async for chunk in buffered.follow():
+                received.append(chunk)
+        assert received == [b"partial"]
+
+        # Resuming the failed turn fails the same way
+        with pytest.raises(RuntimeError):
+            async for _ in buffered.follow(len(b"partial")):
+                pass
+
+    asyncio.run(run())
+
+
+def test_superseded_turn_is_cancelled():
+    async def endless_body():
+        while True:
+            await asyncio.sleep(0.01)
+            yield b"x"
+
+    async def run():
+        buffers = _buffers()
+        reasons = []
+
+        def cancel(reason):
+            reasons.append(reason)
+            buffered.task.cancel()
+
+        buffered = buffers.start("t1", "k", "audio/mpeg", endless_body(), cancel, _noop)
+        await asyncio.sleep(0.05)
+        await buffers.supersede("k")
+        assert reasons == ["superseded"]
+        assert buffered.done
+        assert buffers.get("t1") is None
+
+    asyncio.run(run())
+
+
+def test_aborted_speak_does_not_block_the_next_one(monkeypatch):
+    async def slow_audio(self, user_text, emotion_state, profile=None):
+        while True:
+            await asyncio.sleep(0.01)
+            yield b"audio"
+
+    monkeypatch.setattr(AgentService, "generate_audio_stream", slow_audio)
+
+    async def run():
+        request = intelligence.SpeakRequest(user_text="hello", session_id="supersede-test")
+        # The client drops this response without reading it and sends a new turn
+        first = await intelligence.agent_speak(request, _Request(), user_id=None)
+        second = await intelligence.agent_speak(request, _Request(), user_id=None)
+        assert first.headers["X-Turn-Id"] != second.headers["X-Turn-Id"]
+
+        await intelligence.turn_buffers.supersede(intelligence.caller_key(None, "supersede-test"))
+
+    asyncio.run(run())
+
+
+def test_callers_do_not_share_turn_slots(monkeypatch):
+    async def slow_audio(self, user_text, emotion_state, profile=None):
+        while True:
+            await asyncio.sleep(0.01)
+            yield b"audio"
+
+    monkeypatch.setattr(AgentService, "generate_audio_stream", slow_audio)
+    monkeypatch.setattr(intelligence.settings, "MEMORY_RECALL_ENABLED", False)
+
+    async def run():
+        # Anonymous clients need a session of their own
+        with pytest.raises(HTTPException) as e:
+            await intelligence.agent_speak(intelligence.SpeakRequest(user_text="hello"), _Request(), user_id=None)
+        assert e.value.status_code == 400
+
+        # Neither blocks nor supersedes the other's turn
+        request = intelligence.SpeakRequest(user_text="hello", session_id="shared-id")
+        await intelligence.agent_speak(request, _Request(), user_id="alice")
+        await intelligence.agent_speak(request, _Request(), user_id="bob")
+        for user_id in ("alice", "bob"):
+            key = intelligence.caller_key(user_id, "shared-id")
+            assert [t for t in intelligence.turn_buffers._turns.values() if t.key == key and not t.done]
+            await intelligence.turn_buffers.supersede(key)
+
+    asyncio.run(run())
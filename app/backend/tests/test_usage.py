@@ -0,0 +1,51 @@
+import asyncio
+
+from backend.src.core.state import InMemoryStateStore
+from backend.src.services.agent_interaction_service import AgentService
+from backend.src.services.usage import TurnUsage, UsageLedger, current_usage
+
+
+def test_session_usage_is_kept_per_user():
+    async def run():
+        ledger = UsageLedger(InMemoryStateStore(), daily_budget_usd=None, user_budgets={})
+        usage = TurnUsage("s1", "alice")
+        usage.add("agent", 0.01, input_tokens=100, output_tokens=20)
+        await ledger.commit(usage)
+
+        assert (await ledger.session("s1", "alice"))["cost_usd"] == 0.01
+        assert await ledger.session("s1", "mallory") is None
+        assert await ledger.session("unknown", "alice") is None
+
+        # Turns someone else sends under the same session id stay out of alice's totals
+        other = TurnUsage("s1", "mallory")
+        other.add("agent", 0.5, input_tokens=5000, output_tokens=100)
+        await ledger.commit(other)
+        assert (await ledger.session("s1", "alice"))["cost_usd"] == 0.01
+        assert (await ledger.session("s1", "mallory"))["cost_usd"] == 0.5
+
+    asyncio.run(run())
+
+
+def test_cancelled_turn_records_agent_usage(monkeypatch):
+    async def endless_reply(self, user_text, emotion_state, decision, usage, gate=None):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "word "
+        finally:
+            # What run_conversation reports for the model calls already made
+            usage.update({"inputTokens": 1200, "outputTokens": 40})
+
+    monkeypatch.setattr(AgentService, "_send_message_stream", endless_reply)
+
+    async def run():
+        usage = TurnUsage("s1", "alice")
+        current_usage.set(usage)
+        tokens = AgentService("alice").llm_token_stream("hello", "calm")
+        assert await tokens.__anext__() == "word "
+        # Barge-in
+        await tokens.aclose()
+        assert usage.by_kind["agent"]["input_tokens"] == 1200
+        assert usage.by_kind["agent"]["output_tokens"] == 40
+
+    asyncio.run(run())
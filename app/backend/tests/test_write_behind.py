@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from backend.src.services.write_behind import WriteBehindBuffer
+
+
+def _buffer(insert, max_batch=2, max_attempts=3, max_pending=100, flush_interval_s=60) -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        max_batch=max_batch,
+        flush_interval_s=flush_interval_s,
+        max_attempts=max_attempts,
+        max_pending=max_pending,
+        insert=insert,
+    )
+
+
+def test_rows_are_inserted_in_batches_per_table():
+    inserts = []
+    buffer = _buffer(lambda table, rows: inserts.append((table, [row["n"] for row in rows])))
+
+    async def run():
+        for n in range(5):
+            buffer.enqueue("logs", {"n": n})
+        buffer.enqueue("notes", {"n": 9})
+        # Full batches go out; the leftover row waits for the next flush
+        await buffer.flush()
+        assert inserts == [("logs", [0, 1]), ("logs", [2, 3]), ("notes", [9])]
+        assert buffer.pending == 1
+        await buffer.flush()
+        assert inserts[-1] == ("logs", [4])
+
+    asyncio.run(run())
+
+
+def test_failed_batches_are_retried_up_to_max_attempts():
+    attempts = []
+
+    def insert(table, rows):
+        attempts.append(len(rows))
+        if len(attempts) < 3:
+            raise RuntimeError("supabase down")
+
+    async def run():
+        buffer = _buffer(insert, max_attempts=3)
+        buffer.enqueue("logs", {"n": 0})
+        for _ in range(2):
+            await buffer.flush()
+            assert buffer.pending == 1
+        await buffer.flush()
+        assert buffer.pending == 0
+        assert attempts == [1, 1, 1]
+
+        # Never lands: dropped after the last attempt
+        buffer = _buffer(lambda table, rows: 1 / 0, max_attempts=2)
+        buffer.enqueue("logs", {"n": 0})
+        await buffer.flush()
+        await buffer.flush()
+        assert buffer.pending == 0
+
+    asyncio.run(run())
+
+
+def test_oldest_rows_are_dropped_beyond_max_pending():
+    inserts = []
+    buffer = _buffer(lambda table, rows: inserts.extend(row["n"] for row in rows), max_batch=10, max_pending=2)
+
+    async def run():
+        for n in range(3):
+            buffer.enqueue("logs", {"n": n})
+        assert buffer.pending == 2
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert inserts == [1, 2]
+
+
+def test_stop_finishes_the_in_flight_batch_and_flushes_the_rest():
+    inserts = []
+
+    def slow_insert(table, rows):
+        time.sleep(0.05)
+        inserts.extend(row["n"] for row in rows)
+
+    async def run():
+        buffer = _buffer(slow_insert)
+        await buffer.start()
+        # A full batch wakes the loop, which is mid-insert when stop() comes
+        buffer.enqueue("logs", {"n": 0})
+        buffer.enqueue("logs", {"n": 1})
+        await asyncio.sleep(0.01)
+        buffer.enqueue("logs", {"n": 2})
+        await buffer.stop()
+        assert buffer.pending == 0
+
+    asyncio.run(run())
+    assert inserts == [0, 1, 2]
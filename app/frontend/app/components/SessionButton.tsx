@@ -3,16 +3,68 @@ import { useEffect, useRef, useState } from "react";
 import { supabase } from "~/lib/supabase";
 
 const ScribeTokenUrl = "http://localhost:8000/scribe";
+const FramesUrl = "http://localhost:8000/intelligence/frames";
+// Minimum gap between frames pre-submitted while the user is talking
+const FRAME_SUBMIT_INTERVAL_MS = 1000;
+
+const SpeakUrl = "http://localhost:8000/intelligence/speak";
+// Attempts to resume a dropped /speak response before giving up on the turn
+const MAX_SPEAK_RESUMES = 3;
 
 interface SpeakRequest {
   user_text: string;
   history?: Array<Record<string, string>> | null;
   b64_frame: string;
+  session_id?: string;
+  features?: Record<string, unknown> | null;
 }
+
+// Reads a /speak body; if the connection drops, resumes from the bytes
+// already received instead of re-sending the turn
+async function readSpeakBody(response: Response, signal: AbortSignal): Promise<Blob> {
+  const turnId = response.headers.get("X-Turn-Id");
+  const type = response.headers.get("Content-Type") ?? "";
+  const parts: Uint8Array[] = [];
+  let received = 0;
+  let body = response.body;
+
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const reader = body!.getReader();
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+          return new Blob(parts, { type });
+        }
+        parts.push(value);
+        received += value.length;
+      }
+    } catch (error) {
+      if (signal.aborted || !turnId || attempt >= MAX_SPEAK_RESUMES) {
+        throw error;
+      }
+      const resumed = await fetch(`${SpeakUrl}/${turnId}?offset=${received}`, { signal });
+      if (!resumed.ok) {
+        throw error;
+      }
+      body = resumed.body;
+    }
+  }
+}
+
 export default function MyComponent() {
   const scribeTokenRef = useRef<string | null>(null);
+  const sessionIdRef = useRef<string>(crypto.randomUUID());
+  // Supabase access token; the backend takes the user from it, never from the request
+  const authTokenRef = useRef<string | null>(null);
+  // Latest biometric snapshot in detection_demo's output schema (blink_rate, ear_mean,
+  // jaw_tension, ...). With one, the backend's local classifier can skip the vision
+  // call; nothing on this page extracts features yet, so every turn uses vision.
+  const featuresRef = useRef<Record<string, unknown> | null>(null);
+  const lastFrameSubmitRef = useRef<number>(0);
   const videoRef = useRef<HTMLVideoElement | null>(null);
   const streamRef = useRef<MediaStream | null>(null);
+  const speakAbortRef = useRef<AbortController | null>(null);
   const [cameraError, setCameraError] = useState<string | null>(null);
   const [isCameraReady, setIsCameraReady] = useState(false);
   const microphoneConfig = {
@@ -56,9 +108,15 @@ export default function MyComponent() {
     return () => {
       active = false;
       streamRef.current?.getTracks().forEach((track) => track.stop());
+      // Closing the /speak request cancels the turn's LLM and TTS work server-side
+      // once the resume grace period passes
+      speakAbortRef.current?.abort();
     };
   }, []);
 
+  const authHeaders = (): Record<string, string> =>
+    authTokenRef.current ? { Authorization: `Bearer ${authTokenRef.current}` } : {};
+
   const captureFrame = () => {
     const video = videoRef.current;
     if (!video || video.videoWidth === 0 || video.videoHeight === 0) {
@@ -78,6 +136,30 @@ export default function MyComponent() {
     return canvas.toDataURL("image/jpeg", 0.8);
   };
 
+  // Send a frame for background emotion analysis while Scribe is still transcribing
+  const submitFrame = () => {
+    const now = Date.now();
+    if (now - lastFrameSubmitRef.current < FRAME_SUBMIT_INTERVAL_MS) {
+      return;
+    }
+
+    const capturedFrame = captureFrame();
+    if (!capturedFrame) {
+      return;
+    }
+    lastFrameSubmitRef.current = now;
+
+    fetch(FramesUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", ...authHeaders() },
+      body: JSON.stringify({
+        b64_frame: capturedFrame.split(",")[1],
+        session_id: sessionIdRef.current,
+        features: featuresRef.current,
+      }),
+    }).catch((error) => console.warn("Frame pre-submit failed:", error));
+  };
+
   async function fetchTokenFromServer(): Promise<string> {
     const res = await fetch(ScribeTokenUrl, { method: "GET" });
 
@@ -107,6 +189,9 @@ export default function MyComponent() {
     commitStrategy: CommitStrategy.VAD,
     onPartialTranscript: (data) => {
       console.log("Partial:", data.text);
+      if (data.text) {
+        submitFrame();
+      }
     },
     onCommittedTranscript: async (data) => {
       console.log("Committed:", data.text);
@@ -117,6 +202,8 @@ export default function MyComponent() {
           user_text: data.text,
           history: null,
           b64_frame: encodedFrame,
+          session_id: sessionIdRef.current,
+          features: featuresRef.current,
         };
 
         try {
@@ -124,12 +211,18 @@ export default function MyComponent() {
             await Promise.resolve(scribe.disconnect());
           }
 
+          speakAbortRef.current?.abort();
+          const speakAbort = new AbortController();
+          speakAbortRef.current = speakAbort;
+
           const response = await fetch(
-            "http://localhost:8000/intelligence/speak",
+            SpeakUrl,
             {
               method: "POST",
+              signal: speakAbort.signal,
               headers: {
                 "Content-Type": "application/json", // Indicate the data type in the body
+                ...authHeaders(),
               },
               body: JSON.stringify(reqBody),
             },
@@ -141,7 +234,7 @@ export default function MyComponent() {
             );
           }
 
-          const rawBlob = await response.blob();
+          const rawBlob = await readSpeakBody(response, speakAbort.signal);
           const audioBlob = rawBlob.type
             ? rawBlob
             : new Blob([rawBlob], { type: "audio/mpeg" });
@@ -175,18 +268,20 @@ export default function MyComponent() {
   });
 
   const handleStart = async () => {
-    // attempt to read current supabase user id; fall back to empty string
-    let userId = "";
+    // attempt to read the current supabase session; turns run anonymously without one
     try {
       const { data: sessionData } = await supabase.auth.getSession();
-      userId = sessionData?.session?.user?.id ?? "";
+      authTokenRef.current = sessionData?.session?.access_token ?? null;
     } catch (err) {
-      console.warn("Could not get supabase user id:", err);
+      console.warn("Could not get supabase session:", err);
+    }
+    if (authTokenRef.current) {
+      fetch(`http://localhost:8000/intelligence/start?session_id=${sessionIdRef.current}`, {
+        method: "POST",
+        headers: authHeaders(),
+      });
     }
     // Fetch a single use token from the server
-    fetch(`http://localhost:8000/intelligence/start?auth_id=${userId}`, {
-      method: "POST",
-    });
     const token = await fetchTokenFromServer();
     scribeTokenRef.current = token;
 
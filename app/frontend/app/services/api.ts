@@ -15,9 +15,13 @@ export interface SessionResponse {
 
 // Intelligence Endpoints
 export const intelligenceApi = {
-  start: async (authId: string) => {
-    const response = await fetch(`${API_BASE_URL}/intelligence/start?auth_id=${authId}`, {
+  start: async (token: string, sessionId?: string) => {
+    const query = sessionId ? `?session_id=${sessionId}` : "";
+    const response = await fetch(`${API_BASE_URL}/intelligence/start${query}`, {
       method: "POST",
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
     });
     if (!response.ok) {
       throw new Error(`Failed to start agent: ${response.statusText}`);
@@ -97,6 +101,22 @@ export const sessionApi = {
     return response.json();
   },
 
+  // Deletes the given sessions in one request; resolves to the ids actually deleted
+  deleteSessions: async (sessionIds: string[], token: string): Promise<string[]> => {
+    const response = await fetch(`${API_BASE_URL}/sessions/delete`, {
+      method: "POST",
+      headers: {
+        Authorization: `Bearer ${token}`,
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ session_ids: sessionIds }),
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to delete sessions: ${response.statusText}`);
+    }
+    return (await response.json()).deleted;
+  },
+
   getWebSocketUrl: (token: string) => {
     const wsProtocol = API_BASE_URL.startsWith("https") ? "wss" : "ws";
     const wsBaseUrl = API_BASE_URL.replace(/^http(s)?:\/\//, "");